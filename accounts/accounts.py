@@ -1,40 +1,217 @@
-import sqlite3
+import csv
+import io
+import json
+import re
 from flask import request, jsonify, Flask
 from flask_cors import CORS
 
 from config import Config
+from database.connection import db_stats, get_db, reset_db
+from database.write_queue import run_write, write_stats
 
-DB = 'account.db'
+ACCOUNT_FIELDS = ('id', 'number', 'isActive', 'address', 'ownerFullName', 'propertySquare', 'residentsCount', 'companyName')
+IMPORT_FIELDS = ('number', 'address', 'ownerFullName', 'propertySquare', 'residentsCount', 'companyName')
+CSV_MIMETYPES = ('text/csv', 'application/csv')
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
 
 app = Flask(__name__)
 CORS(app, supports_credentials=Config.CORS_SUPPORTS_CREDENTIALS)
+app.teardown_appcontext(reset_db)
 
-def get_db():
-    conn = sqlite3.connect(DB)
-    conn.row_factory = sqlite3.Row
-    return conn
+def init_account_table():
+    with get_db() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS accounts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                number TEXT NOT NULL,
+                isActive BOOLEAN NOT NULL DEFAULT 1,
+                address TEXT NOT NULL,
+                ownerFullName TEXT NOT NULL,
+                propertySquare REAL NOT NULL,
+                residentsCount INTEGER NOT NULL,
+                companyName TEXT NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_accounts_company_id ON accounts (companyName, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_accounts_active_id ON accounts (isActive, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_accounts_number ON accounts (number)')
+        init_search_index(conn)
 
 
-def init_account_table():
-    conn = get_db()
+def init_search_index(conn):
+    """Create the FTS5 index over number, address and owner name, kept in sync by triggers."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'accounts_fts'"
+    ).fetchone()
+
     conn.execute('''
-        CREATE TABLE IF NOT EXISTS accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            number TEXT NOT NULL,
-            isActive BOOLEAN NOT NULL DEFAULT 1,
-            address TEXT NOT NULL,
-            ownerFullName TEXT NOT NULL,
-            propertySquare REAL NOT NULL,
-            residentsCount INTEGER NOT NULL,
-            companyName TEXT NOT NULL
+        CREATE VIRTUAL TABLE IF NOT EXISTS accounts_fts USING fts5(
+            number, address, ownerFullName,
+            content='accounts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
         )
     ''')
-    conn.commit()
-    conn.close()
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_insert AFTER INSERT ON accounts BEGIN
+            INSERT INTO accounts_fts (rowid, number, address, ownerFullName)
+            VALUES (new.id, new.number, new.address, new.ownerFullName);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_delete AFTER DELETE ON accounts BEGIN
+            INSERT INTO accounts_fts (accounts_fts, rowid, number, address, ownerFullName)
+            VALUES ('delete', old.id, old.number, old.address, old.ownerFullName);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_update AFTER UPDATE OF number, address, ownerFullName ON accounts BEGIN
+            INSERT INTO accounts_fts (accounts_fts, rowid, number, address, ownerFullName)
+            VALUES ('delete', old.id, old.number, old.address, old.ownerFullName);
+            INSERT INTO accounts_fts (rowid, number, address, ownerFullName)
+            VALUES (new.id, new.number, new.address, new.ownerFullName);
+        END
+    ''')
+
+    if not exists:
+        # Index the accounts that existed before the search table
+        conn.execute("INSERT INTO accounts_fts (accounts_fts) VALUES ('rebuild')")
 
 init_account_table()
 
 
+def parse_bool(value):
+    if str(value).lower() in ('1', 'true'):
+        return 1
+    if str(value).lower() in ('0', 'false'):
+        return 0
+    raise ValueError(f"Invalid boolean value: {value}")
+
+
+def build_account_filter(args):
+    """Build an index-friendly WHERE clause from companyName, isActive and numberPrefix."""
+    clauses = []
+    params = []
+
+    for name in ('companyName', 'numberPrefix'):
+        if args.get(name) is not None and not isinstance(args[name], str):
+            raise ValueError(f"{name} must be a string")
+
+    if args.get('companyName'):
+        clauses.append('companyName = ?')
+        params.append(args['companyName'])
+
+    if args.get('isActive') is not None and args.get('isActive') != '':
+        clauses.append('isActive = ?')
+        params.append(parse_bool(args['isActive']))
+
+    prefix = args.get('numberPrefix')
+    if prefix:
+        # Range scan instead of LIKE so the number index is used
+        clauses.append('number >= ? AND number < ?')
+        params.extend([prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)])
+
+    return clauses, params
+
+
+def build_search_query(text):
+    """Turn free text into an FTS5 query where every word is matched as a prefix."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def bulk_conditions(data):
+    """Yield (WHERE clause, params) pairs selecting the accounts of a bulk request.
+
+    The request names either explicit `ids`, which are split into chunks
+    of ACCOUNTS_BULK_CHUNK_SIZE, or a `filter` in the shape accepted by
+    build_account_filter. An empty filter is refused so that a malformed
+    request cannot touch every account.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be an object")
+    if 'ids' in data:
+        ids = data['ids']
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError("ids must be a list of integers")
+        size = Config.ACCOUNTS_BULK_CHUNK_SIZE
+        for start in range(0, len(ids), size):
+            chunk = ids[start:start + size]
+            yield f"id IN ({', '.join('?' * len(chunk))})", chunk
+        return
+
+    account_filter = data.get('filter') or {}
+    if not isinstance(account_filter, dict):
+        raise ValueError("filter must be an object")
+    clauses, params = build_account_filter(account_filter)
+    if not clauses:
+        raise ValueError("Either ids or a non-empty filter is required")
+    yield ' AND '.join(clauses), params
+
+
+def parse_import_row(row):
+    """Validate one imported account (a CSV dict or an NDJSON line) and return its INSERT parameters."""
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    missing = [field for field in IMPORT_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    try:
+        square = float(row['propertySquare'])
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid propertySquare: {row['propertySquare']}")
+    try:
+        residents = int(row['residentsCount'])
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid residentsCount: {row['residentsCount']}")
+    if square <= 0 or residents < 0:
+        raise ValueError("propertySquare must be positive and residentsCount non-negative")
+
+    is_active = row.get('isActive')
+    is_active = 1 if is_active in (None, '') else parse_bool(is_active)
+
+    return (
+        str(row['number']).strip(),
+        is_active,
+        str(row['address']).strip(),
+        str(row['ownerFullName']).strip(),
+        square,
+        residents,
+        str(row['companyName']).strip(),
+    )
+
+
+def iter_import_rows(stream, mimetype):
+    """Yield (line number, row) pairs from a CSV or NDJSON body without buffering it."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if mimetype in CSV_MIMETYPES:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def parse_fields(value):
+    if not value:
+        return list(ACCOUNT_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in ACCOUNT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({"success": True, "data": {"database": db_stats(), "writes": write_stats()}})
+
+
 @app.route('/api/accounts', methods=['POST'])
 def create_account():
     data = request.get_json()
@@ -42,41 +219,204 @@ def create_account():
     if not all(field in data for field in required):
         return jsonify({"success": False, "message": "Не все поля заполнены"}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO accounts (number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName)
-        VALUES (?, 1, ?, ?, ?, ?, ?)
-    ''', (
-        data['number'],
-        data['address'],
-        data['ownerFullName'],
-        data['propertySquare'],
-        data['residentsCount'],
-        data['companyName']
-    ))
-    conn.commit()
-    account_id = cursor.lastrowid
-    new_account = conn.execute('SELECT * FROM accounts WHERE id = ?', (account_id,)).fetchone()
-    conn.close()
+    def insert(conn):
+        return conn.execute('''
+            INSERT INTO accounts (number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName)
+            VALUES (?, 1, ?, ?, ?, ?, ?)
+        ''', (
+            data['number'],
+            data['address'],
+            data['ownerFullName'],
+            data['propertySquare'],
+            data['residentsCount'],
+            data['companyName']
+        )).lastrowid
+
+    account_id = run_write(insert)
+    with get_db() as conn:
+        new_account = conn.execute('SELECT * FROM accounts WHERE id = ?', (account_id,)).fetchone()
     return jsonify({"success": True, "data": dict(new_account)}), 201
 
 
+@app.route('/api/accounts/import', methods=['POST'])
+def import_accounts():
+    mimetype = request.mimetype
+    if mimetype not in CSV_MIMETYPES + NDJSON_MIMETYPES:
+        return jsonify({"success": False, "message": "Expected a text/csv or application/x-ndjson body"}), 415
+
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+
+    def flush():
+        # Each batch commits on its own
+        with get_db() as conn:
+            conn.executemany('''
+                INSERT INTO accounts (number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+        batch.clear()
+
+    try:
+        for line_number, row in iter_import_rows(request.stream, mimetype):
+            try:
+                batch.append(parse_import_row(row))
+            except ValueError as e:
+                failed += 1
+                if len(errors) < Config.ACCOUNTS_IMPORT_MAX_ERRORS:
+                    errors.append({"line": line_number, "message": str(e)})
+                continue
+
+            if len(batch) >= Config.ACCOUNTS_IMPORT_BATCH_SIZE:
+                imported += len(batch)
+                flush()
+
+        if batch:
+            imported += len(batch)
+            flush()
+    except (csv.Error, UnicodeDecodeError) as e:
+        return jsonify({
+            "success": False,
+            "message": f"Malformed import body: {e}",
+            "data": {"imported": imported, "failed": failed, "errors": errors},
+        }), 400
+
+    return jsonify({
+        "success": True,
+        "data": {
+            "imported": imported,
+            "failed": failed,
+            "errors": errors,
+            "errorsTruncated": failed > len(errors),
+        }
+    })
+
+
 @app.route('/api/accounts', methods=['GET'])
 def list_accounts():
-    conn = get_db()
-    rows = conn.execute('SELECT * FROM accounts').fetchall()
-    conn.close()
-    accounts = [dict(row) for row in rows]
-    return jsonify({"success": True, "data": accounts})
+    """List accounts a keyset page at a time; without paging arguments this is the first page."""
+    try:
+        limit = int(request.args.get('limit', Config.ACCOUNTS_PAGE_SIZE))
+        if limit <= 0 or limit > Config.ACCOUNTS_MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {Config.ACCOUNTS_MAX_PAGE_SIZE}")
+        fields = parse_fields(request.args.get('fields'))
+        clauses, params = build_account_filter(request.args)
+        if request.args.get('cursor'):
+            clauses.append('id > ?')
+            params.append(int(request.args['cursor']))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    columns = ', '.join(['id'] + [field for field in fields if field != 'id'])
+    where = ' AND '.join(clauses) or '1'
+
+    with get_db() as conn:
+        rows = conn.execute(
+            f'SELECT {columns} FROM accounts WHERE {where} ORDER BY id LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+
+    next_cursor = str(rows[limit - 1]['id']) if len(rows) > limit else None
+    accounts = [{field: row[field] for field in fields} for row in rows[:limit]]
+    return jsonify({"success": True, "data": accounts, "nextCursor": next_cursor})
+
+
+@app.route('/api/accounts/search', methods=['GET'])
+def search_accounts():
+    query = build_search_query(request.args.get('q', ''))
+    if not query:
+        return jsonify({"success": False, "message": "Missing search query"}), 400
+
+    try:
+        limit = int(request.args.get('limit', Config.ACCOUNTS_SEARCH_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+        if limit <= 0 or limit > Config.ACCOUNTS_MAX_PAGE_SIZE or offset < 0:
+            raise ValueError("Invalid limit or offset")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    with get_db() as conn:
+        rows = conn.execute('''
+            SELECT accounts.*
+            FROM accounts_fts
+            JOIN accounts ON accounts.id = accounts_fts.rowid
+            WHERE accounts_fts MATCH ?
+            ORDER BY bm25(accounts_fts, 10.0, 1.0, 5.0)
+            LIMIT ? OFFSET ?
+        ''', (query, limit + 1, offset)).fetchall()
+
+    next_offset = offset + limit if len(rows) > limit else None
+    accounts = [dict(row) for row in rows[:limit]]
+    return jsonify({"success": True, "data": accounts, "nextOffset": next_offset})
+
+
+@app.route('/api/accounts/lookup', methods=['POST'])
+def lookup_accounts():
+    """Resolve account numbers to ids; numbers that are unknown or shared by several accounts are left out."""
+    data = request.get_json(silent=True) or {}
+    numbers = data.get('numbers')
+    if not isinstance(numbers, list) or not all(isinstance(number, str) for number in numbers):
+        return jsonify({"success": False, "message": "numbers must be a list of strings"}), 400
+
+    ids = {}
+    with get_db() as conn:
+        size = Config.ACCOUNTS_BULK_CHUNK_SIZE
+        for start in range(0, len(numbers), size):
+            chunk = numbers[start:start + size]
+            rows = conn.execute(f'''
+                SELECT number, MIN(id) AS id FROM accounts
+                WHERE number IN ({', '.join('?' * len(chunk))})
+                GROUP BY number
+                HAVING COUNT(*) = 1
+            ''', chunk).fetchall()
+            ids.update((row['number'], row['id']) for row in rows)
+
+    return jsonify({"success": True, "data": ids})
+
+
+@app.route('/api/accounts/bulk', methods=['PUT'])
+def bulk_update_account_status():
+    data = request.get_json(silent=True) or {}
+    if 'isActive' not in data:
+        return jsonify({"success": False, "message": "Missing isActive field"}), 400
+
+    updated = 0
+    try:
+        is_active = parse_bool(data['isActive'])
+        with get_db() as conn:
+            for condition, params in bulk_conditions(data):
+                # Rows already in the requested state are left untouched
+                cursor = conn.execute(
+                    f'UPDATE accounts SET isActive = ? WHERE {condition} AND isActive != ?',
+                    [is_active] + params + [is_active]
+                )
+                updated += cursor.rowcount
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    return jsonify({"success": True, "data": {"updated": updated}})
+
+
+@app.route('/api/accounts/bulk', methods=['DELETE'])
+def bulk_delete_accounts():
+    data = request.get_json(silent=True) or {}
+
+    deleted = 0
+    try:
+        with get_db() as conn:
+            for condition, params in bulk_conditions(data):
+                deleted += conn.execute(f'DELETE FROM accounts WHERE {condition}', params).rowcount
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    return jsonify({"success": True, "data": {"deleted": deleted}})
 
 
 @app.route('/api/accounts/<int:account_id>', methods=['DELETE'])
 def delete_account(account_id):
-    conn = get_db()
-    conn.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        conn.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
     return jsonify({"success": True})
 
 
@@ -86,11 +426,9 @@ def update_account_status(account_id):
     if 'isActive' not in data:
         return jsonify({"success": False, "message": "Missing isActive field"}), 400
 
-    conn = get_db()
-    conn.execute('UPDATE accounts SET isActive = ? WHERE id = ?', (int(data['isActive']), account_id))
-    conn.commit()
-    updated = conn.execute('SELECT * FROM accounts WHERE id = ?', (account_id,)).fetchone()
-    conn.close()
+    with get_db() as conn:
+        conn.execute('UPDATE accounts SET isActive = ? WHERE id = ?', (int(data['isActive']), account_id))
+        updated = conn.execute('SELECT * FROM accounts WHERE id = ?', (account_id,)).fetchone()
     if not updated:
         return jsonify({"success": False, "message": "Account not found"}), 404
 
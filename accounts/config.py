@@ -5,3 +5,30 @@ class Config:
     DEBUG = os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true')
     HOST = os.environ.get('FLASK_HOST', '0.0.0.0')
     PORT = int(os.environ.get('FLASK_PORT', 5000))
+    DATABASE_PATH = os.environ.get('DATABASE_PATH', 'account.db')
+
+    # Keyset pagination for GET /api/accounts
+    ACCOUNTS_PAGE_SIZE = int(os.environ.get('ACCOUNTS_PAGE_SIZE', 100))
+    ACCOUNTS_MAX_PAGE_SIZE = int(os.environ.get('ACCOUNTS_MAX_PAGE_SIZE', 1000))
+    ACCOUNTS_SEARCH_PAGE_SIZE = int(os.environ.get('ACCOUNTS_SEARCH_PAGE_SIZE', 20))
+
+    # Streaming bulk import (POST /api/accounts/import)
+    ACCOUNTS_IMPORT_BATCH_SIZE = int(os.environ.get('ACCOUNTS_IMPORT_BATCH_SIZE', 5000))
+    ACCOUNTS_IMPORT_MAX_ERRORS = int(os.environ.get('ACCOUNTS_IMPORT_MAX_ERRORS', 1000))
+
+    # Bulk status update and delete (/api/accounts/bulk), and number lookups
+    ACCOUNTS_BULK_CHUNK_SIZE = int(os.environ.get('ACCOUNTS_BULK_CHUNK_SIZE', 500))
+
+    # SQLite connection tuning (database/connection.py)
+    DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+    DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 20000))
+    DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_CACHED_STATEMENTS = int(os.environ.get('DB_CACHED_STATEMENTS', 512))
+
+    # Group commit: queue writes to one writer thread per process (database/write_queue.py)
+    DB_WRITE_QUEUE = os.environ.get('DB_WRITE_QUEUE', 'False').lower() == 'true'
+    DB_WRITE_BATCH_SIZE = int(os.environ.get('DB_WRITE_BATCH_SIZE', 100))
+    DB_WRITE_MAX_WAIT_MS = float(os.environ.get('DB_WRITE_MAX_WAIT_MS', 2))
+    # How long a request waits for its queued write before giving up
+    DB_WRITE_TIMEOUT_MS = int(os.environ.get('DB_WRITE_TIMEOUT_MS', 30000))
@@ -0,0 +1,28 @@
+"""What the index advisor (database/advisor.py) checks for the accounts database."""
+
+SOURCES = ['accounts.py']
+
+# Normalised statements that read whole tables by design
+FULL_SCAN_OK = (
+    # Search index bootstrap, run once at startup
+    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'accounts_fts'",
+    # First page of the unfiltered keyset listing stops after LIMIT rows
+    'SELECT id, number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName '
+    'FROM accounts WHERE 1 ORDER BY id LIMIT ?',
+)
+
+FILTERS = ['companyName = ?', 'isActive = ?', 'number >= ? AND number < ?']
+
+# f-string expression -> the SQL fragments it can take
+PLACEHOLDERS = {
+    # Keyset listing: no filter, one filter, or a later page
+    'columns': ['id, number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName'],
+    'where': ['1', 'id > ?'] + FILTERS + [f'{clause} AND id > ?' for clause in FILTERS],
+    # Bulk update and delete: explicit ids or a non-empty filter
+    'condition': ['id IN (?)'] + FILTERS,
+}
+
+
+def init():
+    from accounts import init_account_table
+    init_account_table()
@@ -0,0 +1,2 @@
+# Connection handling is the same in every service: shared/database/pool.py
+from database.pool import close_db, db_stats, get_db, reset_db
@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+import pytest
+
+# Config reads DATABASE_PATH when accounts is first imported
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), 'account.db')
+
+from accounts import app  # noqa: E402
+from database.connection import get_db  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    with get_db() as conn:
+        conn.execute('DELETE FROM accounts')
+    return app.test_client()
@@ -0,0 +1,22 @@
+from database.advisor import collect_queries
+
+SOURCE = '''
+def lookup(conn, chunk, where, order):
+    conn.execute(f"SELECT * FROM accounts WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+    conn.execute(f'SELECT id FROM accounts WHERE {where}')
+    conn.execute(f'SELECT id FROM accounts ORDER BY {order}')
+'''
+
+
+def test_fstrings_are_expanded(tmp_path):
+    path = tmp_path / 'source.py'
+    path.write_text(SOURCE)
+
+    queries = list(collect_queries(str(path), {'where': ['1', 'number = ?']}))
+
+    assert [(sql, expression) for _, sql, expression in queries] == [
+        ('SELECT * FROM accounts WHERE id IN (?)', None),
+        ('SELECT id FROM accounts WHERE 1', None),
+        ('SELECT id FROM accounts WHERE number = ?', None),
+        (None, 'order'),
+    ]
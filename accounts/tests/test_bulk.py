@@ -0,0 +1,48 @@
+import pytest
+
+from database.connection import get_db
+
+
+def query_one(sql):
+    with get_db() as conn:
+        return conn.execute(sql).fetchone()
+
+
+@pytest.fixture
+def accounts(client):
+    with get_db() as conn:
+        conn.executemany('''
+            INSERT INTO accounts (number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName)
+            VALUES (?, 1, 'Main st', 'Owner', 50, 2, ?)
+        ''', [('100001', 'Acme'), ('100002', 'Acme'), ('200001', 'Other')])
+    return client
+
+
+def test_bulk_update_by_filter(accounts):
+    response = accounts.put('/api/accounts/bulk', json={'isActive': False, 'filter': {'numberPrefix': '1000'}})
+
+    assert response.get_json()['data'] == {'updated': 2}
+
+
+def test_bulk_delete_by_ids(accounts):
+    ids = [int(i) for i in query_one("SELECT group_concat(id) FROM accounts WHERE companyName = 'Acme'")[0].split(',')]
+
+    response = accounts.delete('/api/accounts/bulk', json={'ids': ids})
+
+    assert response.get_json()['data'] == {'deleted': 2}
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'filter': {}},
+    {'filter': ['Acme']},
+    {'filter': {'numberPrefix': 10}},
+    {'filter': {'companyName': {'$ne': ''}}},
+    {'ids': ['1']},
+    ['ids'],
+])
+def test_bulk_delete_rejects_malformed_requests(accounts, body):
+    response = accounts.delete('/api/accounts/bulk', json=body)
+
+    assert response.status_code == 400
+    assert query_one('SELECT COUNT(*) FROM accounts')[0] == 3
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from accounts import app
+from database.connection import get_db
+
+
+def count_accounts(conn):
+    return conn.execute('SELECT COUNT(*) FROM accounts').fetchone()[0]
+
+
+def insert_account(conn, number):
+    conn.execute('''
+        INSERT INTO accounts (number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName)
+        VALUES (?, 1, 'Main st', 'Owner', 50, 2, 'Acme')
+    ''', (number,))
+
+
+def nested_helper():
+    with get_db() as conn:
+        return count_accounts(conn)
+
+
+def insert_from_other_thread(number):
+    errors = []
+
+    def run():
+        try:
+            with get_db() as conn:
+                insert_account(conn, number)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    return errors
+
+
+def test_nested_block_keeps_callers_transaction(client):
+    with get_db() as conn:
+        insert_account(conn, '100001')
+        nested_helper()
+        assert conn.in_transaction
+
+    assert not conn.in_transaction
+    assert nested_helper() == 1
+
+
+def test_block_left_by_exception_rolls_back(client):
+    with pytest.raises(RuntimeError):
+        with get_db() as conn:
+            insert_account(conn, '100001')
+            raise RuntimeError('boom')
+
+    assert not conn.in_transaction
+    assert nested_helper() == 0
+
+
+def test_outermost_close_rolls_back_open_transaction(client):
+    conn = get_db()
+    insert_account(conn, '100001')
+    conn.close()
+
+    assert not conn.in_transaction
+    assert nested_helper() == 0
+
+
+def test_request_that_raises_does_not_keep_the_write_lock(client, monkeypatch):
+    def leaking_view():
+        conn = get_db()
+        insert_account(conn, '100001')
+        raise RuntimeError('boom')
+
+    monkeypatch.setitem(app.view_functions, 'health', leaking_view)
+    assert client.get('/health').status_code == 500
+
+    conn = get_db()
+    insert_account(conn, '100002')
+    conn.close()
+
+    assert not conn.in_transaction
+    assert insert_from_other_thread('100003') == []
+    assert nested_helper() == 1
@@ -0,0 +1,25 @@
+import json
+
+
+def ndjson(*rows):
+    return '\n'.join(json.dumps(row) for row in rows).encode()
+
+
+ROW = {
+    'number': '100001', 'address': 'Main st 1', 'ownerFullName': 'Owner',
+    'propertySquare': 50, 'residentsCount': 2, 'companyName': 'Acme'
+}
+
+
+def test_ndjson_import(client):
+    response = client.post('/api/accounts/import', data=ndjson(ROW, dict(ROW, number='100002')),
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['imported'] == 2
+
+
+def test_plain_json_body_is_rejected(client):
+    response = client.post('/api/accounts/import', data=json.dumps([ROW]), content_type='application/json')
+
+    assert response.status_code == 415
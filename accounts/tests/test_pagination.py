@@ -0,0 +1,52 @@
+import pytest
+
+from config import Config
+from database.connection import get_db
+
+
+@pytest.fixture
+def accounts(client):
+    with get_db() as conn:
+        conn.executemany('''
+            INSERT INTO accounts (number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName)
+            VALUES (?, ?, 'Main st', 'Owner', 50, 2, ?)
+        ''', [(f'1000{i:02d}', i % 2, 'Acme' if i < 6 else 'Other') for i in range(10)])
+    return client
+
+
+def fetch_all(client, **params):
+    numbers = []
+    while True:
+        body = client.get('/api/accounts', query_string=params).get_json()
+        numbers += [account['number'] for account in body['data']]
+        if body['nextCursor'] is None:
+            return numbers
+        params['cursor'] = body['nextCursor']
+
+
+def test_cursor_walks_every_account_once(accounts):
+    assert fetch_all(accounts, limit=3) == [f'1000{i:02d}' for i in range(10)]
+
+
+def test_without_paging_args_the_first_page_is_returned(accounts, monkeypatch):
+    monkeypatch.setattr(Config, 'ACCOUNTS_PAGE_SIZE', 4)
+
+    body = accounts.get('/api/accounts').get_json()
+
+    assert [account['number'] for account in body['data']] == ['100000', '100001', '100002', '100003']
+    assert body['nextCursor'] == str(body['data'][-1]['id'])
+
+
+def test_filters_combine_with_cursor(accounts):
+    assert fetch_all(accounts, limit=2, companyName='Acme', isActive='true') == ['100001', '100003', '100005']
+
+
+def test_fields_are_projected(accounts):
+    body = accounts.get('/api/accounts', query_string={'limit': 1, 'fields': 'number'}).get_json()
+
+    assert body['data'] == [{'number': '100000'}]
+
+
+@pytest.mark.parametrize('params', [{'limit': 0}, {'limit': 100000}, {'fields': 'password'}, {'isActive': 'maybe'}])
+def test_invalid_page_requests_are_refused(accounts, params):
+    assert accounts.get('/api/accounts', query_string=params).status_code == 400
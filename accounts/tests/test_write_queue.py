@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+
+import pytest
+
+from database.connection import get_db
+from database.pool import ThreadConnection
+from database.write_queue import WriteQueue
+
+
+def insert(number):
+    def write(conn):
+        return conn.execute('''
+            INSERT INTO accounts (number, isActive, address, ownerFullName, propertySquare, residentsCount, companyName)
+            VALUES (?, 1, 'Main st', 'Owner', 50, 2, 'Acme')
+        ''', (number,)).lastrowid
+    return write
+
+
+def fail_with_constraint(conn):
+    conn.execute('INSERT INTO accounts (number) VALUES (NULL)')
+
+
+def break_transaction(conn):
+    conn.rollback()
+    raise RuntimeError('gave up')
+
+
+def drop_savepoint(conn):
+    # Leaves the writer nothing to roll back to, so the whole batch fails
+    conn.execute('RELEASE queued_write')
+    raise RuntimeError('gave up')
+
+
+def submit_together(writes):
+    """Submit writes from separate threads so the writer commits them as one batch."""
+    queue = WriteQueue(max_batch=len(writes), max_wait_ms=500)
+    outcomes = [None] * len(writes)
+
+    def submit(i):
+        try:
+            outcomes[i] = queue.submit(writes[i])
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(writes))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return queue, outcomes
+
+
+def stored_numbers():
+    with get_db() as conn:
+        return sorted(row['number'] for row in conn.execute('SELECT number FROM accounts'))
+
+
+@pytest.mark.parametrize('failing, error', [
+    (fail_with_constraint, sqlite3.IntegrityError),
+    (break_transaction, RuntimeError),
+])
+def test_failing_write_does_not_poison_its_batch(client, failing, error):
+    queue, outcomes = submit_together([insert('100001'), failing, insert('100002')])
+
+    assert queue.stats()['largest_batch'] == 3
+    assert isinstance(outcomes[1], error)
+    assert isinstance(outcomes[0], int) and isinstance(outcomes[2], int)
+    assert stored_numbers() == ['100001', '100002']
+
+
+def test_writer_survives_a_failed_rollback(client, monkeypatch):
+    original_rollback = ThreadConnection.rollback
+
+    def failing_rollback(conn):
+        if threading.current_thread().name == 'db-writer':
+            raise sqlite3.OperationalError('disk I/O error')
+        return original_rollback(conn)
+
+    monkeypatch.setattr(ThreadConnection, 'rollback', failing_rollback)
+    queue = WriteQueue(max_batch=1, max_wait_ms=0, timeout=5)
+
+    with pytest.raises(RuntimeError):
+        queue.submit(drop_savepoint)
+
+    assert isinstance(queue.submit(insert('100001')), int)
+    assert stored_numbers() == ['100001']
+
+
+def test_submit_gives_up_after_timeout(client):
+    queue = WriteQueue(max_batch=1, max_wait_ms=0, timeout=0.1)
+    release = threading.Event()
+
+    with pytest.raises(TimeoutError):
+        queue.submit(lambda conn: release.wait(5))
+    with pytest.raises(TimeoutError):
+        queue.submit(insert('100001'))
+
+    release.set()
+    queue.timeout = 5
+    queue.submit(insert('100002'))
+
+    # The write abandoned before the writer reached it was skipped
+    assert stored_numbers() == ['100002']
@@ -1,37 +1,63 @@
-import os
 import uuid
 import requests
-from flask import Flask, request, session, jsonify
+from flask import Flask, g, request, session, jsonify
 from flask_cors import CORS
 
+from auth.sessions import create_session_interface, create_shared_store, create_store
+from auth.tokens import RevocationList, TokenManager
 from config import Config
+from upstream.client import upstream, upstream_stats
+from upstream.cache import cached_get, invalidate, response_cache, single_flight, tag_generations
+from upstream.fanout import fan_out
+from upstream.streaming import stream_response
 
 app = Flask(__name__)
-app.secret_key = os.urandom(32)
+app.secret_key = Config.SECRET_KEY
+store = create_store()
+shared_store = create_shared_store(store)
+app.session_interface = create_session_interface(store)
+tag_generations.store = shared_store
 app.config.update(SESSION_COOKIE_SAMESITE=None, SESSION_COOKIE_SECURE=False)
 CORS(app, supports_credentials=Config.CORS_SUPPORTS_CREDENTIALS)
 
+tokens = TokenManager(Config.SECRET_KEY, Config.TOKEN_TTL, RevocationList(shared_store))
+
+def current_claims():
+    """Claims of the request's auth token (Bearer header or cookie), verified locally."""
+    if 'auth_claims' not in g:
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            token = header[len('Bearer '):]
+        else:
+            token = request.cookies.get(Config.TOKEN_COOKIE_NAME)
+        g.auth_claims = tokens.verify(token) if token else None
+    return g.auth_claims
+
+def current_user_id():
+    claims = current_claims()
+    if claims:
+        return claims['sub']
+    return session.get('user_id')
+
 def require_auth():
-    if 'user_id' not in session:
+    if current_user_id() is None:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
     return None
 
-@app.route('/api/payments/<int:payment_id>', methods=['GET'])
-def get_payment(payment_id):
+@app.route('/api/payments/<int:account_id>', methods=['GET'])
+def get_payment(account_id):
     auth_error = require_auth()
     if auth_error:
         return auth_error
     
-    payment_url = f"{Config.PAYMENT_SERVICE_URL}/api/payments/{payment_id}"
-    
     try:
-        response = requests.get(
-            payment_url,
-            headers={'Content-Type': 'application/json'},
-            timeout=10
+        content, status_code = cached_get(
+            current_user_id(), 'payment', f"/api/payments/{account_id}",
+            params=dict(request.args),
+            tags=["payments", f"payments:account:{account_id}"]
         )
         
-        return response.content, response.status_code, {'Content-Type': 'application/json'}
+        return content, status_code, {'Content-Type': 'application/json'}
         
     except requests.exceptions.RequestException:
         return jsonify({
@@ -39,23 +65,93 @@ def get_payment(payment_id):
             "message": "Payment service unavailable"
         }), 503
 
+@app.route('/api/payments/<int:payment_id>/status', methods=['GET'])
+def get_payment_status(payment_id):
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+
+    try:
+        response = upstream('payment').get(f"/api/payments/{payment_id}/status")
+        return response.content, response.status_code, {'Content-Type': 'application/json'}
+
+    except requests.exceptions.RequestException:
+        return jsonify({
+            "success": False,
+            "message": "Payment service unavailable"
+        }), 503
+
+@app.route('/api/payments/by-bill/<int:bill_id>', methods=['GET'])
+def get_payments_by_bill(bill_id):
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+
+    try:
+        response = upstream('payment').get(f"/api/payments/by-bill/{bill_id}")
+        return response.content, response.status_code, {'Content-Type': 'application/json'}
+
+    except requests.exceptions.RequestException:
+        return jsonify({
+            "success": False,
+            "message": "Payment service unavailable"
+        }), 503
+
+@app.route('/api/payments/registry', methods=['POST'])
+def payment_registry():
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+
+    try:
+        # Registries are relayed as they arrive instead of being buffered here
+        response = upstream('payment').request(
+            'POST',
+            "/api/payments/registry",
+            data=request.stream,
+            headers={'Content-Type': request.content_type or 'text/csv'},
+            timeout=Config.PAYMENTS_REGISTRY_TIMEOUT,
+            long_running=True
+        )
+        return response.content, response.status_code, {'Content-Type': 'application/json'}
+
+    except requests.exceptions.RequestException:
+        return jsonify({
+            "success": False,
+            "message": "Payment service unavailable"
+        }), 503
+
+    finally:
+        # A registry touches any number of accounts, and batches committed
+        # before a failure stay; bills are settled in the background
+        invalidate("payments")
+        invalidate("billing", Config.PAYMENT_CACHE_HOLD_SECONDS)
+
 @app.route('/api/payments', methods=['POST'])
 def payments():
     auth_error = require_auth()
     if auth_error:
         return auth_error
     
-    payment_url = f"{Config.PAYMENT_SERVICE_URL}/api/payments"
-    
+    data = request.get_json()
+
     try:
-        response = requests.post(
-            payment_url,
-            headers={'Content-Type': 'application/json'},
-            json=request.get_json(),
-            timeout=10
-        )
+        # Payment scopes idempotency keys to the calling user
+        headers = {'X-User-Id': str(current_user_id())}
+        if 'Idempotency-Key' in request.headers:
+            headers['Idempotency-Key'] = request.headers['Idempotency-Key']
+        response = upstream('payment').post("/api/payments", json=data, headers=headers)
+
+        if response.ok and data and data.get('account_id') is not None:
+            # The payment is processed and settled in the background; keep
+            # its account's bills and payments out of the cache meanwhile
+            invalidate(f"billing:account:{data['account_id']}", Config.PAYMENT_CACHE_HOLD_SECONDS)
+            invalidate(f"payments:account:{data['account_id']}", Config.PAYMENT_CACHE_HOLD_SECONDS)
         
-        return response.content, response.status_code, {'Content-Type': 'application/json'}
+        headers = {'Content-Type': 'application/json'}
+        if 'Idempotent-Replayed' in response.headers:
+            headers['Idempotent-Replayed'] = response.headers['Idempotent-Replayed']
+        return response.content, response.status_code, headers
         
     except requests.exceptions.RequestException:
         return jsonify({
@@ -70,19 +166,30 @@ def proxy_accounts(path):
     if auth_error:
         return auth_error
     
-    url = f"{Config.ACCOUNT_SERVICE_URL}/api/accounts"
+    url = "/api/accounts"
     if path:
         url += f"/{path}"
     
+    kwargs = {}
+    if request.method in ['POST', 'PUT', 'DELETE']:
+        # Bulk imports are relayed as they arrive instead of being buffered here
+        kwargs['data'] = request.stream if path == 'import' else request.get_data()
+        kwargs['headers'] = {'Content-Type': request.content_type or 'application/json'}
+    if path == 'import':
+        kwargs['timeout'] = Config.ACCOUNTS_IMPORT_TIMEOUT
+        kwargs['long_running'] = True
+
     try:
-        response = requests.request(
-            method=request.method,
-            url=url,
-            headers={'Content-Type': 'application/json'},
-            json=request.get_json() if request.method in ['POST', 'PUT'] else None,
+        response = upstream('account').request(
+            request.method,
+            url,
             params=dict(request.args) if request.method == 'GET' else None,
-            timeout=10
+            stream=Config.STREAMING_PROXY,
+            **kwargs
         )
+
+        if Config.STREAMING_PROXY:
+            return stream_response(response)
         
         return response.content, response.status_code, {'Content-Type': 'application/json'}
         
@@ -95,43 +202,89 @@ def proxy_billing(path):
     if auth_error:
         return auth_error
     
-    url = f"{Config.BILLING_SERVICE_URL}/api/billings"
+    url = "/api/billings"
     if path:
         url += f"/{path}"
     
     try:
-        response = requests.get(
-            url,
-            headers={'Content-Type': 'application/json'},
-            params=dict(request.args),
-            timeout=10
+        content, status_code = cached_get(
+            current_user_id(), 'billing', url, params=dict(request.args),
+            tags=["billing", f"billing:account:{request.args.get('account')}"]
         )
         
-        return response.content, response.status_code, {'Content-Type': 'application/json'}
+        return content, status_code, {'Content-Type': 'application/json'}
         
     except requests.exceptions.RequestException:
         return jsonify({"success": False, "message": "Billing service unavailable"}), 503
 
+@app.route('/api/reports/<path:path>', methods=['GET'])
+def proxy_reports(path):
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+
+    try:
+        response = upstream('report').get(
+            f"/api/reports/{path}",
+            params=dict(request.args),
+            stream=Config.STREAMING_PROXY
+        )
+
+        if Config.STREAMING_PROXY:
+            return stream_response(response)
+
+        return response.content, response.status_code, {'Content-Type': response.headers.get('Content-Type', 'application/json')}
+
+    except requests.exceptions.RequestException:
+        return jsonify({"success": False, "message": "Report service unavailable"}), 503
+
+@app.route('/api/dashboard', methods=['GET'])
+def dashboard():
+    """Profile, accounts, billing and payments fetched concurrently in one response."""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+
+    user_id = current_user_id()
+    account_id = request.args.get('account')
+    period = request.args.get('period', 6)
+
+    # Each request gets the dashboard's own timeout so a section that is given
+    # up on does not keep its fan-out thread and connection for much longer
+    timeout = Config.DASHBOARD_TIMEOUT
+    calls = {
+        'accounts': lambda: upstream('account').get(
+            "/api/accounts", params={'limit': Config.DASHBOARD_ACCOUNTS_LIMIT}, timeout=timeout
+        ),
+        'me': lambda: upstream('users').get(f"/api/users/{user_id}", timeout=timeout),
+    }
+    if account_id:
+        calls['billings'] = lambda: upstream('billing').get(
+            "/api/billings", params={'account': account_id, 'period': period}, timeout=timeout
+        )
+        calls['payments'] = lambda: upstream('payment').get(f"/api/payments/{account_id}", timeout=timeout)
+
+    sections = fan_out(calls, timeout=timeout)
+
+    return jsonify({
+        "success": True,
+        "partial": not all(section['success'] for section in sections.values()),
+        "data": sections
+    }), 200
+
 @app.route('/')
 def root():
     return jsonify({
         "success": True,
         "message": "Flask API is running",
-        "endpoints": ["/api/register", "/api/login", "/api/logout", "/api/profile"]
+        "endpoints": ["/api/register", "/api/login", "/api/logout", "/api/profile", "/api/dashboard"]
     })
 
 
 @app.route('/api/register', methods=['POST'])
 def register():
-    url = f"{Config.USERS_SERVICE_URL}/api/users"
-
     try:
-        response = requests.post(
-            url,
-            headers={'Content-Type': 'application/json'},
-            json=request.get_json(),
-            timeout=10
-        )
+        response = upstream('users').post("/api/users", json=request.get_json())
 
         return response.content, response.status_code, {'Content-Type': 'application/json'}
         
@@ -140,19 +293,13 @@ def register():
 
 @app.route('/api/login', methods=['POST'])
 def login():
-    url = f"{Config.USERS_SERVICE_URL}/api/users"
     json_data = request.get_json()
 
     email = json_data.get('email')
     password = json_data.get('password')
 
     try:
-        response = requests.get(
-            url,
-            headers={'Content-Type': 'application/json'},
-            params=dict(email=email, password=password),
-            timeout=10
-        )
+        response = upstream('users').get("/api/users", params=dict(email=email, password=password))
 
         response.encoding = 'utf-8'
 
@@ -160,9 +307,24 @@ def login():
             response_data = response.json()
             user = response_data.get('data')
             session.clear()
+            # Server-side sessions get a new id; cookie sessions have none to fix
+            if hasattr(session, 'regenerate'):
+                session.regenerate()
             session.update(user_id=user['id'], session_token=str(uuid.uuid4()))
+            invalidate(f"users:{user['id']}")
 
-            return jsonify(response_data), 200
+            token = tokens.issue(user)
+            login_response = jsonify({**response_data, "token": token})
+            login_response.set_cookie(
+                Config.TOKEN_COOKIE_NAME,
+                token,
+                max_age=Config.TOKEN_TTL,
+                httponly=True,
+                samesite=app.config['SESSION_COOKIE_SAMESITE'],
+                secure=app.config['SESSION_COOKIE_SECURE']
+            )
+
+            return login_response, 200
 
         else:
             return jsonify({"success": False, "message": "Invalid credentials"}), 401
@@ -170,10 +332,30 @@ def login():
     except requests.exceptions.RequestException:
         return jsonify({"success": False, "message": "Service unavailable"}), 503
 
+@app.route('/api/upstreams/stats', methods=['GET'])
+def upstreams_stats():
+    return jsonify({"success": True, "data": upstream_stats()}), 200
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "success": True,
+        "data": {
+            "cache": response_cache.stats(),
+            "coalescing": single_flight.stats()
+        }
+    }), 200
+
 @app.route('/api/logout', methods=['POST'])
 def logout():
+    claims = current_claims()
+    if claims:
+        tokens.revoke(claims)
     session.clear()
-    return jsonify({"success": True}), 200
+
+    response = jsonify({"success": True})
+    response.delete_cookie(Config.TOKEN_COOKIE_NAME)
+    return response, 200
 
 
 @app.route('/api/me', methods=['GET'])
@@ -182,19 +364,17 @@ def me():
     if auth_error:
         return auth_error
 
-    url = f"{Config.USERS_SERVICE_URL}/api/users"
-    user_id = session.get('user_id')
-    if user_id:
-        url += f"/{user_id}"
-    
+    user_id = current_user_id()
+
     try:
-        response = requests.get(
-            url,
-            headers={'Content-Type': 'application/json'},
-            timeout=10
+        # Profile updates do not go through the gateway: the short TTL bounds
+        # how stale a profile can get, and logging in fetches it again
+        content, status_code = cached_get(
+            user_id, 'users', f"/api/users/{user_id}",
+            tags=[f"users:{user_id}"], ttl=Config.PROFILE_CACHE_TTL
         )
-        
-        return response.content, response.status_code, {'Content-Type': 'application/json'}
+
+        return content, status_code, {'Content-Type': 'application/json'}
         
     except requests.exceptions.RequestException:
         return jsonify({"success": False, "message": "Service unavailable"}), 503
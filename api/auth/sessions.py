@@ -0,0 +1,208 @@
+import sqlite3
+import threading
+import time
+import uuid
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from config import Config
+from upstream.cache import TTLCache
+
+serializer = TaggedJSONSerializer()
+
+
+class SqliteSessionStore:
+    """Session records in a SQLite file shared by every gateway worker on a node."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            sid TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)')
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._conn().execute(
+            'SELECT data FROM sessions WHERE sid = ? AND expires_at > ?',
+            (sid, time.time())
+        ).fetchone()
+        return serializer.loads(row[0]) if row else None
+
+    def set(self, sid, data, ttl):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)',
+            (sid, serializer.dumps(data), time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),))
+        conn.commit()
+
+    def delete(self, sid):
+        conn = self._conn()
+        conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+        conn.commit()
+
+
+class RedisSessionStore:
+    """Session records in Redis or any server speaking the Redis protocol."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package") from e
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, sid):
+        raw = self.client.get(f"session:{sid}")
+        return serializer.loads(raw.decode('utf-8')) if raw else None
+
+    def set(self, sid, data, ttl):
+        self.client.setex(f"session:{sid}", int(ttl), serializer.dumps(data))
+
+    def delete(self, sid):
+        self.client.delete(f"session:{sid}")
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose data lives in a store; the cookie only carries its signed id."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Move the session to a fresh id, as on login, so an id planted before it is useless."""
+        if self.previous_sid is None and not self.new:
+            self.previous_sid = self.sid
+        self.sid = uuid.uuid4().hex
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by a shared store with a short in-process cache.
+
+    Lookups are cached for `cache_ttl` seconds, so a session changed on
+    another worker may be seen stale on this one for at most that long.
+    """
+
+    def __init__(self, store, ttl, cache_ttl):
+        self.store = store
+        self.ttl = ttl
+        self.cache = TTLCache(max_entries=Config.SESSION_CACHE_MAX_ENTRIES, max_bytes=float('inf'), ttl=cache_ttl)
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='logora-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('utf-8')
+            except BadSignature:
+                sid = None
+
+            if sid:
+                data = self.cache.get(sid)
+                if data is None:
+                    data = self.store.get(sid)
+                    if data is not None:
+                        self.cache.set(sid, data)
+                if data is not None:
+                    return ServerSideSession(dict(data), sid=sid)
+
+        return ServerSideSession(sid=uuid.uuid4().hex, new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.previous_sid is not None:
+            self.store.delete(session.previous_sid)
+            self.cache.delete(session.previous_sid)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                self.cache.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified:
+            self.store.set(session.sid, dict(session), self.ttl)
+            self.cache.set(session.sid, dict(session))
+
+        if session.modified or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode('utf-8'),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+def create_store():
+    """Shared key-value store for Config.SESSION_BACKEND, or None for cookie sessions."""
+    backend = Config.SESSION_BACKEND
+    if backend == 'cookie':
+        return None
+    if backend == 'sqlite':
+        return SqliteSessionStore(Config.SESSION_DATABASE_PATH)
+    if backend == 'redis':
+        return RedisSessionStore(Config.SESSION_REDIS_URL)
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+
+def create_shared_store(store):
+    """Store that every gateway worker can read, for state that must not stay per process.
+
+    This is the session store when one is configured. With cookie sessions
+    it is a SQLite file, which only the workers of one node share, so
+    replicas on several nodes need SESSION_BACKEND=redis.
+    """
+    if store is not None:
+        return store
+    return SqliteSessionStore(Config.SHARED_STATE_DATABASE_PATH)
+
+
+def create_session_interface(store):
+    """Build the session interface for the configured backend."""
+    if store is None:
+        return SecureCookieSessionInterface()
+    return ServerSideSessionInterface(store, Config.SESSION_TTL, Config.SESSION_CACHE_TTL)
@@ -0,0 +1,67 @@
+import time
+import uuid
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from config import Config
+from upstream.cache import TTLCache
+
+
+class RevocationList:
+    """Token ids revoked before expiry (logout).
+
+    Entries go to a store every worker reads (see create_shared_store),
+    so a token logged out on one worker is refused by all of them. This
+    worker also remembers its own revocations in memory. Each entry only
+    lives as long as the token it revokes.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.local = TTLCache(max_entries=Config.TOKEN_REVOCATION_MAX_ENTRIES, max_bytes=float('inf'), ttl=Config.TOKEN_TTL)
+
+    def revoke(self, jti, ttl):
+        if ttl <= 0:
+            return
+        self.local.set(jti, True, ttl=ttl)
+        self.store.set(f"revoked:{jti}", {'revoked': True}, ttl)
+
+    def is_revoked(self, jti):
+        if self.local.get(jti):
+            return True
+        return self.store.get(f"revoked:{jti}") is not None
+
+
+class TokenManager:
+    """Issues and verifies signed, expiring auth tokens.
+
+    Tokens carry only the user id, never the profile, so a profile change
+    is visible once /api/me's short-lived cache entry expires instead of
+    when the token does.
+    """
+
+    def __init__(self, secret_key, ttl, revocations):
+        self.ttl = ttl
+        self.revocations = revocations
+        self.serializer = URLSafeTimedSerializer(secret_key, salt='logora-auth-token')
+
+    def issue(self, user):
+        claims = {
+            'sub': user['id'],
+            'jti': uuid.uuid4().hex,
+        }
+        return self.serializer.dumps(claims)
+
+    def verify(self, token):
+        """Return the token's claims, or None if it is forged, expired or revoked."""
+        try:
+            claims, issued_at = self.serializer.loads(token, max_age=self.ttl, return_timestamp=True)
+        except BadSignature:
+            return None
+        if self.revocations.is_revoked(claims.get('jti')):
+            return None
+        claims['exp'] = issued_at.timestamp() + self.ttl
+        return claims
+
+    def revoke(self, claims):
+        self.revocations.revoke(claims['jti'], claims['exp'] - time.time())
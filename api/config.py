@@ -1,5 +1,56 @@
 import os
 
+
+def _breaker(prefix, slow_call_seconds=2):
+    """Circuit breaker thresholds for one upstream.
+
+    <PREFIX>_BREAKER_* overrides the BREAKER_* value shared by all upstreams.
+    """
+    def setting(name, default):
+        return os.environ.get(f'{prefix}_BREAKER_{name}', os.environ.get(f'BREAKER_{name}', default))
+
+    return {
+        'window': int(setting('WINDOW', 20)),
+        'min_calls': int(setting('MIN_CALLS', 10)),
+        'failure_rate': float(setting('FAILURE_RATE', 0.5)),
+        'slow_call_seconds': float(setting('SLOW_CALL_SECONDS', slow_call_seconds)),
+        'slow_call_rate': float(setting('SLOW_CALL_RATE', 0.8)),
+        'open_seconds': float(setting('OPEN_SECONDS', 30)),
+        'half_open_calls': int(setting('HALF_OPEN_CALLS', 3)),
+    }
+
+
+def _balancer(prefix):
+    """Replica selection and passive health checking for one upstream."""
+    return {
+        'strategy': os.environ.get(f'{prefix}_BALANCER', 'p2c'),  # p2c | least_outstanding
+        'eject_failures': int(os.environ.get(f'{prefix}_EJECT_FAILURES', 5)),
+        'eject_seconds': float(os.environ.get(f'{prefix}_EJECT_SECONDS', 30)),
+        'probe_interval': float(os.environ.get(f'{prefix}_PROBE_INTERVAL', 10)),
+        'probe_path': os.environ.get(f'{prefix}_PROBE_PATH', '/health'),
+    }
+
+
+def _upstream(prefix, url, pool_size=10, slow_call_seconds=2):
+    """Connection settings for one downstream service, overridable per service.
+
+    <PREFIX>_SERVICE_URLS may list several comma-separated replicas; the
+    single <PREFIX>_SERVICE_URL is used otherwise.
+    """
+    urls = os.environ.get(f'{prefix}_SERVICE_URLS', '')
+    return {
+        'urls': [u.strip() for u in urls.split(',') if u.strip()] or [url],
+        'pool_size': int(os.environ.get(f'{prefix}_POOL_SIZE', pool_size)),
+        'pool_block': os.environ.get(f'{prefix}_POOL_BLOCK', 'True').lower() == 'true',
+        'timeout': float(os.environ.get(f'{prefix}_TIMEOUT', 10)),
+        'retries': int(os.environ.get(f'{prefix}_RETRIES', 0)),
+        'max_concurrent': int(os.environ.get(f'{prefix}_MAX_CONCURRENT', pool_size * 2)),
+        'max_wait': float(os.environ.get(f'{prefix}_MAX_WAIT', 0)),
+        'breaker': _breaker(prefix, slow_call_seconds),
+        'balancer': _balancer(prefix),
+    }
+
+
 class Config:
     HOST = os.environ.get('FLASK_HOST', '0.0.0.0')
     PORT = int(os.environ.get('FLASK_PORT', 5000))
@@ -8,4 +59,58 @@ class Config:
     BILLING_SERVICE_URL = os.environ.get('BILLING_SERVICE_URL', 'http://billing:5000')
     PAYMENT_SERVICE_URL = os.getenv('PAYMENT_SERVICE_URL', 'http://payment:5000')
     USERS_SERVICE_URL = os.environ.get('USERS_SERVICE_URL', 'http://users:5000')
+    REPORT_SERVICE_URL = os.environ.get('REPORT_SERVICE_URL', 'http://report:5000')
     CORS_SUPPORTS_CREDENTIALS = True
+
+    # Sessions must be signed with the same key by every worker and replica
+    SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cookie')  # cookie | sqlite | redis
+    SESSION_DATABASE_PATH = os.environ.get('SESSION_DATABASE_PATH', 'sessions.db')
+    SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_TTL = int(os.environ.get('SESSION_TTL', 7 * 24 * 3600))
+    SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', 5))
+    SESSION_CACHE_MAX_ENTRIES = int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', 10000))
+    # Revocations and other cross-worker state when SESSION_BACKEND=cookie
+    SHARED_STATE_DATABASE_PATH = os.environ.get('SHARED_STATE_DATABASE_PATH', 'gateway_state.db')
+
+    # Signed auth tokens verified locally by the gateway
+    TOKEN_TTL = int(os.environ.get('TOKEN_TTL', 12 * 3600))
+    TOKEN_COOKIE_NAME = os.environ.get('TOKEN_COOKIE_NAME', 'auth_token')
+    TOKEN_REVOCATION_MAX_ENTRIES = int(os.environ.get('TOKEN_REVOCATION_MAX_ENTRIES', 100000))
+
+    # Keep-alive connection pools, one per downstream service
+    UPSTREAMS = {
+        'account': _upstream('ACCOUNT', ACCOUNT_SERVICE_URL),
+        'billing': _upstream('BILLING', BILLING_SERVICE_URL, pool_size=20),
+        'payment': _upstream('PAYMENT', PAYMENT_SERVICE_URL),
+        'users': _upstream('USERS', USERS_SERVICE_URL, pool_size=20),
+        # Report exports legitimately take longer than the other reads
+        'report': _upstream('REPORT', REPORT_SERVICE_URL, slow_call_seconds=10),
+    }
+
+    # Bulk account imports: (connect, read) timeout for the upstream call
+    ACCOUNTS_IMPORT_TIMEOUT = (5, float(os.environ.get('ACCOUNTS_IMPORT_TIMEOUT', 600)))
+    # Bank payment registries: (connect, read) timeout for the upstream call
+    PAYMENTS_REGISTRY_TIMEOUT = (5, float(os.environ.get('PAYMENTS_REGISTRY_TIMEOUT', 600)))
+
+    # Relay large upstream bodies chunk by chunk instead of buffering them
+    STREAMING_PROXY = os.environ.get('STREAMING_PROXY', 'True').lower() == 'true'
+    STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 64 * 1024))
+
+    # Concurrent fan-out for aggregate endpoints such as /api/dashboard
+    FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', 32))
+    DASHBOARD_TIMEOUT = float(os.environ.get('DASHBOARD_TIMEOUT', 5))
+    # First page of accounts shown on the dashboard
+    DASHBOARD_ACCOUNTS_LIMIT = int(os.environ.get('DASHBOARD_ACCOUNTS_LIMIT', 20))
+
+    # Response cache for read-mostly GETs (billing, payment history, profile)
+    CACHE_TTL = float(os.environ.get('CACHE_TTL', 30))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    # Profiles change outside the gateway, so /api/me is only cached briefly
+    PROFILE_CACHE_TTL = float(os.environ.get('PROFILE_CACHE_TTL', 10))
+    # How long bills and payments stay uncached after a payment or registry is accepted
+    PAYMENT_CACHE_HOLD_SECONDS = float(os.environ.get('PAYMENT_CACHE_HOLD_SECONDS', 60))
+
+    # gunicorn.conf.py: more threads than the services, as gateway requests mostly wait on upstreams
+    WEB_THREADS = 8
@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+import pytest
+
+# Config is read when the app is first imported; keep its state files out of the tree
+_state_dir = tempfile.mkdtemp()
+os.environ['SHARED_STATE_DATABASE_PATH'] = os.path.join(_state_dir, 'gateway_state.db')
+os.environ['SESSION_DATABASE_PATH'] = os.path.join(_state_dir, 'sessions.db')
+
+import app as gateway  # noqa: E402
+from upstream import cache  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(cache, 'response_cache', cache.TTLCache(100, 1 << 20, 60))
+    return gateway.app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+    return {'Authorization': f"Bearer {gateway.tokens.issue({'id': 7})}"}
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from upstream.balancer import LoadBalancer
+
+
+class ProbeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class ProbeSession:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        if self.status_code is None:
+            raise ConnectionError('down')
+        return ProbeResponse(self.status_code)
+
+
+def eject(balancer, url):
+    endpoint = next(e for e in balancer.endpoints if e.url == url)
+    for _ in range(balancer.eject_failures):
+        endpoint.outstanding += 1
+        balancer.release(endpoint, failed=True)
+    return endpoint
+
+
+def test_p2c_picks_the_less_busy_of_two():
+    balancer = LoadBalancer(['http://a', 'http://b'])
+    busy, idle = balancer.endpoints
+    busy.outstanding = 3
+
+    for _ in range(20):
+        endpoint = balancer.acquire()
+        assert endpoint is idle
+        balancer.release(endpoint, failed=False)
+
+
+def test_p2c_spreads_requests_over_replicas():
+    random.seed(0)
+    balancer = LoadBalancer(['http://a', 'http://b', 'http://c'])
+
+    for _ in range(30):
+        balancer.release(balancer.acquire(), failed=False)
+
+    assert all(endpoint.requests > 0 for endpoint in balancer.endpoints)
+    assert all(endpoint.outstanding == 0 for endpoint in balancer.endpoints)
+
+
+def test_ejected_after_eject_failures_in_a_row():
+    balancer = LoadBalancer(['http://a', 'http://b'], eject_failures=3)
+    endpoint = balancer.endpoints[0]
+
+    for _ in range(2):
+        endpoint.outstanding += 1
+        balancer.release(endpoint, failed=True)
+    endpoint.outstanding += 1
+    balancer.release(endpoint, failed=False)
+    for _ in range(2):
+        endpoint.outstanding += 1
+        balancer.release(endpoint, failed=True)
+    assert endpoint.ejections == 0
+
+    endpoint.outstanding += 1
+    balancer.release(endpoint, failed=True)
+
+    assert endpoint.ejections == 1
+    assert all(balancer.acquire() is balancer.endpoints[1] for _ in range(10))
+
+
+def test_last_replica_is_never_ejected():
+    balancer = LoadBalancer(['http://a'], eject_failures=1)
+
+    endpoint = eject(balancer, 'http://a')
+
+    assert endpoint.ejections == 0
+    assert balancer.acquire() is endpoint
+
+
+def test_prober_readmits_healthy_replica():
+    balancer = LoadBalancer(['http://a', 'http://b'], eject_failures=2)
+    endpoint = eject(balancer, 'http://a')
+    session = ProbeSession(status_code=200)
+
+    balancer.probe(session)
+
+    assert session.urls == ['http://a/health']
+    assert balancer.snapshot()[0]['healthy']
+    assert endpoint.ejections == 1
+
+
+@pytest.mark.parametrize('status_code', [503, None])
+def test_failed_probe_keeps_replica_out_without_counting_an_ejection(status_code):
+    balancer = LoadBalancer(['http://a', 'http://b'], eject_failures=2)
+    endpoint = eject(balancer, 'http://a')
+    ejected_until = endpoint.ejected_until
+
+    balancer.probe(ProbeSession(status_code=status_code))
+
+    assert not balancer.snapshot()[0]['healthy']
+    assert endpoint.ejected_until >= ejected_until
+    assert endpoint.ejections == 1
@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+import config
+from upstream.client import UpstreamClient
+
+
+class SlowResponse:
+    status_code = 200
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = UpstreamClient('account', ['http://account'], breaker={'min_calls': 2, 'window': 2, 'slow_call_seconds': 0.01})
+
+    def slow_request(method, url, **kwargs):
+        time.sleep(0.02)
+        return SlowResponse()
+
+    monkeypatch.setattr(client.session, 'request', slow_request)
+    return client
+
+
+def test_slow_calls_count_against_breaker(client):
+    client.post('/api/accounts')
+    client.post('/api/accounts')
+
+    assert client.breaker.snapshot()['state'] == 'open'
+
+
+def test_long_running_calls_are_not_slow(client):
+    client.post('/api/accounts/import', long_running=True)
+    client.post('/api/accounts/import', long_running=True)
+
+    assert client.breaker.snapshot()['state'] == 'closed'
+    assert client.breaker.snapshot()['slow_calls'] == 0
+
+
+def test_per_upstream_threshold_overrides_shared_one(monkeypatch):
+    monkeypatch.setenv('BREAKER_SLOW_CALL_SECONDS', '3')
+    monkeypatch.setenv('REPORT_BREAKER_SLOW_CALL_SECONDS', '20')
+
+    assert config._breaker('REPORT')['slow_call_seconds'] == 20
+    assert config._breaker('BILLING')['slow_call_seconds'] == 3
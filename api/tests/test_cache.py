@@ -0,0 +1,76 @@
+import pytest
+
+from auth.sessions import SqliteSessionStore
+from upstream import cache
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+        self.status_code = 200
+
+
+class FakeUpstream:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, path, params=None):
+        self.calls += 1
+        return FakeResponse(f"v{self.calls}".encode())
+
+
+@pytest.fixture
+def fake_upstream(tmp_path, monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(cache, 'upstream', lambda name: fake)
+    monkeypatch.setattr(cache, 'response_cache', cache.TTLCache(100, 1 << 20, 60))
+    monkeypatch.setattr(cache.tag_generations, 'store', SqliteSessionStore(str(tmp_path / 'state.db')))
+    return fake
+
+
+def test_cached_until_invalidated(fake_upstream):
+    tags = ['billing:account:1']
+
+    assert cache.cached_get(1, 'billing', '/api/billings/1', tags=tags) == (b'v1', 200)
+    assert cache.cached_get(1, 'billing', '/api/billings/1', tags=tags) == (b'v1', 200)
+
+    cache.invalidate('billing:account:1')
+
+    assert cache.cached_get(1, 'billing', '/api/billings/1', tags=tags) == (b'v2', 200)
+    assert fake_upstream.calls == 2
+
+
+def test_invalidation_by_another_worker(fake_upstream, tmp_path):
+    tags = ['billing:account:1']
+    other_worker = cache.TagGenerations(60, SqliteSessionStore(str(tmp_path / 'state.db')))
+    cache.cached_get(1, 'billing', '/api/billings/1', tags=tags)
+
+    other_worker.bump('billing:account:1')
+
+    assert cache.cached_get(1, 'billing', '/api/billings/1', tags=tags) == (b'v2', 200)
+
+
+def test_fetch_overlapping_invalidation_is_not_cached(fake_upstream, monkeypatch):
+    tags = ['billing:account:1']
+    original_get = fake_upstream.get
+
+    def get_then_invalidate(path, params=None):
+        response = original_get(path, params)
+        cache.invalidate('billing:account:1')
+        return response
+
+    monkeypatch.setattr(fake_upstream, 'get', get_then_invalidate)
+    assert cache.cached_get(1, 'billing', '/api/billings/1', tags=tags) == (b'v1', 200)
+    monkeypatch.setattr(fake_upstream, 'get', original_get)
+
+    assert cache.cached_get(1, 'billing', '/api/billings/1', tags=tags) == (b'v2', 200)
+
+
+def test_held_tag_is_not_cached(fake_upstream):
+    tags = ['payments:account:1']
+    cache.invalidate('payments:account:1', hold_seconds=60)
+
+    cache.cached_get(1, 'payment', '/api/payments/1', tags=tags)
+    cache.cached_get(1, 'payment', '/api/payments/1', tags=tags)
+
+    assert fake_upstream.calls == 2
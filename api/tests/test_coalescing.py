@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from auth.sessions import SqliteSessionStore
+from upstream import cache
+from upstream.coalescing import SingleFlight
+
+CALLERS = 8
+
+
+class FakeResponse:
+    content = b'accounts'
+    status_code = 200
+
+
+def wait_for_waiters(single_flight, count):
+    deadline = time.monotonic() + 5
+    while single_flight.stats()['coalesced'] < count:
+        assert time.monotonic() < deadline, 'callers never joined the call in flight'
+        time.sleep(0.001)
+
+
+def run_concurrently(target):
+    results = [None] * CALLERS
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+@pytest.fixture
+def single_flight(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'single_flight', SingleFlight())
+    monkeypatch.setattr(cache, 'response_cache', cache.TTLCache(100, 1 << 20, 60))
+    monkeypatch.setattr(cache.tag_generations, 'store', SqliteSessionStore(str(tmp_path / 'state.db')))
+    return cache.single_flight
+
+
+def test_concurrent_misses_share_one_upstream_call(single_flight, monkeypatch):
+    calls = []
+
+    class SlowUpstream:
+        def get(self, path, params=None):
+            calls.append(path)
+            wait_for_waiters(single_flight, CALLERS - 1)
+            return FakeResponse()
+
+    monkeypatch.setattr(cache, 'upstream', lambda name: SlowUpstream())
+
+    results = run_concurrently(lambda: cache.cached_get(7, 'account', '/api/accounts'))
+
+    assert results == [(b'accounts', 200)] * CALLERS
+    assert calls == ['/api/accounts']
+    assert single_flight.stats() == {'executed': 1, 'coalesced': CALLERS - 1, 'in_flight': 0}
+
+
+def test_leader_error_reaches_every_waiter(single_flight):
+    error = ConnectionError('account service down')
+
+    def failing_call():
+        wait_for_waiters(single_flight, CALLERS - 1)
+        raise error
+
+    results = run_concurrently(lambda: single_flight.do('accounts', failing_call))
+
+    assert results == [error] * CALLERS
+    assert single_flight.stats() == {'executed': 1, 'coalesced': CALLERS - 1, 'in_flight': 0}
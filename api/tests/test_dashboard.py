@@ -0,0 +1,81 @@
+import json
+import threading
+
+import pytest
+import requests
+
+import app as gateway
+from config import Config
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.content = json.dumps(body).encode()
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeUpstream:
+    def __init__(self, name, upstreams):
+        self.name = name
+        self.upstreams = upstreams
+
+    def get(self, path, params=None, timeout=None):
+        self.upstreams.calls.append((self.name, path, params))
+        self.upstreams.timeouts.append(timeout)
+        behaviour = self.upstreams.behaviour.get(self.name)
+        if behaviour == 'fail':
+            raise requests.exceptions.ConnectionError('down')
+        if behaviour == 'slow':
+            self.upstreams.release.wait(5)
+        return FakeResponse({'success': True, 'data': self.name})
+
+
+class FakeUpstreams:
+    def __init__(self):
+        self.calls = []
+        self.timeouts = []
+        self.behaviour = {}
+        self.release = threading.Event()
+
+    def __call__(self, name):
+        return FakeUpstream(name, self)
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    fake = FakeUpstreams()
+    monkeypatch.setattr(gateway, 'upstream', fake)
+    monkeypatch.setattr(Config, 'DASHBOARD_TIMEOUT', 0.2)
+    yield fake
+    fake.release.set()
+
+
+def test_accounts_section_asks_for_one_page(client, auth_headers, upstreams):
+    body = client.get('/api/dashboard', headers=auth_headers).get_json()
+
+    assert body['partial'] is False
+    assert ('account', '/api/accounts', {'limit': Config.DASHBOARD_ACCOUNTS_LIMIT}) in upstreams.calls
+
+
+def test_slow_and_failing_sections_do_not_fail_the_dashboard(client, auth_headers, upstreams):
+    upstreams.behaviour = {'billing': 'slow', 'users': 'fail'}
+
+    response = client.get('/api/dashboard', headers=auth_headers, query_string={'account': 1})
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['partial'] is True
+    assert body['data']['billings'] == {'success': False, 'message': 'Service timed out'}
+    assert body['data']['me'] == {'success': False, 'message': 'Service unavailable'}
+    assert body['data']['accounts'] == {'success': True, 'data': 'account'}
+    assert body['data']['payments'] == {'success': True, 'data': 'payment'}
+
+
+def test_every_section_request_is_bounded_by_the_dashboard_timeout(client, auth_headers, upstreams):
+    client.get('/api/dashboard', headers=auth_headers, query_string={'account': 1})
+
+    assert upstreams.timeouts == [Config.DASHBOARD_TIMEOUT] * 4
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import app as gateway
+from upstream import cache
+
+PROFILE = {'id': 7, 'email': 'user@example.com', 'name': 'User'}
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.content = json.dumps(body).encode()
+        self.status_code = 200
+        self.encoding = None
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeUsers:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, path, params=None):
+        self.calls += 1
+        return FakeResponse({'success': True, 'data': PROFILE})
+
+
+@pytest.fixture
+def users(monkeypatch):
+    fake = FakeUsers()
+    monkeypatch.setattr(cache, 'upstream', lambda name: fake)
+    monkeypatch.setattr(gateway, 'upstream', lambda name: fake)
+    return fake
+
+
+def test_second_profile_read_is_served_from_cache(client, auth_headers, users):
+    first = client.get('/api/me', headers=auth_headers)
+    second = client.get('/api/me', headers=auth_headers)
+
+    assert first.get_json() == second.get_json() == {'success': True, 'data': PROFILE}
+    assert users.calls == 1
+
+
+def test_login_fetches_the_profile_again(client, auth_headers, users):
+    client.get('/api/me', headers=auth_headers)
+
+    client.post('/api/login', json={'email': 'user@example.com', 'password': 'secret'})
+    client.get('/api/me', headers=auth_headers)
+
+    assert users.calls == 3
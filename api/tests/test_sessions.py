@@ -0,0 +1,36 @@
+from flask import Flask, session
+
+from auth.sessions import ServerSideSessionInterface, SqliteSessionStore
+
+
+def make_app(store):
+    app = Flask(__name__)
+    app.secret_key = 'secret'
+    app.session_interface = ServerSideSessionInterface(store, ttl=3600, cache_ttl=5)
+
+    @app.route('/visit')
+    def visit():
+        session['visits'] = session.get('visits', 0) + 1
+        return session.sid
+
+    @app.route('/login')
+    def login():
+        session.clear()
+        session.regenerate()
+        session.update(user_id=7)
+        return session.sid
+
+    return app
+
+
+def test_login_moves_session_to_new_id(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / 'sessions.db'))
+    client = make_app(store).test_client()
+    planted_sid = client.get('/visit').get_data(as_text=True)
+
+    new_sid = client.get('/login').get_data(as_text=True)
+
+    assert new_sid != planted_sid
+    assert store.get(planted_sid) is None
+    assert store.get(new_sid) == {'user_id': 7}
+    assert client.get('/visit').get_data(as_text=True) == new_sid
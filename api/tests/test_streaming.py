@@ -0,0 +1,34 @@
+from flask import Flask
+from urllib3.exceptions import ProtocolError
+
+from upstream.streaming import stream_response
+
+
+class BrokenRaw:
+    def stream(self, chunk_size, decode_content=False):
+        yield b'first'
+        raise ProtocolError('Connection broken')
+
+
+class FakeResponse:
+    url = 'http://report/api/reports/export'
+    status_code = 200
+    headers = {'Content-Type': 'text/csv'}
+
+    def __init__(self):
+        self.raw = BrokenRaw()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_interrupted_upstream_ends_body_and_closes(caplog):
+    upstream_response = FakeResponse()
+
+    with Flask(__name__).test_request_context():
+        body = b''.join(stream_response(upstream_response).response)
+
+    assert body == b'first'
+    assert upstream_response.closed
+    assert 'interrupted' in caplog.text
@@ -0,0 +1,36 @@
+from auth.sessions import SqliteSessionStore
+from auth.tokens import RevocationList, TokenManager
+
+USER = {'id': 7, 'email': 'user@example.com', 'name': 'User', 'is_admin': 0}
+
+
+def make_manager(path):
+    return TokenManager('secret', 3600, RevocationList(SqliteSessionStore(path)))
+
+
+def test_token_carries_no_profile(tmp_path):
+    tokens = make_manager(str(tmp_path / 'state.db'))
+
+    claims = tokens.verify(tokens.issue(USER))
+
+    assert claims['sub'] == 7
+    assert 'profile' not in claims
+
+
+def test_revocation_is_seen_by_other_workers(tmp_path):
+    path = str(tmp_path / 'state.db')
+    worker_a = make_manager(path)
+    worker_b = make_manager(path)
+    token = worker_a.issue(USER)
+
+    worker_a.revoke(worker_a.verify(token))
+
+    assert worker_a.verify(token) is None
+    assert worker_b.verify(token) is None
+
+
+def test_forged_token_is_refused(tmp_path):
+    tokens = make_manager(str(tmp_path / 'state.db'))
+    token = tokens.issue(USER)
+
+    assert tokens.verify(token[:-2] + 'xx') is None
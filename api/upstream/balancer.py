@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+
+
+class Endpoint:
+    """One replica of a downstream service and its live counters."""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def available(self, now):
+        return self.ejected_until <= now
+
+    def snapshot(self, now):
+        return {
+            'url': self.url,
+            'healthy': self.available(now),
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'failures': self.failures,
+            'ejections': self.ejections,
+        }
+
+
+class LoadBalancer:
+    """Picks a replica per request and ejects replicas that keep failing.
+
+    `strategy` is 'p2c' (power of two choices: the less busy of two
+    random replicas) or 'least_outstanding' (the least busy of all).
+    After `eject_failures` consecutive failures a replica is skipped for
+    `eject_seconds`; the prober may reinstate it earlier. If every
+    replica is ejected, all of them are tried again rather than failing.
+    """
+
+    def __init__(self, urls, strategy='p2c', eject_failures=5, eject_seconds=30,
+                 probe_interval=10, probe_path='/health'):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.strategy = strategy
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self.probe_interval = probe_interval
+        self.probe_path = probe_path
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def acquire(self):
+        """Choose an endpoint and count the request as outstanding on it."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.available(now)] or self.endpoints
+            if len(candidates) == 1:
+                endpoint = candidates[0]
+            elif self.strategy == 'least_outstanding':
+                endpoint = min(candidates, key=lambda e: e.outstanding)
+            else:
+                first, second = random.sample(candidates, 2)
+                endpoint = first if first.outstanding <= second.outstanding else second
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint, failed):
+        """Finish a request on an endpoint, ejecting it after repeated failures."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if not failed:
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.eject_failures and len(self.endpoints) > 1:
+                self._eject(endpoint)
+
+    def _eject(self, endpoint):
+        self._hold(endpoint)
+        endpoint.ejections += 1
+
+    def _hold(self, endpoint):
+        """Keep an endpoint out of rotation for another eject_seconds."""
+        endpoint.ejected_until = time.monotonic() + self.eject_seconds
+        endpoint.consecutive_failures = 0
+
+    def probe(self, session, timeout=2):
+        """Check ejected endpoints; any non-5xx answer puts one back in rotation."""
+        now = time.monotonic()
+        with self._lock:
+            ejected = [e for e in self.endpoints if not e.available(now)]
+
+        for endpoint in ejected:
+            try:
+                healthy = session.get(f"{endpoint.url}{self.probe_path}", timeout=timeout).status_code < 500
+            except Exception:
+                healthy = False
+            with self._lock:
+                if healthy:
+                    endpoint.ejected_until = 0.0
+                else:
+                    self._hold(endpoint)
+
+    def start_prober(self, session):
+        """Run probe() every probe_interval seconds in a daemon thread."""
+        if self._prober is not None or self.probe_interval <= 0 or len(self.endpoints) < 2:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.probe_interval)
+                self.probe(session)
+
+        self._prober = threading.Thread(target=run, name='upstream-prober', daemon=True)
+        self._prober.start()
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return [endpoint.snapshot(now) for endpoint in self.endpoints]
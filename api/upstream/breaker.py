@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+
+class UpstreamRejected(requests.exceptions.RequestException):
+    """Call refused by the gateway without reaching the upstream."""
+
+
+class CircuitOpenError(UpstreamRejected):
+    """The upstream's circuit breaker is open."""
+
+
+class BulkheadFullError(UpstreamRejected):
+    """Too many requests are already in flight to the upstream."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by failure and slow-call rates.
+
+    Outcomes of the last `window` calls are kept. Once at least
+    `min_calls` are recorded and either rate reaches its threshold the
+    breaker opens and rejects calls for `open_seconds`. It then lets
+    `half_open_calls` trial calls through: all of them must succeed
+    quickly to close it again, any failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window=20, min_calls=10, failure_rate=0.5, slow_call_seconds=2.0,
+                 slow_call_rate=0.8, open_seconds=30, half_open_calls=3):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # (failed, slow)
+        self.state = self.CLOSED
+        self.opened_at = None
+        self._trial_in_flight = 0
+        self._trial_successes = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def acquire(self):
+        """Reserve permission for one call or raise CircuitOpenError."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError("Circuit breaker is open")
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = 0
+                self._trial_successes = 0
+
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError("Circuit breaker is half-open")
+                self._trial_in_flight += 1
+
+    def record(self, failed, elapsed):
+        """Report the outcome of a call admitted by acquire()."""
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight -= 1
+                if failed or slow:
+                    self._open()
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self.state = self.CLOSED
+                        self._outcomes.clear()
+                return
+
+            if self.state == self.OPEN:
+                return
+
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, s in self._outcomes if s)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+
+    def snapshot(self):
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'calls': calls,
+                'failures': sum(1 for f, _ in self._outcomes if f),
+                'slow_calls': sum(1 for _, s in self._outcomes if s),
+                'rejected': self.rejected,
+                'times_opened': self.times_opened,
+            }
+
+
+class Bulkhead:
+    """Caps the number of concurrent calls to one upstream."""
+
+    def __init__(self, max_concurrent, max_wait=0):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """Take a slot, waiting at most max_wait seconds, or raise BulkheadFullError."""
+        if self.max_wait:
+            acquired = self._semaphore.acquire(timeout=self.max_wait)
+        else:
+            acquired = self._semaphore.acquire(blocking=False)
+
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise BulkheadFullError("Too many concurrent upstream requests")
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+            }
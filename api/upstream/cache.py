@@ -0,0 +1,190 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from config import Config
+from upstream.client import upstream
+from upstream.coalescing import SingleFlight
+
+
+class TTLCache:
+    """In-process LRU cache with per-entry expiry, size budget and tag invalidation."""
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size, expires_at, tags)
+        self._tags = defaultdict(set)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value or None, refreshing its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size=1, tags=(), ttl=None):
+        """Store a value, evicting least recently used entries to stay in budget."""
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at, tuple(tags))
+            self.bytes += size
+            for tag in tags:
+                self._tags[tag].add(key)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, tag):
+        """Drop every entry stored under the given tag."""
+        with self._lock:
+            keys = self._tags.pop(tag, ())
+            for key in list(keys):
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, size, _, tags = self._entries.pop(key)
+        self.bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+class TagGenerations:
+    """Current generation of each cache tag, kept in a store every worker reads.
+
+    bump() gives a tag a fresh random generation. Cached responses remember
+    the generations they were fetched under and are ignored once one has
+    changed, so an invalidation on one worker reaches every worker. A
+    generation outlives the entries cached under it; once it expires it
+    reads as None, which can only make older entries look stale. A bump
+    can also hold a tag for a while, during which nothing under it is
+    cached, for data that keeps changing after the write that bumped it.
+    """
+
+    def __init__(self, ttl, store=None):
+        self.ttl = ttl
+        self.store = store
+        self._lock = threading.Lock()
+        self._local = {}
+
+    def current(self, tags):
+        """Return (generations, held) for tags; held is True while one of them is held."""
+        now = time.time()
+        records = [self._get(tag) or {} for tag in tags]
+        generations = tuple(record.get('generation') for record in records)
+        held = any(record.get('held_until', 0) > now for record in records)
+        return generations, held
+
+    def bump(self, tag, hold_seconds=0):
+        record = {'generation': uuid.uuid4().hex}
+        if hold_seconds:
+            record['held_until'] = time.time() + hold_seconds
+        if self.store is None:
+            with self._lock:
+                self._local[tag] = record
+        else:
+            self.store.set(f"cache-generation:{tag}", record, max(self.ttl, hold_seconds))
+
+    def _get(self, tag):
+        if self.store is None:
+            with self._lock:
+                return self._local.get(tag)
+        return self.store.get(f"cache-generation:{tag}")
+
+
+response_cache = TTLCache(
+    max_entries=Config.CACHE_MAX_ENTRIES,
+    max_bytes=Config.CACHE_MAX_BYTES,
+    ttl=Config.CACHE_TTL,
+)
+
+# The app points this at its shared store so invalidations reach every worker
+tag_generations = TagGenerations(ttl=Config.CACHE_TTL * 2)
+
+single_flight = SingleFlight()
+
+
+def cached_get(user_id, name, path, params=None, tags=(), ttl=None):
+    """GET through the response cache; returns (content, status_code).
+
+    Only 200 responses are stored, for `ttl` seconds or CACHE_TTL. Entries
+    are keyed by user, upstream, path and query string and tagged so
+    writes can invalidate them.
+    Concurrent misses for the same upstream URL share one upstream call.
+    A response fetched while one of its tags was invalidated or is held
+    is returned but not stored, and later callers do not join that call.
+    """
+    query = tuple(sorted((params or {}).items()))
+    key = (user_id, name, path, query)
+    generations, held = tag_generations.current(tags)
+    cached = response_cache.get(key)
+    if cached is not None:
+        if cached[0] == generations:
+            return cached[1]
+        response_cache.delete(key)
+
+    def fetch():
+        response = upstream(name).get(path, params=params)
+        return response.content, response.status_code
+
+    result = single_flight.do((name, path, query, generations), fetch)
+    if result[1] == 200 and not held and tag_generations.current(tags) == (generations, False):
+        response_cache.set(key, (generations, result), size=len(result[0]), tags=tags, ttl=ttl)
+    return result
+
+
+def invalidate(tag, hold_seconds=0):
+    """Drop cached responses under a tag, on this worker and every other one.
+
+    With hold_seconds, responses under the tag are not cached again for
+    that long.
+    """
+    tag_generations.bump(tag, hold_seconds)
+    response_cache.invalidate(tag)
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config import Config
+from upstream.balancer import LoadBalancer
+from upstream.breaker import Bulkhead, CircuitBreaker
+
+
+class PoolStats:
+    """Thread-safe counters for one upstream connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.checkouts = 0
+        self.misses = 0
+        self.waits = 0
+
+    def incr(self, name, value=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'hits': self.checkouts - self.misses,
+                'misses': self.misses,
+                'waits': self.waits,
+            }
+
+
+def _instrumented(pool_cls, stats):
+    """Build a connection pool class that reports checkouts to stats."""
+
+    class InstrumentedPool(pool_cls):
+        def _get_conn(self, timeout=None):
+            if self.block and self.pool is not None and self.pool.empty():
+                stats.incr('waits')
+            stats.incr('checkouts')
+            return super()._get_conn(timeout=timeout)
+
+        def _new_conn(self):
+            stats.incr('misses')
+            return super()._new_conn()
+
+    return InstrumentedPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose keep-alive pools are instrumented with PoolStats."""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _instrumented(HTTPConnectionPool, self.stats),
+            'https': _instrumented(HTTPSConnectionPool, self.stats),
+        }
+
+
+class UpstreamClient:
+    """Keep-alive HTTP client for a downstream service and its replicas."""
+
+    def __init__(self, name, urls, pool_size=10, pool_block=True, timeout=10, retries=0,
+                 max_concurrent=50, max_wait=0, breaker=None, balancer=None):
+        self.name = name
+        self.timeout = timeout
+        self.balancer = LoadBalancer(urls, **(balancer or {}))
+        self.stats = PoolStats()
+        self.breaker = CircuitBreaker(**(breaker or {}))
+        self.bulkhead = Bulkhead(max_concurrent, max_wait)
+
+        adapter = PooledAdapter(
+            self.stats,
+            pool_connections=len(urls),
+            pool_maxsize=pool_size,
+            pool_block=pool_block,
+            max_retries=retries,
+        )
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.balancer.start_prober(self.session)
+
+    def request(self, method, path, long_running=False, **kwargs):
+        """Send a request to path on one of the upstream's replicas.
+
+        Calls are refused with an UpstreamRejected error, before any
+        connection is taken, while the circuit breaker is open or the
+        bulkhead is full. 5xx responses, transport errors and slow calls
+        count against the breaker and the chosen replica. For stream=True
+        the bulkhead slot and the replica's outstanding count are
+        held until the response headers arrive, not for the whole body.
+        long_running calls (bulk uploads) still count failures but are
+        never recorded as slow.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        self.bulkhead.acquire()
+        try:
+            self.breaker.acquire()
+        except Exception:
+            self.bulkhead.release()
+            raise
+
+        self.stats.incr('requests')
+        endpoint = self.balancer.acquire()
+        started = time.monotonic()
+        failed = True
+        try:
+            response = self.session.request(method, f"{endpoint.url}{path}", **kwargs)
+            failed = response.status_code >= 500
+            return response
+        except requests.exceptions.RequestException:
+            self.stats.incr('errors')
+            raise
+        finally:
+            self.balancer.release(endpoint, failed)
+            self.bulkhead.release()
+            self.breaker.record(failed, 0 if long_running else time.monotonic() - started)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def upstream(name):
+    """Return the process-wide client for the named upstream."""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = UpstreamClient(name, **Config.UPSTREAMS[name])
+                _clients[name] = client
+    return client
+
+
+def upstream_stats():
+    """Pool, circuit breaker, bulkhead and replica state for every configured upstream."""
+    return {
+        name: {
+            'endpoints': upstream(name).balancer.snapshot(),
+            'pool': upstream(name).stats.snapshot(),
+            'breaker': upstream(name).breaker.snapshot(),
+            'bulkhead': upstream(name).bulkhead.snapshot(),
+        }
+        for name in Config.UPSTREAMS
+    }
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+from config import Config
+
+_executor = ThreadPoolExecutor(max_workers=Config.FANOUT_WORKERS, thread_name_prefix='fanout')
+
+
+def _section(response):
+    """Convert an upstream response into a dashboard section."""
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = {}
+
+    if response.ok:
+        return {"success": True, "data": payload.get('data', payload)}
+
+    return {
+        "success": False,
+        "status": response.status_code,
+        "message": payload.get('message') or "Upstream request failed"
+    }
+
+
+def fan_out(calls, timeout):
+    """Run named upstream calls concurrently and collect one section per call.
+
+    Calls still running after `timeout` seconds are reported as failed
+    sections instead of holding up the whole response. A call that has
+    already started cannot be cancelled: it keeps its FANOUT_WORKERS
+    thread and upstream connection until it returns, so each call
+    should pass a request timeout no longer than `timeout`.
+    """
+    futures = {name: _executor.submit(call) for name, call in calls.items()}
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    sections = {}
+    for name, future in futures.items():
+        if future not in done:
+            future.cancel()
+            sections[name] = {"success": False, "message": "Service timed out"}
+        elif isinstance(future.exception(), requests.exceptions.RequestException):
+            sections[name] = {"success": False, "message": "Service unavailable"}
+        elif future.exception() is not None:
+            sections[name] = {"success": False, "message": "Internal server error"}
+        else:
+            sections[name] = _section(future.result())
+    return sections
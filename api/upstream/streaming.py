@@ -0,0 +1,46 @@
+import logging
+
+from flask import Response
+from urllib3.exceptions import HTTPError
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_HEADERS = (
+    'Content-Type',
+    'Content-Length',
+    'Content-Encoding',
+    'Content-Disposition',
+    'ETag',
+    'Last-Modified',
+    'Cache-Control',
+)
+
+
+def stream_response(response, chunk_size=None):
+    """Relay an upstream response requested with stream=True chunk by chunk.
+
+    The body is copied from the raw socket without decoding, so
+    Content-Length and Content-Encoding stay valid for the client and the
+    gateway never holds more than one chunk of the payload in memory.
+    If the upstream connection fails mid-body the status line is already
+    sent, so the error is logged and the body simply ends early.
+    """
+    chunk_size = chunk_size or Config.STREAM_CHUNK_SIZE
+
+    def generate():
+        try:
+            for chunk in response.raw.stream(chunk_size, decode_content=False):
+                yield chunk
+        except (HTTPError, OSError) as e:
+            logger.warning("Upstream stream from %s interrupted: %s", response.url, e)
+        finally:
+            response.close()
+
+    headers = {
+        name: response.headers[name]
+        for name in FORWARDED_HEADERS
+        if name in response.headers
+    }
+    return Response(generate(), status=response.status_code, headers=headers)
@@ -2,7 +2,8 @@ import uuid
 from flask import Flask, g
 from flask_cors import CORS
 from config import Config
-from database.connection import init_database
+from database.connection import db_stats, init_database, reset_db
+from database.write_queue import write_stats
 from monitoring.logging import log_request_end, log_request_start, setup_flask_logging
 from routes.billing_routes import billing_bp
 
@@ -10,6 +11,7 @@ def create_app():
     app = Flask(__name__)
 
     CORS(app, supports_credentials=Config.CORS_SUPPORTS_CREDENTIALS)
+    app.teardown_appcontext(reset_db)
 
     logger = setup_flask_logging(app)
     
@@ -25,6 +27,10 @@ def create_app():
     def after_request(response):
         return log_request_end(response)
 
+    @app.route('/health')
+    def health():
+        return {"success": True, "data": {"database": db_stats(), "writes": write_stats()}}
+
     @app.errorhandler(404)
     def not_found(error):
         app.logger.warning(f"404 error: {error}")
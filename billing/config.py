@@ -13,3 +13,26 @@ class Config:
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     
     CORS_SUPPORTS_CREDENTIALS = True
+
+    # Bill list pagination for GET /api/billings (totals come from the rollups)
+    BILLS_MAX_PAGE_SIZE = int(os.environ.get('BILLS_MAX_PAGE_SIZE', 1000))
+    OPEN_BILLS_MAX_ACCOUNTS = int(os.environ.get('OPEN_BILLS_MAX_ACCOUNTS', 5000))
+
+    # Bill runs (POST /api/billings/runs) read accounts from the accounts service
+    ACCOUNT_SERVICE_URL = os.environ.get('ACCOUNT_SERVICE_URL', 'http://account:5000')
+    BILL_RUN_PAGE_SIZE = int(os.environ.get('BILL_RUN_PAGE_SIZE', 1000))
+    BILL_RUN_TIMEOUT = float(os.environ.get('BILL_RUN_TIMEOUT', 30))
+
+    # SQLite connection tuning (database/connection.py)
+    DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+    DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 20000))
+    DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_CACHED_STATEMENTS = int(os.environ.get('DB_CACHED_STATEMENTS', 512))
+
+    # Group commit: queue writes to one writer thread per process (database/write_queue.py)
+    DB_WRITE_QUEUE = os.environ.get('DB_WRITE_QUEUE', 'False').lower() == 'true'
+    DB_WRITE_BATCH_SIZE = int(os.environ.get('DB_WRITE_BATCH_SIZE', 100))
+    DB_WRITE_MAX_WAIT_MS = float(os.environ.get('DB_WRITE_MAX_WAIT_MS', 2))
+    # How long a request waits for its queued write before giving up
+    DB_WRITE_TIMEOUT_MS = int(os.environ.get('DB_WRITE_TIMEOUT_MS', 30000))
@@ -0,0 +1,43 @@
+# Generated from shared/database/migrations.py by scripts/sync_shared.py; do not edit.
+"""Versioned schema migrations for a service database.
+
+The service lists its migrations in database/schema_migrations.py;
+init code calls migrate(conn) once its base tables exist.
+"""
+from database.schema_migrations import MIGRATIONS
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Apply pending migrations in version order, each in its own transaction.
+
+    Applied versions are recorded in schema_migrations. A pending
+    migration is re-checked under BEGIN IMMEDIATE, so workers starting at
+    the same time apply it only once. Returns the versions applied now.
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+    );
+    ''')
+    done = {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+    applied = []
+    for version, name, statements in sorted(migrations, key=lambda migration: migration[0]):
+        if version in done:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM schema_migrations WHERE version = ?', (version,)).fetchone():
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)', (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
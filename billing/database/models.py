@@ -1,48 +1,116 @@
 from database.connection import get_db
+from database.write_queue import run_write
 
 class Bill:
     @staticmethod
     def get_bills_by_account(account_id, period_months):
         """Get bills for a specific account within a period."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = '''
             SELECT * FROM bills
             WHERE account_id = ?
-            AND created_at >= date("now", "-{} months")
+            AND created_at >= date("now", "-{} months", "start of month")
             '''.format(period_months)
 
             rows = conn.execute(query, (account_id,)).fetchall()
             return rows
-        finally:
-            conn.close()
+
+    @staticmethod
+    def get_bills_page(account_id, period_months, limit, cursor=None):
+        """Get one page of an account's bills in the period, newest first."""
+        with get_db() as conn:
+            query = '''
+            SELECT * FROM bills
+            WHERE account_id = ?
+            AND created_at >= date('now', '-' || ? || ' months', 'start of month')
+            '''
+            params = [account_id, period_months]
+            if cursor:
+                query += ' AND id < ?'
+                params.append(cursor)
+            query += ' ORDER BY id DESC LIMIT ?'
+            params.append(limit)
+            return conn.execute(query, params).fetchall()
+
+    @staticmethod
+    def get_totals_by_account(account_id, period_months):
+        """Get per-type totals for an account from the monthly rollups."""
+        with get_db() as conn:
+            query = '''
+            SELECT type, SUM(amount) AS amount, SUM(bill_count) AS count, SUM(paid_amount) AS paid_amount
+            FROM bill_rollups
+            WHERE account_id = ?
+            AND month >= strftime('%Y-%m', 'now', '-' || ? || ' months')
+            GROUP BY type
+            HAVING SUM(bill_count) > 0
+            '''
+            return conn.execute(query, (account_id, period_months)).fetchall()
 
     @staticmethod
     def create_bill(account_id, amount, status, bill_type):
         """Create a new bill record."""
-        conn = get_db()
-        try:
-            conn.execute('''
+        def insert(conn):
+            return conn.execute('''
             INSERT INTO bills (account_id, amount, status, type)
             VALUES (?, ?, ?, ?)
-            ''', (account_id, amount, status, bill_type))
-            conn.commit()
-            return conn.lastrowid
-        finally:
-            conn.close()
+            ''', (account_id, amount, status, bill_type)).lastrowid
+
+        return run_write(insert)
+
+    @staticmethod
+    def upsert_run_bills(period, rows):
+        """Write a bill run's (account_id, amount, type) rows in one transaction.
+
+        Bills are dated at the start of the period. A bill already written
+        for the same account, period and type is updated in place unless it
+        is paid, so a run can be repeated without duplicates. Returns the
+        number of bills inserted or changed.
+        """
+        created_at = f'{period}-01 00:00:00'
+        with get_db() as conn:
+            cursor = conn.executemany('''
+            INSERT INTO bills (account_id, amount, status, type, period, created_at)
+            VALUES (?, ?, 'waiting_for_payment', ?, ?, ?)
+            ON CONFLICT (account_id, period, type) WHERE period IS NOT NULL DO UPDATE
+            SET amount = excluded.amount
+            WHERE bills.status != 'paid' AND bills.amount != excluded.amount
+            ''', ((account_id, amount, bill_type, period, created_at) for account_id, amount, bill_type in rows))
+            return cursor.rowcount
+
+    @staticmethod
+    def get_open_bills(account_ids):
+        """Get the unpaid bills of several accounts, oldest first per account."""
+        with get_db() as conn:
+            rows = []
+            for start in range(0, len(account_ids), 500):
+                chunk = account_ids[start:start + 500]
+                rows += conn.execute(f'''
+                SELECT * FROM bills
+                WHERE account_id IN ({", ".join("?" * len(chunk))})
+                AND status != 'paid'
+                ORDER BY account_id, id
+                ''', chunk).fetchall()
+            return rows
 
     @staticmethod
     def update_bills(billing_ids, status):
         """Update bill"""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             conn.executemany('''
             UPDATE bills SET status = ?
             WHERE id = ?
             ''', [(status, id) for id in billing_ids])
             conn.commit()
-        finally:
-            conn.close()
+
+    @staticmethod
+    def totals_to_dict(row):
+        """Convert a rollup totals row to dictionary."""
+        return {
+            'type': row['type'],
+            'amount': row['amount'],
+            'count': row['count'],
+            'paidAmount': row['paid_amount'],
+        }
 
     @staticmethod
     def to_dict(row):
@@ -55,3 +123,35 @@ class Bill:
             'type': row['type'],
             'amount': row['amount'],
         }
+
+
+class Tariff:
+    BASES = ('area', 'resident', 'fixed')
+
+    @staticmethod
+    def get_all():
+        """Get all tariffs ordered by service type."""
+        with get_db() as conn:
+            return conn.execute('SELECT * FROM tariffs ORDER BY type').fetchall()
+
+    @staticmethod
+    def upsert_tariffs(tariffs):
+        """Create or replace tariffs given as (type, basis, rate) tuples."""
+        with get_db() as conn:
+            conn.executemany('''
+            INSERT INTO tariffs (type, basis, rate)
+            VALUES (?, ?, ?)
+            ON CONFLICT (type) DO UPDATE
+            SET basis = excluded.basis, rate = excluded.rate, updated_at = datetime('now')
+            ''', tariffs)
+            conn.commit()
+
+    @staticmethod
+    def to_dict(row):
+        """Convert database row to dictionary."""
+        return {
+            'type': row['type'],
+            'basis': row['basis'],
+            'rate': row['rate'],
+            'updatedAt': row['updated_at'],
+        }
@@ -0,0 +1,89 @@
+# (version, name, statements); append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, 'index bills by account and date', [
+        'CREATE INDEX IF NOT EXISTS idx_bills_account_created ON bills (account_id, created_at)',
+    ]),
+    (2, 'monthly bill rollups maintained by triggers', [
+        '''
+        CREATE TABLE IF NOT EXISTS bill_rollups (
+            account_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            type TEXT NOT NULL,
+            amount REAL NOT NULL DEFAULT 0,
+            bill_count INTEGER NOT NULL DEFAULT 0,
+            paid_amount REAL NOT NULL DEFAULT 0,
+            paid_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (account_id, month, type)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS bills_rollup_insert AFTER INSERT ON bills BEGIN
+            INSERT INTO bill_rollups (account_id, month, type, amount, bill_count, paid_amount, paid_count)
+            VALUES (
+                new.account_id, strftime('%Y-%m', new.created_at), new.type, new.amount, 1,
+                CASE WHEN new.status = 'paid' THEN new.amount ELSE 0 END,
+                CASE WHEN new.status = 'paid' THEN 1 ELSE 0 END
+            )
+            ON CONFLICT (account_id, month, type) DO UPDATE SET
+                amount = amount + excluded.amount,
+                bill_count = bill_count + 1,
+                paid_amount = paid_amount + excluded.paid_amount,
+                paid_count = paid_count + excluded.paid_count;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS bills_rollup_delete AFTER DELETE ON bills BEGIN
+            UPDATE bill_rollups SET
+                amount = amount - old.amount,
+                bill_count = bill_count - 1,
+                paid_amount = paid_amount - CASE WHEN old.status = 'paid' THEN old.amount ELSE 0 END,
+                paid_count = paid_count - CASE WHEN old.status = 'paid' THEN 1 ELSE 0 END
+            WHERE account_id = old.account_id AND month = strftime('%Y-%m', old.created_at) AND type = old.type;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS bills_rollup_update
+        AFTER UPDATE OF account_id, amount, status, type, created_at ON bills BEGIN
+            UPDATE bill_rollups SET
+                amount = amount - old.amount,
+                bill_count = bill_count - 1,
+                paid_amount = paid_amount - CASE WHEN old.status = 'paid' THEN old.amount ELSE 0 END,
+                paid_count = paid_count - CASE WHEN old.status = 'paid' THEN 1 ELSE 0 END
+            WHERE account_id = old.account_id AND month = strftime('%Y-%m', old.created_at) AND type = old.type;
+            INSERT INTO bill_rollups (account_id, month, type, amount, bill_count, paid_amount, paid_count)
+            VALUES (
+                new.account_id, strftime('%Y-%m', new.created_at), new.type, new.amount, 1,
+                CASE WHEN new.status = 'paid' THEN new.amount ELSE 0 END,
+                CASE WHEN new.status = 'paid' THEN 1 ELSE 0 END
+            )
+            ON CONFLICT (account_id, month, type) DO UPDATE SET
+                amount = amount + excluded.amount,
+                bill_count = bill_count + 1,
+                paid_amount = paid_amount + excluded.paid_amount,
+                paid_count = paid_count + excluded.paid_count;
+        END
+        ''',
+        '''
+        INSERT INTO bill_rollups (account_id, month, type, amount, bill_count, paid_amount, paid_count)
+        SELECT
+            account_id, strftime('%Y-%m', created_at), type, SUM(amount), COUNT(*),
+            SUM(CASE WHEN status = 'paid' THEN amount ELSE 0 END),
+            SUM(CASE WHEN status = 'paid' THEN 1 ELSE 0 END)
+        FROM bills
+        GROUP BY account_id, strftime('%Y-%m', created_at), type
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_bills_account_id ON bills (account_id, id)',
+    ]),
+    (3, 'tariffs and bill run periods', [
+        '''
+        CREATE TABLE IF NOT EXISTS tariffs (
+            type TEXT PRIMARY KEY,
+            basis TEXT NOT NULL CHECK (basis IN ('area', 'resident', 'fixed')),
+            rate REAL NOT NULL CHECK (rate >= 0),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        ''',
+        'ALTER TABLE bills ADD COLUMN period TEXT',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_bills_run ON bills (account_id, period, type) WHERE period IS NOT NULL',
+    ]),
+]
@@ -1,4 +1,6 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
+import requests
+from services.bill_run_service import BillRunService
 from services.billing_service import BillingService
 
 billing_bp = Blueprint('billing', __name__)
@@ -8,7 +10,7 @@ def update_billing():
     """Update billing data for an account"""
     try:
         data = request.get_json()
-        print("D", data);
+        current_app.logger.debug(f"Marking bills paid: {data}")
         if not data:
             raise ValueError("No data provided")
 
@@ -27,8 +29,33 @@ def update_billing():
             "message": str(e)
         }), 400
 
-    except Exception as e:
-        print(f"Error updating billing data: {e}")
+    except Exception:
+        current_app.logger.exception("Error updating billing data")
+        return jsonify({
+            "success": False,
+            "message": "Internal server error"
+        }), 500
+
+@billing_bp.route('/api/billings/open', methods=['POST'])
+def get_open_bills():
+    """List the unpaid bills of several accounts."""
+    try:
+        data = request.get_json(silent=True) or {}
+
+        bills = BillingService.get_open_bills(data.get('account_ids'))
+
+        return jsonify({
+            "success": True,
+            "data": bills
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
+
+    except Exception:
         return jsonify({
             "success": False,
             "message": "Internal server error"
@@ -41,8 +68,15 @@ def get_billing():
         args = request.args
         account_id = args.get('account')
         period = args.get('period', 6)
-
-        data = BillingService.get_billing_data(account_id, period)
+        details = args.get('details', '1').lower() not in ('0', 'false')
+
+        data = BillingService.get_billing_data(
+            account_id,
+            period,
+            details=details,
+            limit=args.get('limit'),
+            cursor=args.get('cursor')
+        )
 
         return jsonify({
             "success": True,
@@ -96,3 +130,77 @@ def create_bill():
             "success": False,
             "message": "Internal server error"
         }), 500
+
+@billing_bp.route('/api/billings/runs', methods=['POST'])
+def run_bills():
+    """Bill every active account for a period using the current tariffs."""
+    try:
+        data = request.get_json(silent=True) or {}
+
+        result = BillRunService.run(data.get('period'))
+
+        return jsonify({
+            "success": True,
+            "data": result
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
+
+    except requests.exceptions.RequestException:
+        return jsonify({
+            "success": False,
+            "message": "Account service unavailable"
+        }), 503
+
+    except Exception:
+        current_app.logger.exception("Error running bills")
+        return jsonify({
+            "success": False,
+            "message": "Internal server error"
+        }), 500
+
+@billing_bp.route('/api/billings/tariffs', methods=['GET'])
+def get_tariffs():
+    """List the tariffs used by bill runs."""
+    try:
+        return jsonify({
+            "success": True,
+            "data": BillRunService.get_tariffs()
+        }), 200
+
+    except Exception:
+        current_app.logger.exception("Error listing tariffs")
+        return jsonify({
+            "success": False,
+            "message": "Internal server error"
+        }), 500
+
+@billing_bp.route('/api/billings/tariffs', methods=['PUT'])
+def set_tariffs():
+    """Create or replace tariffs."""
+    try:
+        data = request.get_json(silent=True) or {}
+
+        tariffs = BillRunService.set_tariffs(data.get('tariffs'))
+
+        return jsonify({
+            "success": True,
+            "data": tariffs
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
+
+    except Exception:
+        current_app.logger.exception("Error setting tariffs")
+        return jsonify({
+            "success": False,
+            "message": "Internal server error"
+        }), 500
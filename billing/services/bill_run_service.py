@@ -0,0 +1,115 @@
+import re
+
+import numpy as np
+import requests
+
+from config import Config
+from database.models import Bill, Tariff
+
+PERIOD_PATTERN = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+
+class BillRunService:
+    @staticmethod
+    def fetch_accounts():
+        """Load id, area and residents of every active account from the accounts service.
+
+        Accounts are read a page at a time with keyset pagination and
+        returned as NumPy arrays.
+        """
+        ids, areas, residents = [], [], []
+        params = {
+            'limit': Config.BILL_RUN_PAGE_SIZE,
+            'fields': 'id,propertySquare,residentsCount',
+            'isActive': 1,
+        }
+        with requests.Session() as session:
+            while True:
+                response = session.get(
+                    f"{Config.ACCOUNT_SERVICE_URL}/api/accounts",
+                    params=params,
+                    timeout=Config.BILL_RUN_TIMEOUT
+                )
+                response.raise_for_status()
+                page = response.json()
+                for account in page['data']:
+                    ids.append(account['id'])
+                    areas.append(account['propertySquare'] or 0)
+                    residents.append(account['residentsCount'] or 0)
+                if not page.get('nextCursor'):
+                    break
+                params['cursor'] = page['nextCursor']
+
+        return (
+            np.array(ids, dtype=np.int64),
+            np.array(areas, dtype=np.float64),
+            np.array(residents, dtype=np.float64),
+        )
+
+    @staticmethod
+    def compute_charges(tariffs, areas, residents):
+        """Compute every account's charge for every tariff in one matrix product.
+
+        Returns an (accounts x tariffs) matrix rounded to kopecks: each
+        account's [area, residents, 1] row times a (3 x tariffs) matrix
+        holding each tariff's rate in the row of its basis.
+        """
+        bases = np.column_stack([areas, residents, np.ones_like(areas)])
+        rates = np.zeros((len(Tariff.BASES), len(tariffs)))
+        for column, tariff in enumerate(tariffs):
+            rates[Tariff.BASES.index(tariff['basis']), column] = tariff['rate']
+        return np.round(bases @ rates, 2)
+
+    @staticmethod
+    def run(period):
+        """Bill every active account for a period (YYYY-MM) using the current tariffs."""
+        if not period or not PERIOD_PATTERN.match(str(period)):
+            raise ValueError("Period must be in YYYY-MM format")
+
+        tariffs = BillRunService.get_tariffs()
+        if not tariffs:
+            raise ValueError("No tariffs configured")
+
+        ids, areas, residents = BillRunService.fetch_accounts()
+        charges = BillRunService.compute_charges(tariffs, areas, residents)
+        billable = charges > 0
+
+        def rows():
+            for column, tariff in enumerate(tariffs):
+                mask = billable[:, column]
+                for account_id, amount in zip(ids[mask].tolist(), charges[mask, column].tolist()):
+                    yield account_id, amount, tariff['type']
+
+        written = Bill.upsert_run_bills(period, rows())
+
+        return {
+            'period': period,
+            'accounts': len(ids),
+            'bills': int(billable.sum()),
+            'written': written,
+        }
+
+    @staticmethod
+    def set_tariffs(tariffs):
+        """Create or replace tariffs given as a list of {type, basis, rate}."""
+        if not isinstance(tariffs, list) or not tariffs:
+            raise ValueError("Tariffs must be a non-empty list")
+
+        values = []
+        for tariff in tariffs:
+            if not isinstance(tariff, dict) or not tariff.get('type'):
+                raise ValueError("Each tariff needs a type")
+            if tariff.get('basis') not in Tariff.BASES:
+                raise ValueError(f"Tariff basis must be one of: {', '.join(Tariff.BASES)}")
+            rate = tariff.get('rate')
+            if not isinstance(rate, (int, float)) or isinstance(rate, bool) or rate < 0:
+                raise ValueError("Tariff rate must be a non-negative number")
+            values.append((tariff['type'], tariff['basis'], float(rate)))
+
+        Tariff.upsert_tariffs(values)
+        return BillRunService.get_tariffs()
+
+    @staticmethod
+    def get_tariffs():
+        """List all tariffs."""
+        return [Tariff.to_dict(row) for row in Tariff.get_all()]
@@ -1,21 +1,50 @@
+from config import Config
 from database.models import Bill
-from utils.transformers import transform_bills
 
 class BillingService:
     @staticmethod
-    def get_billing_data(account_id, period):
-        """Get billing data for an account within a specific period."""
+    def get_billing_data(account_id, period, details=True, limit=None, cursor=None):
+        """Get billing data for an account within a specific period.
+
+        The period counts whole calendar months back from the current one.
+        Totals are read from the monthly rollups. The bill list is left out
+        when `details` is false and returned a page at a time, newest
+        first, when `limit` is given.
+        """
         if not account_id:
             raise ValueError("Account ID is required")
 
         if not str(period).isdigit() or int(period) <= 0:
             raise ValueError("Period must be a positive number")
 
-        rows = Bill.get_bills_by_account(account_id, int(period))
+        if limit is not None and (not str(limit).isdigit() or not 0 < int(limit) <= Config.BILLS_MAX_PAGE_SIZE):
+            raise ValueError(f"Limit must be between 1 and {Config.BILLS_MAX_PAGE_SIZE}")
+
+        if cursor is not None and not str(cursor).isdigit():
+            raise ValueError("Cursor must be a bill ID")
+
+        period = int(period)
+        totals = [Bill.totals_to_dict(row) for row in Bill.get_totals_by_account(account_id, period)]
+        data = {
+            'total': {
+                'services': totals,
+                'amount': sum(total['amount'] for total in totals)
+            }
+        }
 
-        bills = [Bill.to_dict(row) for row in rows]
+        if not details:
+            return data
 
-        return transform_bills(bills)
+        if limit is None:
+            rows = Bill.get_bills_by_account(account_id, period)
+            data['services'] = [Bill.to_dict(row) for row in rows]
+            return data
+
+        limit = int(limit)
+        rows = Bill.get_bills_page(account_id, period, limit + 1, int(cursor) if cursor else None)
+        data['services'] = [Bill.to_dict(row) for row in rows[:limit]]
+        data['nextCursor'] = str(rows[limit - 1]['id']) if len(rows) > limit else None
+        return data
 
     @staticmethod
     def create_new_bill(account_id, amount, status, bill_type):
@@ -29,6 +58,21 @@ class BillingService:
 
         return Bill.create_bill(account_id, amount, status, bill_type)
 
+    @staticmethod
+    def get_open_bills(account_ids):
+        """Get the unpaid bills of several accounts, oldest first per account."""
+        if not isinstance(account_ids, list):
+            raise ValueError("Account IDs must be a list")
+
+        if len(account_ids) > Config.OPEN_BILLS_MAX_ACCOUNTS:
+            raise ValueError(f"At most {Config.OPEN_BILLS_MAX_ACCOUNTS} account IDs are allowed")
+
+        for account_id in account_ids:
+            if not isinstance(account_id, int) or isinstance(account_id, bool) or account_id <= 0:
+                raise ValueError("Account ID must be a positive number")
+
+        return [Bill.to_dict(row) for row in Bill.get_open_bills(account_ids)]
+
     @staticmethod
     def update_billing_data(billing_ids):
         """Update billing data."""
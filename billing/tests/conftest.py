@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+import pytest
+
+# Config reads DATABASE_PATH when it is first imported
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), 'billing.db')
+
+from database.connection import get_db, init_database  # noqa: E402
+
+init_database()
+
+TABLES = ['bills', 'bill_rollups', 'tariffs']
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    with get_db() as conn:
+        for table in TABLES:
+            conn.execute(f'DELETE FROM {table}')
+
+
+@pytest.fixture
+def query():
+    def run(sql, params=()):
+        with get_db() as conn:
+            return conn.execute(sql, params).fetchall()
+    return run
@@ -0,0 +1,107 @@
+import logging
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from routes.billing_routes import billing_bp
+from services.bill_run_service import BillRunService
+
+TARIFFS = [
+    {'type': 'heating', 'basis': 'area', 'rate': 1.5},
+    {'type': 'water', 'basis': 'resident', 'rate': 10.0},
+    {'type': 'garbage', 'basis': 'fixed', 'rate': 3.0},
+]
+
+
+@pytest.fixture
+def accounts(monkeypatch):
+    # id, area, residents
+    arrays = (np.array([1, 2, 3]), np.array([33.333, 50.0, 0.0]), np.array([2.0, 0.0, 1.0]))
+    monkeypatch.setattr(BillRunService, 'fetch_accounts', staticmethod(lambda: arrays))
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(billing_bp)
+    return app.test_client()
+
+
+def test_tariffs_are_replaced_by_type():
+    BillRunService.set_tariffs(TARIFFS)
+    BillRunService.set_tariffs([{'type': 'water', 'basis': 'resident', 'rate': 12}])
+
+    tariffs = {tariff['type']: (tariff['basis'], tariff['rate']) for tariff in BillRunService.get_tariffs()}
+    assert tariffs == {'garbage': ('fixed', 3.0), 'heating': ('area', 1.5), 'water': ('resident', 12.0)}
+
+
+@pytest.mark.parametrize('tariffs', [
+    [],
+    [{'type': 'water', 'basis': 'volume', 'rate': 1}],
+    [{'type': 'water', 'basis': 'fixed', 'rate': -1}],
+    [{'type': 'water', 'basis': 'fixed', 'rate': True}],
+    [{'basis': 'fixed', 'rate': 1}],
+])
+def test_invalid_tariffs_are_refused(tariffs):
+    with pytest.raises(ValueError):
+        BillRunService.set_tariffs(tariffs)
+
+
+def test_charges_use_each_tariffs_basis_and_round_to_kopecks():
+    charges = BillRunService.compute_charges(
+        TARIFFS, np.array([33.333, 50.0]), np.array([2.0, 0.0])
+    )
+
+    # 33.333 m2 at 1.5 is 49.9995
+    assert charges.tolist() == [[50.0, 20.0, 3.0], [75.0, 0.0, 3.0]]
+
+
+def test_run_bills_every_account_once(query, accounts):
+    BillRunService.set_tariffs(TARIFFS)
+
+    first = BillRunService.run('2024-05')
+    second = BillRunService.run('2024-05')
+
+    # Zero charges (no residents, no area) are not billed
+    assert first == {'period': '2024-05', 'accounts': 3, 'bills': 7, 'written': 7}
+    assert second['written'] == 0
+    rows = query("SELECT account_id, type, amount, created_at FROM bills WHERE account_id = 1 ORDER BY type")
+    assert [tuple(row) for row in rows] == [
+        (1, 'garbage', 3.0, '2024-05-01 00:00:00'),
+        (1, 'heating', 50.0, '2024-05-01 00:00:00'),
+        (1, 'water', 20.0, '2024-05-01 00:00:00'),
+    ]
+
+
+def test_rerun_after_a_tariff_change_updates_unpaid_bills_only(query, accounts):
+    BillRunService.set_tariffs(TARIFFS)
+    BillRunService.run('2024-05')
+    query("UPDATE bills SET status = 'paid' WHERE account_id = 1 AND type = 'garbage'")
+
+    BillRunService.set_tariffs([{'type': 'garbage', 'basis': 'fixed', 'rate': 4}])
+
+    assert BillRunService.run('2024-05')['written'] == 2
+    amounts = query("SELECT account_id, amount FROM bills WHERE type = 'garbage' ORDER BY account_id")
+    assert [tuple(row) for row in amounts] == [(1, 3.0), (2, 4.0), (3, 4.0)]
+
+
+@pytest.mark.parametrize('period', [None, '2024-13', '05-2024'])
+def test_run_needs_a_valid_period(client, period):
+    response = client.post('/api/billings/runs', json={'period': period})
+
+    assert response.status_code == 400
+
+
+def test_run_failure_is_logged_and_reported_as_json(client, monkeypatch, caplog):
+    def fail(period):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(BillRunService, 'run', staticmethod(fail))
+
+    with caplog.at_level(logging.ERROR):
+        response = client.post('/api/billings/runs', json={'period': '2024-05'})
+
+    assert response.status_code == 500
+    assert response.get_json() == {'success': False, 'message': 'Internal server error'}
+    assert 'Error running bills' in caplog.text
@@ -0,0 +1,72 @@
+import pytest
+
+BILLS = [
+    # account_id, amount, status, type, created_at
+    (1, 100.0, 'waiting_for_payment', 'water', '2024-01-10 00:00:00'),
+    (1, 50.5, 'paid', 'water', '2024-01-20 00:00:00'),
+    (1, 70.0, 'paid', 'heating', '2024-02-01 00:00:00'),
+    (2, 30.25, 'waiting_for_payment', 'water', '2024-01-15 00:00:00'),
+]
+
+
+@pytest.fixture
+def bills(query):
+    for bill in BILLS:
+        query('INSERT INTO bills (account_id, amount, status, type, created_at) VALUES (?, ?, ?, ?, ?)', bill)
+    return [row['id'] for row in query('SELECT id FROM bills ORDER BY id')]
+
+
+def rollups(query):
+    rows = query('''
+        SELECT account_id, month, type, amount, bill_count, paid_amount, paid_count
+        FROM bill_rollups
+        WHERE bill_count != 0
+    ''')
+    return {(row[0], row[1], row[2]): (round(row[3], 2), row[4], round(row[5], 2), row[6]) for row in rows}
+
+
+def recomputed(query):
+    rows = query('''
+        SELECT account_id, strftime('%Y-%m', created_at), type, SUM(amount), COUNT(*),
+               SUM(CASE WHEN status = 'paid' THEN amount ELSE 0 END),
+               SUM(CASE WHEN status = 'paid' THEN 1 ELSE 0 END)
+        FROM bills
+        GROUP BY account_id, strftime('%Y-%m', created_at), type
+    ''')
+    return {(row[0], row[1], row[2]): (round(row[3], 2), row[4], round(row[5], 2), row[6]) for row in rows}
+
+
+def test_inserts_are_rolled_up(query, bills):
+    assert rollups(query) == recomputed(query)
+    assert rollups(query)[(1, '2024-01', 'water')] == (150.5, 2, 50.5, 1)
+
+
+@pytest.mark.parametrize('assignments', [
+    {'amount': 120.0},
+    {'status': 'paid'},
+    {'status': 'waiting_for_payment'},
+    {'account_id': 3},
+    {'created_at': '2024-03-05 00:00:00'},
+    {'type': 'gas'},
+    {'account_id': 2, 'created_at': '2024-02-28 00:00:00'},
+])
+def test_updates_move_bills_between_rollups(query, bills, assignments):
+    columns = ', '.join(f'{column} = ?' for column in assignments)
+    query(f'UPDATE bills SET {columns} WHERE id IN (?, ?)', tuple(assignments.values()) + (bills[0], bills[1]))
+
+    assert rollups(query) == recomputed(query)
+
+
+def test_deletes_are_subtracted(query, bills):
+    query('DELETE FROM bills WHERE id IN (?, ?)', (bills[1], bills[3]))
+
+    assert rollups(query) == recomputed(query)
+    assert (2, '2024-01', 'water') not in rollups(query)
+
+
+def test_bill_moved_to_another_account_and_period(query, bills):
+    query("UPDATE bills SET account_id = 2, created_at = '2024-02-15 00:00:00', status = 'paid' WHERE id = ?", (bills[0],))
+
+    assert rollups(query) == recomputed(query)
+    assert rollups(query)[(1, '2024-01', 'water')] == (50.5, 1, 50.5, 1)
+    assert rollups(query)[(2, '2024-02', 'water')] == (100.0, 1, 100.0, 1)
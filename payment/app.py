@@ -2,17 +2,28 @@ from flask import Flask
 from flask_cors import CORS
 from config import Config
 from routes.payments_routes import payment_bp
-from database.connection import init_database
+from database.connection import db_stats, init_database, reset_db
+from database.write_queue import write_stats
+from services.payment_worker import start_payment_workers
+from services.settlement_relay import start_settlement_relay
 
 def create_app():
     app = Flask(__name__)
 
     CORS(app, supports_credentials=Config.CORS_SUPPORTS_CREDENTIALS)
+    app.teardown_appcontext(reset_db)
 
     init_database()
 
     app.register_blueprint(payment_bp, url_prefix='')
 
+    @app.route('/health')
+    def health():
+        return {"success": True, "data": {"database": db_stats(), "writes": write_stats()}}
+
+    start_payment_workers(app)
+    start_settlement_relay(app)
+
     return app
 
 if __name__ == '__main__':
@@ -9,6 +9,50 @@ class Config:
     HOST = os.environ.get('FLASK_HOST', '0.0.0.0')
     PORT = int(os.environ.get('FLASK_PORT', 5000))
 
+    # Payment list pagination for GET /api/payments/<account_id>?summary=1
+    PAYMENTS_MAX_PAGE_SIZE = int(os.environ.get('PAYMENTS_MAX_PAGE_SIZE', 1000))
+
+    # Background payment processing (services/payment_worker.py)
+    PAYMENT_WORKERS = int(os.environ.get('PAYMENT_WORKERS', 4))
+    PAYMENT_WORKER_POLL_INTERVAL = float(os.environ.get('PAYMENT_WORKER_POLL_INTERVAL', 1))
+    PAYMENT_JOB_LEASE_SECONDS = float(os.environ.get('PAYMENT_JOB_LEASE_SECONDS', 60))
+    PAYMENT_JOB_MAX_ATTEMPTS = int(os.environ.get('PAYMENT_JOB_MAX_ATTEMPTS', 8))
+    PAYMENT_RETRY_BASE_SECONDS = float(os.environ.get('PAYMENT_RETRY_BASE_SECONDS', 2))
+    PAYMENT_RETRY_MAX_SECONDS = float(os.environ.get('PAYMENT_RETRY_MAX_SECONDS', 300))
+    PAYMENT_PROCESSING_DELAY = float(os.environ.get('PAYMENT_PROCESSING_DELAY', 2))
+    SETTLEMENT_TIMEOUT = float(os.environ.get('SETTLEMENT_TIMEOUT', 10))
+    SETTLEMENT_RELAY = os.environ.get('SETTLEMENT_RELAY', 'True').lower() == 'true'
+    SETTLEMENT_BATCH_SIZE = int(os.environ.get('SETTLEMENT_BATCH_SIZE', 500))
+    SETTLEMENT_POLL_INTERVAL = float(os.environ.get('SETTLEMENT_POLL_INTERVAL', 1))
+    SETTLEMENT_LEASE_SECONDS = float(os.environ.get('SETTLEMENT_LEASE_SECONDS', 60))
+    SETTLEMENT_RETENTION_DAYS = int(os.environ.get('SETTLEMENT_RETENTION_DAYS', 7))
+    SETTLEMENT_MAX_ATTEMPTS = int(os.environ.get('SETTLEMENT_MAX_ATTEMPTS', 10))
+    IDEMPOTENCY_KEY_TTL = float(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+    IDEMPOTENCY_KEY_MAX_LENGTH = int(os.environ.get('IDEMPOTENCY_KEY_MAX_LENGTH', 255))
+    # A retry takes over a key whose request has held it this long without finishing
+    IDEMPOTENCY_KEY_LEASE_SECONDS = float(os.environ.get('IDEMPOTENCY_KEY_LEASE_SECONDS', 60))
+    IDEMPOTENCY_KEY_PURGE_INTERVAL = float(os.environ.get('IDEMPOTENCY_KEY_PURGE_INTERVAL', 300))
+
+    # Bank payment registries (POST /api/payments/registry)
+    ACCOUNT_SERVICE_URL = os.getenv('ACCOUNT_SERVICE_URL', 'http://account:5000')
+    REGISTRY_BATCH_SIZE = int(os.environ.get('REGISTRY_BATCH_SIZE', 500))
+    REGISTRY_MAX_REPORTED = int(os.environ.get('REGISTRY_MAX_REPORTED', 1000))
+    REGISTRY_LOOKUP_TIMEOUT = float(os.environ.get('REGISTRY_LOOKUP_TIMEOUT', 30))
+
+    # SQLite connection tuning (database/connection.py)
+    DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+    DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 20000))
+    DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_CACHED_STATEMENTS = int(os.environ.get('DB_CACHED_STATEMENTS', 512))
+
+    # Group commit: queue writes to one writer thread per process (database/write_queue.py)
+    DB_WRITE_QUEUE = os.environ.get('DB_WRITE_QUEUE', 'False').lower() == 'true'
+    DB_WRITE_BATCH_SIZE = int(os.environ.get('DB_WRITE_BATCH_SIZE', 100))
+    DB_WRITE_MAX_WAIT_MS = float(os.environ.get('DB_WRITE_MAX_WAIT_MS', 2))
+    # How long a request waits for its queued write before giving up
+    DB_WRITE_TIMEOUT_MS = int(os.environ.get('DB_WRITE_TIMEOUT_MS', 30000))
+
 
 DB_PATH = 'payments_new/data/payment.db'
 BILLING_URL = 'http://charges-service:5003/api/billing/complete'
@@ -1,72 +1,566 @@
+import json
+import time
+import uuid
+
 from database.connection import get_db
+from database.write_queue import run_write
 
 class Payment:
     @staticmethod
-    def create_payment(account_id, amount, billing_ids, status="PROCESSING"):
-        """Create a new payment record."""
-        conn = get_db()
-        try:
-            cursor = conn.execute(
+    def add_items(conn, payment_id, amount, billing_ids):
+        """Link a payment to its bills, inside the caller's transaction.
+
+        The split of a payment over several bills is not known, so only a
+        single-bill payment records the amount on its item.
+        """
+        item_amount = amount if len(billing_ids) == 1 else None
+        conn.executemany(
+            'INSERT OR IGNORE INTO payment_items (payment_id, bill_id, amount) VALUES (?, ?, ?)',
+            [(payment_id, bill_id, item_amount) for bill_id in billing_ids]
+        )
+
+    @staticmethod
+    def create_pending_payment(account_id, amount, billing_ids, idempotency_claim=None):
+        """Create a PROCESSING payment and its processing job in one transaction.
+
+        With an idempotency key, the key's stored response is written in the
+        same transaction, so a retry can never create a second payment.
+        """
+        def insert(conn):
+            payment_id = conn.execute(
                 '''
                 INSERT INTO payments (account_id, amount, billing_ids, status)
-                VALUES (?, ?, ?, ?)
+                VALUES (?, ?, ?, 'PROCESSING')
                 ''',
-                (account_id, amount, ", ".join(str(id) for id in billing_ids), status)
+                (account_id, amount, ", ".join(str(id) for id in billing_ids))
+            ).lastrowid
+            Payment.add_items(conn, payment_id, amount, billing_ids)
+            conn.execute(
+                'INSERT INTO payment_jobs (payment_id, run_after) VALUES (?, ?)',
+                (payment_id, time.time())
             )
-            conn.commit()
-            return cursor.lastrowid
-        finally:
-            conn.close()
+            if idempotency_claim is not None:
+                IdempotencyKey.complete(
+                    idempotency_claim['key'], idempotency_claim['owner'], 202,
+                    Payment.accepted_response(payment_id), payment_id=payment_id, conn=conn
+                )
+            return payment_id
+
+        return run_write(insert)
+
+    @staticmethod
+    def accepted_response(payment_id):
+        """Response body for a payment accepted for processing."""
+        return {"success": True, "data": {"id": payment_id, "status": "PROCESSING"}}
 
     @staticmethod
     def get_payment_by_id(payment_id):
         """Get payment by ID."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             row = conn.execute(
                 'SELECT * FROM payments WHERE id = ?',
                 (payment_id,)
             ).fetchone()
             return row
-        finally:
-            conn.close()
 
     @staticmethod
-    def update_payment_status(payment_id, new_status):
-        """Update payment status."""
-        conn = get_db()
-        try:
-            conn.execute(
-                'UPDATE payments SET status = ? WHERE id = ?',
-                (new_status, payment_id)
-            )
-            conn.commit()
-        finally:
-            conn.close()
+    def get_bill_ids(payment_ids):
+        """Map each payment ID to the IDs of the bills it pays."""
+        bill_ids = {payment_id: [] for payment_id in payment_ids}
+        with get_db() as conn:
+            payment_ids = list(bill_ids)
+            for start in range(0, len(payment_ids), 500):
+                chunk = payment_ids[start:start + 500]
+                rows = conn.execute(
+                    f'''
+                    SELECT payment_id, bill_id FROM payment_items
+                    WHERE payment_id IN ({", ".join("?" * len(chunk))})
+                    ''',
+                    chunk
+                ).fetchall()
+                for row in rows:
+                    bill_ids[row['payment_id']].append(row['bill_id'])
+            return bill_ids
+
+    @staticmethod
+    def create_registry_payments(payments):
+        """Insert COMPLETED bank payments with their items and settlements in one transaction.
+
+        `payments` holds (external_id, account_id, amount, items) tuples,
+        where items are (bill_id, amount) pairs. Returns the new payment ID
+        of each entry, or None where the external ID already exists.
+        """
+        def insert(conn):
+            payment_ids = []
+            for external_id, account_id, amount, items in payments:
+                row = conn.execute(
+                    '''
+                    INSERT INTO payments (account_id, amount, billing_ids, status, external_id)
+                    VALUES (?, ?, ?, 'COMPLETED', ?)
+                    ON CONFLICT DO NOTHING
+                    RETURNING id
+                    ''',
+                    (account_id, amount, ", ".join(str(bill_id) for bill_id, _ in items), external_id)
+                ).fetchone()
+                if row is None:
+                    payment_ids.append(None)
+                    continue
+
+                conn.executemany(
+                    'INSERT INTO payment_items (payment_id, bill_id, amount) VALUES (?, ?, ?)',
+                    [(row['id'], bill_id, bill_amount) for bill_id, bill_amount in items]
+                )
+                SettlementOutbox.add(conn, row['id'], [bill_id for bill_id, _ in items])
+                payment_ids.append(row['id'])
+            return payment_ids
+
+        return run_write(insert)
+
+    @staticmethod
+    def get_existing_external_ids(external_ids):
+        """Return the subset of external IDs that already have a payment."""
+        with get_db() as conn:
+            existing = set()
+            for start in range(0, len(external_ids), 500):
+                chunk = external_ids[start:start + 500]
+                rows = conn.execute(
+                    f'SELECT external_id FROM payments WHERE external_id IN ({", ".join("?" * len(chunk))})',
+                    chunk
+                ).fetchall()
+                existing.update(row['external_id'] for row in rows)
+            return existing
+
+    @staticmethod
+    def get_covered_bill_ids(bill_ids):
+        """Return the subset of bill IDs already covered by a payment that has not failed."""
+        with get_db() as conn:
+            covered = set()
+            for start in range(0, len(bill_ids), 500):
+                chunk = bill_ids[start:start + 500]
+                rows = conn.execute(
+                    f'''
+                    SELECT DISTINCT payment_items.bill_id
+                    FROM payment_items
+                    JOIN payments ON payments.id = payment_items.payment_id
+                    WHERE payment_items.bill_id IN ({", ".join("?" * len(chunk))})
+                    AND payments.status != 'ERROR'
+                    ''',
+                    chunk
+                ).fetchall()
+                covered.update(row['bill_id'] for row in rows)
+            return covered
+
+    @staticmethod
+    def get_payments_by_bill(bill_id):
+        """Get the payments of a bill with the amount applied to it, oldest first."""
+        with get_db() as conn:
+            rows = conn.execute(
+                '''
+                SELECT payments.*, payment_items.amount AS bill_amount
+                FROM payment_items
+                JOIN payments ON payments.id = payment_items.payment_id
+                WHERE payment_items.bill_id = ?
+                ORDER BY payment_items.payment_id
+                ''',
+                (bill_id,)
+            ).fetchall()
+            return rows
 
     @staticmethod
     def get_payments_by_account(account_id):
         """Get all payments for a specific account."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             rows = conn.execute(
                 'SELECT * FROM payments WHERE account_id = ?',
                 (account_id,)
             ).fetchall()
             return rows
-        finally:
-            conn.close()
 
     @staticmethod
-    def to_dict(row):
+    def get_payments_page(account_id, limit, cursor=None):
+        """Get one page of an account's payments, newest first."""
+        with get_db() as conn:
+            query = 'SELECT * FROM payments WHERE account_id = ?'
+            params = [account_id]
+            if cursor:
+                query += ' AND id < ?'
+                params.append(cursor)
+            query += ' ORDER BY id DESC LIMIT ?'
+            params.append(limit)
+            return conn.execute(query, params).fetchall()
+
+    @staticmethod
+    def get_totals_by_account(account_id):
+        """Get payment totals per status for an account."""
+        with get_db() as conn:
+            rows = conn.execute(
+                '''
+                SELECT status, SUM(amount) AS amount, COUNT(*) AS count
+                FROM payments
+                WHERE account_id = ?
+                GROUP BY status
+                ''',
+                (account_id,)
+            ).fetchall()
+            return rows
+
+    @staticmethod
+    def to_dict(row, bill_ids):
         """Convert database row to dict."""
         if row is None:
             return None
         return {
             'id': row['id'],
             'account_id': row['account_id'],
-            'billing_ids': [int(id) for id in row['billing_ids'].split(',')],
+            'billing_ids': bill_ids,
             'amount': row['amount'],
             'status': row['status'],
             'created_at': row['created_at']
         }
+
+    @staticmethod
+    def to_dicts(rows):
+        """Convert database rows to dicts, loading their bill IDs in one query."""
+        bill_ids = Payment.get_bill_ids([row['id'] for row in rows])
+        return [Payment.to_dict(row, bill_ids[row['id']]) for row in rows]
+
+
+class PaymentJob:
+    @staticmethod
+    def claim(lease_seconds, max_attempts):
+        """Lease the next due job, or one whose lease has expired, and return it.
+
+        Idle polls only read; the write lock is taken once a job is due.
+        A job whose lease expired on its last allowed attempt is not
+        leased again but failed, together with its payment.
+        """
+        with get_db() as conn:
+            now = time.time()
+            due = conn.execute(
+                '''
+                SELECT 1 FROM payment_jobs
+                WHERE (status = 'PENDING' AND run_after <= ?)
+                OR (status = 'RUNNING' AND locked_until < ?)
+                LIMIT 1
+                ''',
+                (now, now)
+            ).fetchone()
+            if due is None:
+                return None
+
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                '''
+                UPDATE payments SET status = 'ERROR'
+                WHERE id IN (
+                    SELECT payment_id FROM payment_jobs
+                    WHERE status = 'RUNNING' AND locked_until < ? AND attempts >= ?
+                )
+                ''',
+                (now, max_attempts)
+            )
+            conn.execute(
+                '''
+                UPDATE payment_jobs
+                SET status = 'FAILED', locked_until = NULL, last_error = 'Lease expired on the last attempt',
+                    updated_at = datetime('now')
+                WHERE status = 'RUNNING' AND locked_until < ? AND attempts >= ?
+                ''',
+                (now, max_attempts)
+            )
+            row = conn.execute(
+                '''
+                UPDATE payment_jobs
+                SET status = 'RUNNING', attempts = attempts + 1, locked_until = ?, updated_at = datetime('now')
+                WHERE id = (
+                    SELECT id FROM payment_jobs
+                    WHERE (status = 'PENDING' AND run_after <= ?)
+                    OR (status = 'RUNNING' AND locked_until < ?)
+                    ORDER BY run_after
+                    LIMIT 1
+                )
+                RETURNING *
+                ''',
+                (now + lease_seconds, now, now)
+            ).fetchone()
+            conn.commit()
+            return row
+
+    @staticmethod
+    def complete(job_id, payment_id, billing_ids):
+        """Mark a job done, its payment COMPLETED and queue its settlement, in one transaction."""
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE payments SET status = 'COMPLETED' WHERE id = ?",
+                (payment_id,)
+            )
+            SettlementOutbox.add(conn, payment_id, billing_ids)
+            conn.execute(
+                '''
+                UPDATE payment_jobs
+                SET status = 'DONE', locked_until = NULL, last_error = NULL, updated_at = datetime('now')
+                WHERE id = ?
+                ''',
+                (job_id,)
+            )
+
+    @staticmethod
+    def retry(job_id, delay, error):
+        """Put a job back in the queue to run again after `delay` seconds."""
+        with get_db() as conn:
+            conn.execute(
+                '''
+                UPDATE payment_jobs
+                SET status = 'PENDING', run_after = ?, locked_until = NULL, last_error = ?, updated_at = datetime('now')
+                WHERE id = ?
+                ''',
+                (time.time() + delay, error, job_id)
+            )
+            conn.commit()
+
+    @staticmethod
+    def fail(job_id, payment_id, error):
+        """Give up on a job and mark its payment ERROR in one transaction."""
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE payments SET status = 'ERROR' WHERE id = ?",
+                (payment_id,)
+            )
+            conn.execute(
+                '''
+                UPDATE payment_jobs
+                SET status = 'FAILED', locked_until = NULL, last_error = ?, updated_at = datetime('now')
+                WHERE id = ?
+                ''',
+                (error, job_id)
+            )
+
+    @staticmethod
+    def get_by_payment_id(payment_id):
+        """Get the processing job of a payment."""
+        with get_db() as conn:
+            return conn.execute(
+                'SELECT * FROM payment_jobs WHERE payment_id = ?',
+                (payment_id,)
+            ).fetchone()
+
+    @staticmethod
+    def to_dict(row):
+        """Convert database row to dict."""
+        if row is None:
+            return None
+        return {
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'last_error': row['last_error'],
+            'updated_at': row['updated_at']
+        }
+
+
+class SettlementOutbox:
+    @staticmethod
+    def add(conn, payment_id, billing_ids):
+        """Queue marking a payment's bills paid, inside the caller's transaction."""
+        conn.execute(
+            'INSERT INTO settlement_outbox (payment_id, billing_ids, next_attempt_at) VALUES (?, ?, ?)',
+            (payment_id, json.dumps(billing_ids), time.time())
+        )
+
+    @staticmethod
+    def claim_batch(limit, lease_seconds):
+        """Lease up to `limit` due settlement events, oldest first.
+
+        Idle polls only read; the write lock is taken once an event is due.
+        """
+        with get_db() as conn:
+            now = time.time()
+            due = conn.execute(
+                '''
+                SELECT 1 FROM settlement_outbox
+                WHERE status = 'PENDING' AND next_attempt_at <= ?
+                AND (locked_until IS NULL OR locked_until < ?)
+                LIMIT 1
+                ''',
+                (now, now)
+            ).fetchone()
+            if due is None:
+                return []
+
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                '''
+                UPDATE settlement_outbox
+                SET attempts = attempts + 1, locked_until = ?
+                WHERE id IN (
+                    SELECT id FROM settlement_outbox
+                    WHERE status = 'PENDING' AND next_attempt_at <= ?
+                    AND (locked_until IS NULL OR locked_until < ?)
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                RETURNING id, payment_id, billing_ids, attempts
+                ''',
+                (now + lease_seconds, now, now, limit)
+            ).fetchall()
+            conn.commit()
+            return rows
+
+    @staticmethod
+    def mark_sent(event_ids):
+        """Mark settlement events as delivered."""
+        with get_db() as conn:
+            conn.executemany(
+                '''
+                UPDATE settlement_outbox
+                SET status = 'SENT', locked_until = NULL, last_error = NULL, sent_at = datetime('now')
+                WHERE id = ?
+                ''',
+                [(event_id,) for event_id in event_ids]
+            )
+            conn.commit()
+
+    @staticmethod
+    def reschedule(events, delays, error):
+        """Release failed settlement events to be retried after their delays."""
+        with get_db() as conn:
+            now = time.time()
+            conn.executemany(
+                '''
+                UPDATE settlement_outbox
+                SET next_attempt_at = ?, locked_until = NULL, last_error = ?
+                WHERE id = ?
+                ''',
+                [(now + delay, error, event['id']) for event, delay in zip(events, delays)]
+            )
+            conn.commit()
+
+    @staticmethod
+    def park(event_ids, error):
+        """Move settlement events that cannot be delivered to FAILED, where they wait for an operator."""
+        with get_db() as conn:
+            conn.executemany(
+                '''
+                UPDATE settlement_outbox
+                SET status = 'FAILED', locked_until = NULL, last_error = ?
+                WHERE id = ?
+                ''',
+                [(error, event_id) for event_id in event_ids]
+            )
+            conn.commit()
+
+    @staticmethod
+    def purge_sent(retention_days):
+        """Delete delivered events older than the retention period."""
+        with get_db() as conn:
+            cursor = conn.execute(
+                "DELETE FROM settlement_outbox WHERE status = 'SENT' AND sent_at < datetime('now', ?)",
+                (f'-{retention_days} days',)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    @staticmethod
+    def get_by_payment_id(payment_id):
+        """Get the latest settlement event of a payment."""
+        with get_db() as conn:
+            return conn.execute(
+                'SELECT * FROM settlement_outbox WHERE payment_id = ? ORDER BY id DESC LIMIT 1',
+                (payment_id,)
+            ).fetchone()
+
+    @staticmethod
+    def to_dict(row):
+        """Convert database row to dict."""
+        if row is None:
+            return None
+        return {
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'last_error': row['last_error'],
+            'sent_at': row['sent_at']
+        }
+
+
+class IdempotencyKeyTakenOver(Exception):
+    """The request's lease on its idempotency key expired and another request now holds it."""
+
+
+class IdempotencyKey:
+    _purged_at = 0.0
+
+    @staticmethod
+    def claim(key, request_hash, ttl, lease_seconds, purge_interval):
+        """Reserve a key for a new request, or return the row already holding it.
+
+        Returns (owner, row). owner is a fresh token when the caller now
+        holds the key and must do the work; the key is then leased for
+        `lease_seconds`, after which a retry with the same request takes
+        it over. Otherwise owner is None and row is the holder. Expired
+        keys are treated as absent and replaced, and are deleted every
+        `purge_interval` seconds.
+        """
+        with get_db() as conn:
+            now = time.time()
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT * FROM idempotency_keys WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+            owner = None
+            if row is None:
+                owner = uuid.uuid4().hex
+                conn.execute(
+                    '''
+                    INSERT OR REPLACE INTO idempotency_keys (key, request_hash, created_at, expires_at, locked_until, owner)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ''',
+                    (key, request_hash, now, now + ttl, now + lease_seconds, owner)
+                )
+            elif (row['status'] == 'IN_PROGRESS' and row['request_hash'] == request_hash
+                    and (row['locked_until'] or 0) < now):
+                # The request holding the key died or stalled; this retry takes over
+                owner = uuid.uuid4().hex
+                conn.execute(
+                    'UPDATE idempotency_keys SET locked_until = ?, owner = ? WHERE key = ?',
+                    (now + lease_seconds, owner, key)
+                )
+                row = None
+
+            if now - IdempotencyKey._purged_at >= purge_interval:
+                IdempotencyKey._purged_at = now
+                conn.execute('DELETE FROM idempotency_keys WHERE expires_at <= ?', (now,))
+            conn.commit()
+            return owner, row
+
+    @staticmethod
+    def complete(key, owner, response_code, response_body, payment_id=None, conn=None):
+        """Store the final response of a claimed key, inside `conn`'s transaction if given.
+
+        Raises IdempotencyKeyTakenOver when `owner` no longer holds the key.
+        """
+        params = (payment_id, response_code, json.dumps(response_body), key, owner)
+        sql = '''
+        UPDATE idempotency_keys
+        SET status = 'COMPLETED', payment_id = ?, response_code = ?, response_body = ?, locked_until = NULL
+        WHERE key = ? AND owner = ? AND status = 'IN_PROGRESS'
+        '''
+        if conn is not None:
+            if conn.execute(sql, params).rowcount == 0:
+                raise IdempotencyKeyTakenOver(key)
+            return
+
+        with get_db() as conn:
+            updated = conn.execute(sql, params).rowcount
+            conn.commit()
+        if updated == 0:
+            raise IdempotencyKeyTakenOver(key)
+
+    @staticmethod
+    def release(key, owner):
+        """Drop a claimed key whose request failed, so that it can be retried."""
+        with get_db() as conn:
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE key = ? AND owner = ? AND status = 'IN_PROGRESS'",
+                (key, owner)
+            )
+            conn.commit()
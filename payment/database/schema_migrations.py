@@ -0,0 +1,124 @@
+# (version, name, statements); append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, 'index payments by account', [
+        'CREATE INDEX IF NOT EXISTS idx_payments_account ON payments (account_id)',
+    ]),
+    (2, 'covering index for per-status payment totals', [
+        'CREATE INDEX IF NOT EXISTS idx_payments_account_status_amount ON payments (account_id, status, amount)',
+    ]),
+    (3, 'durable payment processing jobs', [
+        '''
+        CREATE TABLE IF NOT EXISTS payment_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payment_id INTEGER NOT NULL UNIQUE REFERENCES payments (id),
+            status TEXT NOT NULL DEFAULT 'PENDING'
+                CHECK (status IN ('PENDING', 'RUNNING', 'DONE', 'FAILED')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_after REAL NOT NULL,
+            locked_until REAL,
+            last_error TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_payment_jobs_status_run_after ON payment_jobs (status, run_after)',
+    ]),
+    (4, 'settlement outbox', [
+        '''
+        CREATE TABLE IF NOT EXISTS settlement_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payment_id INTEGER NOT NULL REFERENCES payments (id),
+            billing_ids TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'SENT')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            locked_until REAL,
+            last_error TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            sent_at TEXT
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_settlement_outbox_status_next ON settlement_outbox (status, next_attempt_at)',
+        'CREATE INDEX IF NOT EXISTS idx_settlement_outbox_payment ON settlement_outbox (payment_id)',
+    ]),
+    (5, 'idempotency keys', [
+        '''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            request_hash TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'IN_PROGRESS' CHECK (status IN ('IN_PROGRESS', 'COMPLETED')),
+            payment_id INTEGER REFERENCES payments (id),
+            response_code INTEGER,
+            response_body TEXT,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at)',
+    ]),
+    # payments.billing_ids is kept and still written, but no longer read
+    (6, 'payment to bill link table', [
+        '''
+        CREATE TABLE IF NOT EXISTS payment_items (
+            payment_id INTEGER NOT NULL REFERENCES payments (id),
+            bill_id INTEGER NOT NULL,
+            amount REAL,
+            PRIMARY KEY (payment_id, bill_id)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_payment_items_bill ON payment_items (bill_id, payment_id)',
+        '''
+        WITH RECURSIVE split (payment_id, amount, bill_count, bill_id, rest) AS (
+            SELECT id, amount,
+                   length(billing_ids) - length(replace(billing_ids, ',', '')) + 1,
+                   '', billing_ids || ','
+            FROM payments
+            UNION ALL
+            SELECT payment_id, amount, bill_count,
+                   trim(substr(rest, 1, instr(rest, ',') - 1)),
+                   substr(rest, instr(rest, ',') + 1)
+            FROM split
+            WHERE rest != ''
+        )
+        INSERT OR IGNORE INTO payment_items (payment_id, bill_id, amount)
+        SELECT payment_id, CAST(bill_id AS INTEGER), CASE WHEN bill_count = 1 THEN amount END
+        FROM split
+        WHERE bill_id != ''
+        ''',
+    ]),
+    (7, 'bank registry transaction ids', [
+        'ALTER TABLE payments ADD COLUMN external_id TEXT',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_external_id ON payments (external_id) WHERE external_id IS NOT NULL',
+    ]),
+    # SQLite cannot alter a CHECK constraint, so the table is rebuilt
+    (8, 'dead-lettered settlement events', [
+        '''
+        CREATE TABLE settlement_outbox_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payment_id INTEGER NOT NULL REFERENCES payments (id),
+            billing_ids TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'SENT', 'FAILED')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            locked_until REAL,
+            last_error TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            sent_at TEXT
+        )
+        ''',
+        '''
+        INSERT INTO settlement_outbox_new
+        (id, payment_id, billing_ids, status, attempts, next_attempt_at, locked_until, last_error, created_at, sent_at)
+        SELECT id, payment_id, billing_ids, status, attempts, next_attempt_at, locked_until, last_error, created_at, sent_at
+        FROM settlement_outbox
+        ''',
+        'DROP TABLE settlement_outbox',
+        'ALTER TABLE settlement_outbox_new RENAME TO settlement_outbox',
+        'CREATE INDEX IF NOT EXISTS idx_settlement_outbox_status_next ON settlement_outbox (status, next_attempt_at)',
+        'CREATE INDEX IF NOT EXISTS idx_settlement_outbox_payment ON settlement_outbox (payment_id)',
+    ]),
+    (9, 'leases on in-progress idempotency keys', [
+        'ALTER TABLE idempotency_keys ADD COLUMN locked_until REAL',
+        'ALTER TABLE idempotency_keys ADD COLUMN owner TEXT',
+    ]),
+]
@@ -1,41 +1,97 @@
-from flask import Blueprint, current_app, request, jsonify
-from services.payment_service import PaymentService
-from config import Config
+import csv
+
 import requests
+from flask import Blueprint, current_app, request, jsonify
+from services.payment_service import IdempotencyKeyTakenOver, PaymentService
+from services.registry_service import CSV_MIMETYPES, NDJSON_MIMETYPES, RegistryService
+from services.payment_worker import notify_payment_workers
 
 payment_bp = Blueprint('payments', __name__)
 
 @payment_bp.route('/api/payments', methods=['POST'])
 def create_payment():
+    idempotency_key = request.headers.get('Idempotency-Key')
+    claim = None
     try:
         data = request.get_json()
 
         if not data:
             return jsonify({"success": False, "message": "No data provided"}), 400
 
+        if idempotency_key is not None:
+            claim, replay = PaymentService.claim_idempotency_key(idempotency_key, data, request.headers.get('X-User-Id'))
+            if replay is not None:
+                body, code, headers = replay
+                return jsonify(body), code, headers
+
         account_id = data.get('account_id')
         billing_ids = data.get('billing_ids')
         amount = data.get('amount')
 
-        payment_id = PaymentService.create_payment(account_id, billing_ids, amount)
+        payment_id = PaymentService.create_payment(account_id, billing_ids, amount, claim)
+        notify_payment_workers()
 
-        try:
-            req = requests.put(f"{Config.BILLING_SERVICE_URL}/api/billings/paid", json={
-                "billing_ids": billing_ids
-            })
-        except Exception as e:
-            return jsonify({"success": False, "message": "Billing service unavailable"}), 503
+        return jsonify(PaymentService.accepted_response(payment_id)), 202
 
-        if req.status_code != 200:
-            return jsonify({"success": False, "message": "Failed to update billing status"}), 500
+    except ValueError as e:
+        body = {"success": False, "message": str(e)}
+        if claim is not None:
+            try:
+                PaymentService.complete_idempotency_key(claim, body, 400)
+            except IdempotencyKeyTakenOver:
+                pass
+        return jsonify(body), 400
 
-        return jsonify({
-            "success": True,
-            "data": {"id": payment_id}
-        }), 201
+    except IdempotencyKeyTakenOver:
+        # This request outlived its lease; the retry that took the key over answers instead
+        body, code, headers = PaymentService.in_progress_response()
+        return jsonify(body), code, headers
 
-    except ValueError as e:
-        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception:
+        if claim is not None:
+            PaymentService.release_idempotency_key(claim)
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+
+@payment_bp.route('/api/payments/registry', methods=['POST'])
+def import_registry():
+    mimetype = request.mimetype
+    if mimetype not in CSV_MIMETYPES + NDJSON_MIMETYPES:
+        return jsonify({"success": False, "message": "Expected a text/csv or application/x-ndjson body"}), 415
+
+    # Batches committed before a failure stay; resending the registry skips them as duplicates
+    summary = RegistryService.new_summary()
+    try:
+        RegistryService.ingest(request.stream, mimetype, summary)
+
+        return jsonify({"success": True, "data": summary}), 200
+
+    except (csv.Error, UnicodeDecodeError) as e:
+        return jsonify({"success": False, "message": f"Malformed registry: {e}", "data": summary}), 400
+
+    except requests.exceptions.RequestException:
+        return jsonify({"success": False, "message": "Account or billing service unavailable", "data": summary}), 503
+
+    except Exception:
+        return jsonify({"success": False, "message": "Internal server error", "data": summary}), 500
+
+@payment_bp.route('/api/payments/<int:payment_id>/status', methods=['GET'])
+def get_payment_status(payment_id):
+    try:
+        status = PaymentService.get_payment_status(payment_id)
+        if status is None:
+            return jsonify({"success": False, "message": "Payment not found"}), 404
+
+        return jsonify({"success": True, "data": status}), 200
+
+    except Exception:
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+
+@payment_bp.route('/api/payments/by-bill/<int:bill_id>', methods=['GET'])
+def get_payments_by_bill(bill_id):
+    try:
+        payments = PaymentService.get_payments_by_bill(bill_id)
+
+        return jsonify({"success": True, "data": payments}), 200
 
     except Exception:
         return jsonify({"success": False, "message": "Internal server error"}), 500
@@ -43,6 +99,17 @@ def create_payment():
 @payment_bp.route('/api/payments/<int:account_id>', methods=['GET'])
 def get_payments(account_id):
     try:
+        args = request.args
+        # Without summary=1 the response keeps the plain list of payments
+        if args.get('summary', '0').lower() in ('1', 'true'):
+            data = PaymentService.get_payment_summary(
+                account_id,
+                details=args.get('details', '1').lower() not in ('0', 'false'),
+                limit=args.get('limit'),
+                cursor=args.get('cursor')
+            )
+            return jsonify({"success": True, "data": data}), 200
+
         payments = PaymentService.get_payments_by_account(account_id)
 
         return jsonify({
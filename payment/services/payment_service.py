@@ -1,51 +1,264 @@
-from database.models import Payment
-from monitoring.logger import log_database_operation, log_business_event
+import hashlib
+import json
 import time
 
+import requests
+
+from config import Config
+from database.models import IdempotencyKey, IdempotencyKeyTakenOver, Payment, PaymentJob, SettlementOutbox
+from monitoring.logger import log_business_event, log_database_operation, log_error, log_warning
+
+# Client errors that say "not now" rather than "never": timeout, conflict, rate limit
+TRANSIENT_STATUS_CODES = (408, 409, 429)
+
+
+def backoff(attempts):
+    """Exponential retry delay in seconds after the given number of attempts."""
+    return min(Config.PAYMENT_RETRY_BASE_SECONDS * 2 ** (attempts - 1), Config.PAYMENT_RETRY_MAX_SECONDS)
+
+
 class PaymentService:
     @staticmethod
-    def create_payment(account_id, billing_ids, amount):
-        try:
-            if not billing_ids:
-                raise ValueError("Billing IDs are required")
-            if account_id is None:
-                raise ValueError("Account ID is required")
-            if amount is None:
-                raise ValueError("Amount is required")
-            if not isinstance(billing_ids, list):
-                raise ValueError("Billing IDs must be a list")
-            if amount <= 0:
-                raise ValueError("Amount must be positive")
-            if not isinstance(amount, (int, float)):
-                raise ValueError("Amount must be a number")
+    def create_payment(account_id, billing_ids, amount, idempotency_claim=None):
+        """Record a PROCESSING payment and queue it for the background workers."""
+        if not billing_ids:
+            raise ValueError("Billing IDs are required")
+        if account_id is None:
+            raise ValueError("Account ID is required")
+        if amount is None:
+            raise ValueError("Amount is required")
+        if not isinstance(billing_ids, list):
+            raise ValueError("Billing IDs must be a list")
+        if not all(isinstance(id, int) and not isinstance(id, bool) and id > 0 for id in billing_ids):
+            raise ValueError("Billing IDs must be positive integers")
+        if not isinstance(amount, (int, float)) or isinstance(amount, bool):
+            raise ValueError("Amount must be a number")
+        if amount <= 0:
+            raise ValueError("Amount must be positive")
+
+        amount = float(amount)
+
+        payment_id = Payment.create_pending_payment(account_id, amount, billing_ids, idempotency_claim)
+        log_database_operation("Create payment", payment_id=payment_id, account_id=account_id, amount=amount, billing_ids=billing_ids)
+
+        return payment_id
+
+    @staticmethod
+    def accepted_response(payment_id):
+        """Response body for a payment accepted for processing."""
+        return Payment.accepted_response(payment_id)
+
+    @staticmethod
+    def claim_idempotency_key(key, data, user_id=None):
+        """Reserve an Idempotency-Key for a request body.
+
+        Keys are scoped to the calling user and the payment's account, so
+        two callers can never see each other's keys or responses. Returns
+        (claim, replay). When the request is new, claim is what
+        create_payment and the other *_idempotency_key calls take and
+        replay is None. Otherwise claim is None and replay is the (body,
+        code, headers) to answer with: the stored response of the finished
+        request, 409 while it is still in progress, or 422 when the key
+        was used with a different body.
+        """
+        if not key or len(key) > Config.IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise ValueError(f"Idempotency-Key must be 1 to {Config.IDEMPOTENCY_KEY_MAX_LENGTH} characters")
 
-            amount = float(amount)
+        account_id = data.get('account_id') if isinstance(data, dict) else None
+        scoped_key = json.dumps([user_id, account_id, key])
+        request_hash = hashlib.sha256(
+            json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+        owner, row = IdempotencyKey.claim(
+            scoped_key, request_hash, Config.IDEMPOTENCY_KEY_TTL,
+            Config.IDEMPOTENCY_KEY_LEASE_SECONDS, Config.IDEMPOTENCY_KEY_PURGE_INTERVAL
+        )
+        if owner is not None:
+            return {'key': scoped_key, 'owner': owner}, None
 
-            payment_id = Payment.create_payment(account_id, amount, billing_ids, 'PROCESSING')
-            log_database_operation("Create payment", payment_id=payment_id, account_id=account_id, amount=amount, billing_ids=billing_ids)
+        if row['request_hash'] != request_hash:
+            return None, ({"success": False, "message": "Idempotency-Key was already used with a different request"}, 422, {})
+        if row['status'] != 'COMPLETED':
+            return None, PaymentService.in_progress_response()
 
-            time.sleep(2)
+        log_business_event("Idempotent replay", payment_id=row['payment_id'])
+        return None, (json.loads(row['response_body']), row['response_code'], {'Idempotent-Replayed': 'true'})
 
-            Payment.update_payment_status(payment_id, 'COMPLETED')
-            log_database_operation("Update payment status", payment_id=payment_id, status='COMPLETED')
+    @staticmethod
+    def in_progress_response():
+        """Response for a request whose Idempotency-Key is held by another request."""
+        return {"success": False, "message": "A request with this Idempotency-Key is in progress"}, 409, {}
 
-            log_business_event("Payment completed", payment_id=payment_id)
+    @staticmethod
+    def complete_idempotency_key(claim, body, code):
+        """Store the response of a claimed key that did not create a payment."""
+        IdempotencyKey.complete(claim['key'], claim['owner'], code, body)
 
-            return payment_id
+    @staticmethod
+    def release_idempotency_key(claim):
+        """Free a claimed key after an unexpected failure so the client can retry."""
+        IdempotencyKey.release(claim['key'], claim['owner'])
+
+    @staticmethod
+    def process_job(job):
+        """Process a leased payment job and complete the payment.
+
+        Completion also queues the settlement in the outbox, in the same
+        transaction; the settlement relay delivers it to billing. A failed
+        attempt is retried with exponential backoff; after
+        PAYMENT_JOB_MAX_ATTEMPTS the payment is marked ERROR.
+        """
+        try:
+            row = Payment.get_payment_by_id(job['payment_id'])
+            if row is None:
+                raise LookupError(f"Payment {job['payment_id']} not found")
+            payment = Payment.to_dicts([row])[0]
+
+            # Stands in for the call to the payment provider
+            time.sleep(Config.PAYMENT_PROCESSING_DELAY)
+
+            PaymentJob.complete(job['id'], payment['id'], payment['billing_ids'])
+            log_business_event("Payment completed", payment_id=payment['id'], attempts=job['attempts'])
         except Exception as e:
-            print(f"Error creating payment: {e}")
+            if job['attempts'] >= Config.PAYMENT_JOB_MAX_ATTEMPTS:
+                PaymentJob.fail(job['id'], job['payment_id'], str(e))
+                log_error(e, payment_id=job['payment_id'], attempts=job['attempts'])
+                return
+
+            delay = backoff(job['attempts'])
+            PaymentJob.retry(job['id'], delay, str(e))
+            log_warning(f"Payment processing failed, retrying in {delay}s", payment_id=job['payment_id'], error=e)
 
     @staticmethod
-    def get_payments_by_account(account_id):
+    def settle_batch(events):
+        """Deliver leased settlement events to billing as one bulk PUT.
+
+        The billing ids of every event are coalesced into a single request;
+        marking a bill paid twice is harmless, so a redelivered batch is
+        safe. A 4xx answer other than TRANSIENT_STATUS_CODES will not change
+        on retry, so the batch is split in halves and resent until the
+        refused events are isolated, and those are parked as FAILED. On
+        other failures each event is retried with its own backoff, and
+        parked once it has been tried SETTLEMENT_MAX_ATTEMPTS times.
+        """
+        billing_ids = sorted({billing_id for event in events for billing_id in json.loads(event['billing_ids'])})
         try:
-            if not account_id:
-                raise ValueError("Account ID is required")
+            response = requests.put(
+                f"{Config.BILLING_SERVICE_URL}/api/billings/paid",
+                json={"billing_ids": billing_ids},
+                timeout=Config.SETTLEMENT_TIMEOUT
+            )
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            status_code = e.response.status_code
+            if status_code >= 500 or status_code in TRANSIENT_STATUS_CODES:
+                PaymentService._reschedule_settlements(events, str(e))
+                return False
+            if len(events) > 1:
+                middle = len(events) // 2
+                first = PaymentService.settle_batch(events[:middle])
+                second = PaymentService.settle_batch(events[middle:])
+                return first and second
+            SettlementOutbox.park([events[0]['id']], f"{e}: {e.response.text[:500]}")
+            log_error(e, payment_id=events[0]['payment_id'], bills=billing_ids)
+            return False
+        except requests.exceptions.RequestException as e:
+            PaymentService._reschedule_settlements(events, str(e))
+            return False
+
+        SettlementOutbox.mark_sent([event['id'] for event in events])
+        log_business_event("Bills settled", events=len(events), bills=len(billing_ids))
+        return True
+
+    @staticmethod
+    def _reschedule_settlements(events, error):
+        exhausted = [event for event in events if event['attempts'] >= Config.SETTLEMENT_MAX_ATTEMPTS]
+        retried = [event for event in events if event['attempts'] < Config.SETTLEMENT_MAX_ATTEMPTS]
+        if retried:
+            SettlementOutbox.reschedule(retried, [backoff(event['attempts']) for event in retried], error)
+            log_warning("Settlement failed", events=len(retried), error=error)
+        if exhausted:
+            SettlementOutbox.park([event['id'] for event in exhausted], error)
+            log_warning("Settlement given up", events=len(exhausted), error=error)
+
+    @staticmethod
+    def get_payment_status(payment_id):
+        """Get a payment's status and the state of its processing job."""
+        row = Payment.get_payment_by_id(payment_id)
+        if row is None:
+            return None
+
+        return {
+            'id': row['id'],
+            'status': row['status'],
+            'job': PaymentJob.to_dict(PaymentJob.get_by_payment_id(payment_id)),
+            'settlement': SettlementOutbox.to_dict(SettlementOutbox.get_by_payment_id(payment_id))
+        }
+
+    @staticmethod
+    def get_payments_by_account(account_id):
+        if not account_id:
+            raise ValueError("Account ID is required")
+
+        rows = Payment.get_payments_by_account(account_id)
+        payments = Payment.to_dicts(rows)
+
+        log_database_operation("Get payments by account", account_id=account_id, count=len(payments))
+
+        return payments
 
+    @staticmethod
+    def get_payments_by_bill(bill_id):
+        """Get the payments that include a bill, for reconciliation."""
+        rows = Payment.get_payments_by_bill(bill_id)
+        payments = Payment.to_dicts(rows)
+        for payment, row in zip(payments, rows):
+            payment['bill_amount'] = row['bill_amount']
+
+        log_database_operation("Get payments by bill", bill_id=bill_id, count=len(payments))
+
+        return payments
+
+    @staticmethod
+    def get_payment_summary(account_id, details=True, limit=None, cursor=None):
+        """Get an account's payment totals per status with an optional page of payments.
+
+        Totals are aggregated in SQL. The payment list is left out when
+        `details` is false and paged newest first when `limit` is given.
+        """
+        if not account_id:
+            raise ValueError("Account ID is required")
+
+        if limit is not None and (not str(limit).isdigit() or not 0 < int(limit) <= Config.PAYMENTS_MAX_PAGE_SIZE):
+            raise ValueError(f"Limit must be between 1 and {Config.PAYMENTS_MAX_PAGE_SIZE}")
+
+        if cursor is not None and not str(cursor).isdigit():
+            raise ValueError("Cursor must be a payment ID")
+
+        by_status = [
+            {'status': row['status'], 'amount': row['amount'], 'count': row['count']}
+            for row in Payment.get_totals_by_account(account_id)
+        ]
+        data = {
+            'total': {
+                'by_status': by_status,
+                'amount': sum(total['amount'] for total in by_status)
+            }
+        }
+
+        if not details:
+            return data
+
+        if limit is None:
             rows = Payment.get_payments_by_account(account_id)
-            payments = [Payment.to_dict(row) for row in rows]
+            data['payments'] = Payment.to_dicts(rows)
+            return data
 
-            log_database_operation("Get payments by account", account_id=account_id, count=len(payments))
+        limit = int(limit)
+        rows = Payment.get_payments_page(account_id, limit + 1, int(cursor) if cursor else None)
+        data['payments'] = Payment.to_dicts(rows[:limit])
+        data['nextCursor'] = str(rows[limit - 1]['id']) if len(rows) > limit else None
 
-            return payments
-        except Exception as e:
-            print(f"Error retrieving payments: {e}")
+        log_database_operation("Get payment summary", account_id=account_id, count=len(data['payments']))
+
+        return data
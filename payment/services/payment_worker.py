@@ -0,0 +1,72 @@
+import threading
+
+from config import Config
+from database.models import PaymentJob
+from monitoring.logger import log_error
+from services.payment_service import PaymentService
+from services.settlement_relay import notify_settlement_relay
+
+
+class PaymentWorkerPool:
+    """Background threads that lease jobs from payment_jobs and process them.
+
+    Jobs are claimed through the database, so pools in several gunicorn
+    workers share one queue, and a job whose worker died is picked up
+    again once its lease expires. Idle threads poll every
+    `poll_interval` seconds or wake up as soon as notify() is called.
+    """
+
+    def __init__(self, app, size, poll_interval):
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.size):
+            thread = threading.Thread(target=self._run, name=f'payment-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    job = PaymentJob.claim(Config.PAYMENT_JOB_LEASE_SECONDS, Config.PAYMENT_JOB_MAX_ATTEMPTS)
+                except Exception as e:
+                    log_error(e, worker=threading.current_thread().name)
+                    job = None
+
+                if job is None:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    continue
+
+                try:
+                    PaymentService.process_job(job)
+                    notify_settlement_relay()
+                except Exception as e:
+                    # The lease expires and the job is claimed again
+                    log_error(e, job_id=job['id'], payment_id=job['payment_id'])
+
+
+_pool = None
+
+
+def start_payment_workers(app):
+    """Start this process's worker pool; PAYMENT_WORKERS=0 leaves processing to other processes."""
+    global _pool
+    if _pool is None and Config.PAYMENT_WORKERS > 0:
+        _pool = PaymentWorkerPool(app, Config.PAYMENT_WORKERS, Config.PAYMENT_WORKER_POLL_INTERVAL)
+        _pool.start()
+    return _pool
+
+
+def notify_payment_workers():
+    """Wake an idle worker in this process to pick up a new job right away."""
+    if _pool is not None:
+        _pool.notify()
@@ -0,0 +1,227 @@
+import csv
+import io
+import json
+import math
+
+import requests
+
+from config import Config
+from database.models import Payment
+from monitoring.logger import log_business_event
+from services.settlement_relay import notify_settlement_relay
+
+CSV_MIMETYPES = ('text/csv', 'application/csv')
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
+REGISTRY_FIELDS = ('external_id', 'account_number', 'amount')
+
+
+def iter_registry_rows(stream, mimetype):
+    """Yield (line number, row) pairs from a CSV or NDJSON body without buffering it."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if mimetype in CSV_MIMETYPES:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def parse_registry_row(row):
+    """Validate one registry line (a CSV dict or an NDJSON line) and return (external_id, account_number, amount)."""
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    missing = [field for field in REGISTRY_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    try:
+        amount = float(row['amount'])
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid amount: {row['amount']}")
+    if not math.isfinite(amount) or amount <= 0:
+        raise ValueError("Amount must be positive")
+
+    return str(row['external_id']).strip(), str(row['account_number']).strip(), round(amount, 2)
+
+
+def allocate(bills, amount):
+    """Cover an account's open bills, oldest first, for as long as the amount pays them in full.
+
+    `bills` is a list of (bill_id, amount in cents) pairs; covered bills are
+    removed from it so that later lines cannot take them again. Whatever
+    is left of the amount stays on the payment as an overpayment.
+    """
+    items = []
+    remaining = round(amount * 100)
+    while bills and bills[0][1] <= remaining:
+        bill_id, cents = bills.pop(0)
+        remaining -= cents
+        items.append((bill_id, cents / 100))
+    return items
+
+
+class RegistryService:
+    @staticmethod
+    def new_summary():
+        return {
+            'lines': 0,
+            'matched': 0,
+            'unmatched': 0,
+            'duplicates': 0,
+            'failed': 0,
+            'matched_amount': 0.0,
+            'bills_settled': 0,
+            'unmatched_lines': [],
+            'duplicate_lines': [],
+            'errors': [],
+            'truncated': False
+        }
+
+    @staticmethod
+    def ingest(stream, mimetype, summary):
+        """Load a bank payment registry into COMPLETED payments.
+
+        Lines are read as they arrive and handled REGISTRY_BATCH_SIZE at a
+        time. Each batch costs one account lookup and one open-bills call,
+        and is committed in one transaction together with its settlement
+        events. Memory use does not depend on the size of the file. Lines
+        are deduplicated by their bank transaction id (external_id), so a
+        registry that failed half-way can simply be sent again. `summary`
+        (from new_summary) is filled in as batches are committed.
+        """
+        session = requests.Session()
+        batch = []
+        for line_number, row in iter_registry_rows(stream, mimetype):
+            summary['lines'] += 1
+            try:
+                batch.append((line_number,) + parse_registry_row(row))
+            except ValueError as e:
+                summary['failed'] += 1
+                RegistryService._report(summary, 'errors', {"line": line_number, "message": str(e)})
+                continue
+
+            if len(batch) >= Config.REGISTRY_BATCH_SIZE:
+                RegistryService._process_batch(session, batch, summary)
+                batch.clear()
+
+        if batch:
+            RegistryService._process_batch(session, batch, summary)
+
+        summary['matched_amount'] = round(summary['matched_amount'], 2)
+        log_business_event(
+            "Registry ingested",
+            lines=summary['lines'],
+            matched=summary['matched'],
+            unmatched=summary['unmatched'],
+            duplicates=summary['duplicates'],
+            failed=summary['failed']
+        )
+        return summary
+
+    @staticmethod
+    def _process_batch(session, batch, summary):
+        existing = Payment.get_existing_external_ids(list({line[1] for line in batch}))
+        seen = set()
+        fresh = []
+        for line in batch:
+            line_number, external_id = line[0], line[1]
+            if external_id in existing or external_id in seen:
+                summary['duplicates'] += 1
+                RegistryService._report(summary, 'duplicate_lines', {"line": line_number, "external_id": external_id})
+                continue
+            seen.add(external_id)
+            fresh.append(line)
+
+        account_ids = RegistryService._lookup_accounts(session, sorted({line[2] for line in fresh}))
+        open_bills = RegistryService._get_open_bills(session, sorted(set(account_ids.values())))
+
+        payments = []
+        matched_lines = []
+        for line_number, external_id, account_number, amount in fresh:
+            account_id = account_ids.get(account_number)
+            bills = open_bills.get(account_id, [])
+            if account_id is None:
+                reason = "Unknown account number"
+                items = []
+            elif not bills:
+                # None left, or all covered by earlier payments or lines
+                reason = "No open bills"
+                items = []
+            else:
+                reason = "Amount does not cover the oldest open bill"
+                items = allocate(bills, amount)
+
+            if not items:
+                summary['unmatched'] += 1
+                RegistryService._report(summary, 'unmatched_lines', {
+                    "line": line_number, "external_id": external_id, "message": reason
+                })
+                continue
+
+            payments.append((external_id, account_id, amount, items))
+            matched_lines.append(line_number)
+
+        if not payments:
+            return
+
+        payment_ids = Payment.create_registry_payments(payments)
+        for line_number, payment, payment_id in zip(matched_lines, payments, payment_ids):
+            if payment_id is None:
+                # Inserted by a concurrent upload of the same registry
+                summary['duplicates'] += 1
+                RegistryService._report(summary, 'duplicate_lines', {"line": line_number, "external_id": payment[0]})
+                continue
+            summary['matched'] += 1
+            summary['matched_amount'] += payment[2]
+            summary['bills_settled'] += len(payment[3])
+
+        notify_settlement_relay()
+
+    @staticmethod
+    def _lookup_accounts(session, numbers):
+        """Map account numbers to account IDs through the accounts service."""
+        if not numbers:
+            return {}
+        response = session.post(
+            f"{Config.ACCOUNT_SERVICE_URL}/api/accounts/lookup",
+            json={"numbers": numbers},
+            timeout=Config.REGISTRY_LOOKUP_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()['data']
+
+    @staticmethod
+    def _get_open_bills(session, account_ids):
+        """Map account IDs to their open bills, as (bill_id, cents) lists oldest first.
+
+        Bills already covered by a payment recorded here are left out, as
+        billing only learns about them once their settlement is delivered.
+        """
+        if not account_ids:
+            return {}
+        response = session.post(
+            f"{Config.BILLING_SERVICE_URL}/api/billings/open",
+            json={"account_ids": account_ids},
+            timeout=Config.REGISTRY_LOOKUP_TIMEOUT
+        )
+        response.raise_for_status()
+        bills = response.json()['data']
+
+        covered = Payment.get_covered_bill_ids([bill['id'] for bill in bills])
+        open_bills = {}
+        for bill in bills:
+            if bill['id'] not in covered:
+                open_bills.setdefault(bill['accountId'], []).append((bill['id'], round(bill['amount'] * 100)))
+        return open_bills
+
+    @staticmethod
+    def _report(summary, key, entry):
+        if len(summary[key]) < Config.REGISTRY_MAX_REPORTED:
+            summary[key].append(entry)
+        else:
+            summary['truncated'] = True
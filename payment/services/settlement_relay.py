@@ -0,0 +1,73 @@
+import threading
+import time
+
+from config import Config
+from database.models import SettlementOutbox
+from monitoring.logger import log_error
+from services.payment_service import PaymentService
+
+
+class SettlementRelay:
+    """Background thread that drains settlement_outbox into billing.
+
+    Due events are leased in batches of `batch_size` and sent as one bulk
+    PUT, so relays in several gunicorn workers never send the same event
+    concurrently. A full batch is followed immediately by the next one;
+    otherwise the relay sleeps `poll_interval` seconds or until notify().
+    """
+
+    def __init__(self, app, batch_size, poll_interval):
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._thread = None
+        self._purged_at = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='settlement-relay', daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                events = []
+                try:
+                    events = SettlementOutbox.claim_batch(self.batch_size, Config.SETTLEMENT_LEASE_SECONDS)
+                    if events:
+                        PaymentService.settle_batch(events)
+                    self._purge()
+                except Exception as e:
+                    # Leased events are retried once their lease expires
+                    log_error(e, worker='settlement-relay', events=len(events))
+
+                if len(events) < self.batch_size:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+
+    def _purge(self):
+        now = time.monotonic()
+        if now - self._purged_at >= 3600:
+            self._purged_at = now
+            SettlementOutbox.purge_sent(Config.SETTLEMENT_RETENTION_DAYS)
+
+
+_relay = None
+
+
+def start_settlement_relay(app):
+    """Start this process's relay; SETTLEMENT_RELAY=0 leaves delivery to other processes."""
+    global _relay
+    if _relay is None and Config.SETTLEMENT_RELAY:
+        _relay = SettlementRelay(app, Config.SETTLEMENT_BATCH_SIZE, Config.SETTLEMENT_POLL_INTERVAL)
+        _relay.start()
+    return _relay
+
+
+def notify_settlement_relay():
+    """Wake the relay in this process to deliver a new event right away."""
+    if _relay is not None:
+        _relay.notify()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+import pytest
+
+# Config is read when the app is first imported; no background threads in tests
+os.environ['PAYMENTS_DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), 'payments.db')
+os.environ['PAYMENT_WORKERS'] = '0'
+os.environ['SETTLEMENT_RELAY'] = 'False'
+os.environ['PAYMENT_PROCESSING_DELAY'] = '0'
+
+from app import create_app  # noqa: E402
+from database.connection import get_db  # noqa: E402
+
+app = create_app()
+
+TABLES = ['payment_items', 'settlement_outbox', 'payment_jobs', 'idempotency_keys', 'payments']
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    with get_db() as conn:
+        for table in TABLES:
+            conn.execute(f'DELETE FROM {table}')
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def query():
+    def run(sql, params=()):
+        with get_db() as conn:
+            return conn.execute(sql, params).fetchall()
+    return run
@@ -0,0 +1,60 @@
+import sqlite3
+
+import pytest
+
+from database.migrations import MIGRATIONS, migrate
+
+PAYMENTS_TABLE = '''
+CREATE TABLE payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER NOT NULL,
+    billing_ids TEXT NOT NULL,
+    amount REAL NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now'))
+)
+'''
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """A database as it was before any migration."""
+    conn = sqlite3.connect(str(tmp_path / 'old.db'))
+    conn.row_factory = sqlite3.Row
+    conn.execute(PAYMENTS_TABLE)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def migrate_to(conn, version):
+    migrate(conn, [migration for migration in MIGRATIONS if migration[0] <= version])
+
+
+def test_outbox_rebuild_keeps_events(conn):
+    migrate_to(conn, 7)
+    conn.execute("INSERT INTO payments (account_id, billing_ids, amount, status) VALUES (1, '5', 10, 'COMPLETED')")
+    conn.execute(
+        "INSERT INTO settlement_outbox (payment_id, billing_ids, status, attempts, next_attempt_at) VALUES (1, '[5]', 'SENT', 2, 0)"
+    )
+    conn.commit()
+
+    migrate(conn)
+    conn.execute("UPDATE settlement_outbox SET status = 'FAILED'")
+
+    row = conn.execute('SELECT payment_id, billing_ids, attempts FROM settlement_outbox').fetchone()
+    assert tuple(row) == (1, '[5]', 2)
+
+
+def test_items_backfilled_from_billing_ids(conn):
+    migrate_to(conn, 5)
+    conn.executemany(
+        "INSERT INTO payments (account_id, billing_ids, amount, status) VALUES (1, ?, ?, 'COMPLETED')",
+        [('3, 4, 12', 30), ('7', 15.5)]
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    rows = conn.execute('SELECT payment_id, bill_id, amount FROM payment_items ORDER BY payment_id, bill_id').fetchall()
+    assert [tuple(row) for row in rows] == [(1, 3, None), (1, 4, None), (1, 12, None), (2, 7, 15.5)]
@@ -0,0 +1,91 @@
+import pytest
+
+from services import registry_service
+from services.registry_service import allocate
+
+ACCOUNTS = {'100001': 1, '100002': 2, '100003': 3}
+OPEN_BILLS = [
+    {'id': 11, 'accountId': 1, 'amount': 50.0},
+    {'id': 12, 'accountId': 1, 'amount': 70.0},
+    {'id': 21, 'accountId': 2, 'amount': 30.0},
+]
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'success': True, 'data': self.data}
+
+
+class FakeSession:
+    """Answers the accounts lookup and billing open-bills calls."""
+
+    def post(self, url, json, timeout):
+        if url.endswith('/api/accounts/lookup'):
+            return FakeResponse({number: ACCOUNTS[number] for number in json['numbers'] if number in ACCOUNTS})
+        return FakeResponse([bill for bill in OPEN_BILLS if bill['accountId'] in json['account_ids']])
+
+
+@pytest.fixture(autouse=True)
+def services(monkeypatch):
+    monkeypatch.setattr(registry_service.requests, 'Session', FakeSession)
+
+
+def upload(client, body):
+    return client.post('/api/payments/registry', data=body, content_type='text/csv').get_json()
+
+
+def test_allocate_pays_oldest_bills_in_full():
+    bills = [(11, 5000), (12, 7000), (13, 1000)]
+
+    assert allocate(bills, 125.0) == [(11, 50.0), (12, 70.0)]
+    assert bills == [(13, 1000)]
+
+
+def test_registry_matches_and_reports_lines(client, query):
+    summary = upload(client, (
+        'external_id,account_number,amount\n'
+        'tx-1,100001,60\n'
+        'tx-2,999999,10\n'
+        'tx-3,100002,10\n'
+        'tx-4,100003,10\n'
+        'tx-5,100001,oops\n'
+    ))['data']
+
+    assert (summary['matched'], summary['unmatched'], summary['failed']) == (1, 3, 1)
+    assert [line['message'] for line in summary['unmatched_lines']] == [
+        'Unknown account number', 'Amount does not cover the oldest open bill', 'No open bills'
+    ]
+    assert [tuple(row) for row in query('SELECT payment_id, bill_id FROM payment_items')] == [
+        (query("SELECT id FROM payments WHERE external_id = 'tx-1'")[0][0], 11)
+    ]
+
+
+def test_covered_bills_are_not_allocated_again(client):
+    upload(client, 'external_id,account_number,amount\ntx-1,100001,120\n')
+
+    summary = upload(client, 'external_id,account_number,amount\ntx-2,100001,120\n')['data']
+
+    assert summary['unmatched_lines'][0]['message'] == 'No open bills'
+
+
+def test_resent_registry_is_deduplicated(client, query):
+    body = 'external_id,account_number,amount\ntx-1,100001,50\ntx-1,100001,50\n'
+
+    first = upload(client, body)['data']
+    second = upload(client, body)['data']
+
+    assert (first['matched'], first['duplicates']) == (1, 1)
+    assert (second['matched'], second['duplicates']) == (0, 2)
+    assert query('SELECT COUNT(*) FROM payments')[0][0] == 1
+
+
+def test_plain_json_registry_is_rejected(client):
+    response = client.post('/api/payments/registry', json=[{'external_id': 'tx-1'}])
+
+    assert response.status_code == 415
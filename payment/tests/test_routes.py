@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from database.models import IdempotencyKey, IdempotencyKeyTakenOver
+from services.payment_service import PaymentService
+
+PAYMENT = {'account_id': 7, 'billing_ids': [1, 2], 'amount': 100}
+
+
+def post_payment(client, body=PAYMENT, key='key-1', user='1'):
+    return client.post('/api/payments', json=body, headers={'Idempotency-Key': key, 'X-User-Id': user})
+
+
+def payment_count(query):
+    return query('SELECT COUNT(*) FROM payments')[0][0]
+
+
+def test_retry_replays_stored_response(client, query):
+    first = post_payment(client)
+    second = post_payment(client)
+
+    assert first.status_code == second.status_code == 202
+    assert second.get_json() == first.get_json()
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert payment_count(query) == 1
+
+
+def test_key_reused_with_other_body_is_refused(client):
+    post_payment(client)
+
+    response = post_payment(client, dict(PAYMENT, amount=200))
+
+    assert response.status_code == 422
+
+
+def test_validation_error_is_replayed(client, query):
+    body = dict(PAYMENT, amount=-1)
+
+    assert post_payment(client, body).status_code == 400
+    assert post_payment(client, body).status_code == 400
+    assert payment_count(query) == 0
+
+
+def test_keys_are_scoped_to_the_caller(client, query):
+    post_payment(client, user='1')
+    post_payment(client, user='2')
+    post_payment(client, dict(PAYMENT, account_id=8), user='1')
+
+    assert payment_count(query) == 3
+
+
+@pytest.fixture
+def stalled_claim():
+    """A key claimed by a request that has not finished."""
+    claim, _ = PaymentService.claim_idempotency_key('key-1', PAYMENT, '1')
+    return claim
+
+
+def test_key_in_progress_answers_409(client, stalled_claim):
+    assert post_payment(client).status_code == 409
+
+
+def test_expired_lease_is_taken_over(client, query, stalled_claim):
+    query('UPDATE idempotency_keys SET locked_until = ?', (time.time() - 1,))
+
+    assert post_payment(client).status_code == 202
+    # The stalled request can no longer create its payment
+    with pytest.raises(IdempotencyKeyTakenOver):
+        PaymentService.create_payment(7, [1, 2], 100, stalled_claim)
+    assert payment_count(query) == 1
+
+
+def test_expired_keys_are_purged(query, monkeypatch):
+    IdempotencyKey.claim('old', 'hash', -1, 60, 3600)
+    monkeypatch.setattr(IdempotencyKey, '_purged_at', 0.0)
+
+    IdempotencyKey.claim('new', 'hash', 60, 60, 3600)
+
+    assert [row['key'] for row in query('SELECT key FROM idempotency_keys')] == ['new']
+
+
+def test_status_shows_job_and_settlement(client):
+    payment_id = post_payment(client).get_json()['data']['id']
+
+    data = client.get(f'/api/payments/{payment_id}/status').get_json()['data']
+
+    assert data['status'] == 'PROCESSING'
+    assert data['job']['status'] == 'PENDING'
+    assert data['settlement'] is None
@@ -0,0 +1,70 @@
+import time
+
+from config import Config
+from database.models import PaymentJob
+from services.payment_service import PaymentService
+
+
+def create_payment(billing_ids=(1,), amount=100):
+    return PaymentService.create_payment(7, list(billing_ids), amount)
+
+
+def expire_lease(query, payment_id):
+    query("UPDATE payment_jobs SET locked_until = ? WHERE payment_id = ?", (time.time() - 1, payment_id))
+
+
+def test_idle_claim_takes_no_write_lock():
+    assert PaymentJob.claim(60, 3) is None
+
+
+def test_claim_leases_due_job_once():
+    payment_id = create_payment()
+
+    job = PaymentJob.claim(60, 3)
+
+    assert job['payment_id'] == payment_id
+    assert job['status'] == 'RUNNING' and job['attempts'] == 1
+    assert PaymentJob.claim(60, 3) is None
+
+
+def test_expired_lease_is_claimed_again(query):
+    payment_id = create_payment()
+    PaymentJob.claim(60, 3)
+    expire_lease(query, payment_id)
+
+    assert PaymentJob.claim(60, 3)['attempts'] == 2
+
+
+def test_expired_lease_on_last_attempt_fails_payment(query):
+    payment_id = create_payment()
+    PaymentJob.claim(60, 1)
+    expire_lease(query, payment_id)
+
+    assert PaymentJob.claim(60, 1) is None
+    assert query('SELECT status FROM payment_jobs')[0]['status'] == 'FAILED'
+    assert query('SELECT status FROM payments')[0]['status'] == 'ERROR'
+
+
+def test_processed_job_completes_payment_and_queues_settlement(query):
+    payment_id = create_payment(billing_ids=(3, 4))
+
+    PaymentService.process_job(PaymentJob.claim(60, 3))
+
+    assert query('SELECT status FROM payments WHERE id = ?', (payment_id,))[0]['status'] == 'COMPLETED'
+    events = query('SELECT payment_id, billing_ids, status FROM settlement_outbox')
+    assert [tuple(event) for event in events] == [(payment_id, '[3, 4]', 'PENDING')]
+
+
+def test_missing_payment_is_retried_then_failed(query, monkeypatch):
+    monkeypatch.setattr(Config, 'PAYMENT_JOB_MAX_ATTEMPTS', 2)
+    payment_id = create_payment()
+    query('DELETE FROM payment_items')
+    job = PaymentJob.claim(60, 2)
+    query('DELETE FROM payments WHERE id = ?', (payment_id,))
+
+    PaymentService.process_job(job)
+    assert query('SELECT status FROM payment_jobs')[0]['status'] == 'PENDING'
+
+    query('UPDATE payment_jobs SET run_after = 0')
+    PaymentService.process_job(PaymentJob.claim(60, 2))
+    assert query('SELECT status FROM payment_jobs')[0]['status'] == 'FAILED'
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+import requests
+
+from config import Config
+from database.models import PaymentJob, SettlementOutbox
+from services import payment_service
+from services.payment_service import PaymentService
+
+
+class FakeBilling:
+    """Stands in for PUT /api/billings/paid; refuses batches with a bad bill id."""
+
+    def __init__(self, status_code=200, bad_bill=None):
+        self.status_code = status_code
+        self.bad_bill = bad_bill
+        self.batches = []
+
+    def put(self, url, json, timeout):
+        self.batches.append(json['billing_ids'])
+        response = requests.Response()
+        response.url = url
+        response.status_code = 400 if self.bad_bill in json['billing_ids'] else self.status_code
+        response._content = b'{"success": false}'
+        return response
+
+
+@pytest.fixture
+def billing(monkeypatch):
+    fake = FakeBilling()
+    monkeypatch.setattr(payment_service.requests, 'put', fake.put)
+    return fake
+
+
+def completed_payments(*bill_ids):
+    for bill_id in bill_ids:
+        PaymentService.create_payment(7, [bill_id], 100)
+        PaymentService.process_job(PaymentJob.claim(60, 3))
+
+
+def outbox(query):
+    return {json.loads(row['billing_ids'])[0]: row['status'] for row in query('SELECT * FROM settlement_outbox')}
+
+
+def test_idle_relay_claims_nothing():
+    assert SettlementOutbox.claim_batch(10, 60) == []
+
+
+def test_batch_is_coalesced_into_one_request(billing, query):
+    completed_payments(1, 2, 3)
+
+    assert PaymentService.settle_batch(SettlementOutbox.claim_batch(10, 60))
+    assert billing.batches == [[1, 2, 3]]
+    assert outbox(query) == {1: 'SENT', 2: 'SENT', 3: 'SENT'}
+
+
+def test_refused_event_is_parked_and_the_rest_delivered(billing, query):
+    billing.bad_bill = 3
+    completed_payments(1, 2, 3, 4)
+
+    assert not PaymentService.settle_batch(SettlementOutbox.claim_batch(10, 60))
+    assert outbox(query) == {1: 'SENT', 2: 'SENT', 3: 'FAILED', 4: 'SENT'}
+
+
+@pytest.mark.parametrize('status_code', [408, 409, 429, 503])
+def test_transient_errors_leave_the_batch_pending(billing, query, status_code):
+    billing.status_code = status_code
+    completed_payments(1, 2)
+
+    assert not PaymentService.settle_batch(SettlementOutbox.claim_batch(10, 60))
+    assert billing.batches == [[1, 2]]
+    assert outbox(query) == {1: 'PENDING', 2: 'PENDING'}
+
+
+def test_server_errors_are_retried_until_max_attempts(billing, query, monkeypatch):
+    monkeypatch.setattr(Config, 'SETTLEMENT_MAX_ATTEMPTS', 2)
+    billing.status_code = 503
+    completed_payments(1)
+
+    PaymentService.settle_batch(SettlementOutbox.claim_batch(10, 60))
+    assert outbox(query) == {1: 'PENDING'}
+
+    query('UPDATE settlement_outbox SET next_attempt_at = 0')
+    PaymentService.settle_batch(SettlementOutbox.claim_batch(10, 60))
+    assert outbox(query) == {1: 'FAILED'}
+    assert SettlementOutbox.claim_batch(10, 60) == []
@@ -0,0 +1,39 @@
+import pytest
+
+
+@pytest.fixture
+def payments(query):
+    for amount, status in [(10, 'COMPLETED'), (20, 'COMPLETED'), (5, 'ERROR'), (7, 'PROCESSING'), (3, 'COMPLETED')]:
+        query("INSERT INTO payments (account_id, billing_ids, amount, status) VALUES (4, '1', ?, ?)", (amount, status))
+    query("INSERT INTO payments (account_id, billing_ids, amount, status) VALUES (5, '1', 100, 'COMPLETED')")
+
+
+def get_summary(client, **params):
+    return client.get('/api/payments/4', query_string=dict(params, summary=1))
+
+
+def test_totals_are_aggregated_per_status(client, payments):
+    data = get_summary(client, details=0).get_json()['data']
+
+    by_status = {total['status']: (total['amount'], total['count']) for total in data['total']['by_status']}
+    assert by_status == {'COMPLETED': (33, 3), 'ERROR': (5, 1), 'PROCESSING': (7, 1)}
+    assert data['total']['amount'] == 45
+    assert 'payments' not in data
+
+
+def test_cursor_pages_payments_newest_first(client, payments):
+    amounts = []
+    params = {'limit': 2}
+    while True:
+        data = get_summary(client, **params).get_json()['data']
+        amounts += [payment['amount'] for payment in data['payments']]
+        if data['nextCursor'] is None:
+            break
+        params['cursor'] = data['nextCursor']
+
+    assert amounts == [3, 7, 5, 20, 10]
+
+
+@pytest.mark.parametrize('params', [{'limit': 0}, {'limit': 'ten'}, {'limit': 2, 'cursor': 'abc'}])
+def test_invalid_page_requests_are_refused(client, payments, params):
+    assert get_summary(client, **params).status_code == 400
@@ -2,7 +2,7 @@ import uuid
 from flask import Flask, g
 from flask_cors import CORS
 from config import Config
-from database.connection import init_database
+from database.connection import db_stats, init_database, reset_db
 from monitoring.logging import log_request_start, log_request_end, setup_flask_logging
 from routes.report_routes import report_bp
 
@@ -10,6 +10,7 @@ from routes.report_routes import report_bp
 def create_app():
     app = Flask(__name__)
     CORS(app, supports_credentials=Config.CORS_SUPPORTS_CREDENTIALS)
+    app.teardown_appcontext(reset_db)
     logger = setup_flask_logging(app)
 
     init_database()
@@ -24,6 +25,10 @@ def create_app():
     def after_request(response):
         return log_request_end(response)
 
+    @app.route('/health')
+    def health():
+        return {"success": True, "data": {"database": db_stats()}}
+
     @app.errorhandler(404)
     def not_found(error):
         app.logger.warning(f"404 error: {error}")
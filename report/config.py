@@ -17,6 +17,13 @@ class Config:
     # База данных
     DATABASE_PATH = os.environ.get("DATABASE_PATH", str(DATA_DIR / "reports.db"))
 
+    # Настройки SQLite (database/connection.py)
+    DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", 5000))
+    DB_SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS", "NORMAL")
+    DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", 20000))
+    DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 256 * 1024 * 1024))
+    DB_CACHED_STATEMENTS = int(os.environ.get("DB_CACHED_STATEMENTS", 512))
+
     # Настройки Flask
     HOST = os.environ.get("FLASK_HOST", "0.0.0.0")
     PORT = int(os.environ.get("FLASK_PORT", 5000))
@@ -29,3 +36,8 @@ class Config:
 
     # CORS
     CORS_SUPPORTS_CREDENTIALS = True
+
+    # Значения gunicorn.conf.py, отличные от общих: рендер PDF загружает процессор и идёт долго
+    WEB_WORKERS = os.cpu_count() or 1
+    WEB_THREADS = 2
+    WEB_TIMEOUT = 120
@@ -0,0 +1,130 @@
+# Generated from shared/database/advisor.py by scripts/sync_shared.py; do not edit.
+"""Index advisor for a service database.
+
+Runs EXPLAIN QUERY PLAN over every SQL literal in the service's SOURCES
+against a scratch database and exits non-zero when a query falls back to
+a full table scan. What to check is configured per service in
+database/advisor_settings.py. Run from the service directory:
+
+    python -m database.advisor
+"""
+import ast
+import itertools
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+from config import Config
+from database import advisor_settings as settings
+from database.connection import get_db
+
+SQL_START = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\s', re.IGNORECASE)
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+
+
+def expand_fstring(node, placeholders):
+    """Return every statement an f-string can produce.
+
+    A `'?'`-join (an IN list) becomes a single `?`; any other expression
+    takes each of its alternatives from placeholders, keyed by the
+    expression's source text. Raises KeyError for an unknown expression.
+    """
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append([value.value])
+            continue
+        expression = ast.unparse(value.value)
+        if "'?'" in expression:
+            parts.append(['?'])
+        else:
+            parts.append(placeholders[expression])
+    return [''.join(combination) for combination in itertools.product(*parts)]
+
+
+def collect_queries(path, placeholders):
+    """Yield (line, sql or None, expression) for every SQL string literal in a Python source file.
+
+    `.format()` placeholders are filled with 1. f-strings are expanded
+    with expand_fstring, one statement per combination; sql is None and
+    expression names the culprit when one cannot be expanded.
+    """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+
+    # Docstrings and f-string fragments are not statements
+    skipped = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Expr):
+            skipped.add(id(node.value))
+        elif isinstance(node, ast.JoinedStr):
+            skipped.update(id(value) for value in node.values)
+
+    for node in ast.walk(tree):
+        if id(node) in skipped:
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and SQL_START.match(node.value):
+            yield node.lineno, node.value.replace('{}', '1'), None
+        elif (isinstance(node, ast.JoinedStr) and node.values and isinstance(node.values[0], ast.Constant)
+                and SQL_START.match(node.values[0].value)):
+            try:
+                for sql in expand_fstring(node, placeholders):
+                    yield node.lineno, sql, None
+            except KeyError as e:
+                yield node.lineno, None, e.args[0]
+
+
+def explain(conn, sql):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement."""
+    params = [None] * sql.count('?')
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def advise(conn, sources, full_scan_ok=(), placeholders=None):
+    """Print a verdict per query and return (failures, warnings)."""
+    failures = warnings = 0
+    for source in sources:
+        for line, sql, expression in collect_queries(source, placeholders or {}):
+            location = f'{source}:{line}'
+            if sql is None:
+                failures += 1
+                print(f'FAIL  {location}: no PLACEHOLDERS entry for f-string expression {{{expression}}}')
+                continue
+            statement = ' '.join(sql.split())
+            try:
+                plan = explain(conn, sql)
+            except sqlite3.Error as e:
+                warnings += 1
+                print(f'WARN  {location}: cannot plan query ({e}): {statement}')
+                continue
+
+            scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+            if scans and statement in full_scan_ok:
+                print(f'OK    {location}: full scan allowed: {statement}')
+            elif scans:
+                failures += 1
+                print(f"FAIL  {location}: {', '.join(scans)}: {statement}")
+            elif any('TEMP B-TREE' in detail for detail in plan):
+                warnings += 1
+                print(f'WARN  {location}: sorts without an index: {statement}')
+            else:
+                print(f'OK    {location}: {statement}')
+    return failures, warnings
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Plan against a scratch database built by the service's own init and migrations
+        Config.DATABASE_PATH = os.path.join(tmp, 'advisor.db')
+        settings.init()
+        with get_db() as conn:
+            failures, warnings = advise(conn, settings.SOURCES, settings.FULL_SCAN_OK, settings.PLACEHOLDERS)
+
+    print(f'{failures} failure(s), {warnings} warning(s)')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,19 +1,13 @@
-import sqlite3
-from config import Config
 from datetime import datetime, timedelta
 
-
-def get_db():
-    """Get database connection with row factory."""
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+from database.migrations import migrate
+# Connection handling is the same in every service: shared/database/pool.py
+from database.pool import close_db, db_stats, get_db, reset_db
 
 
 def init_database():
     """Initialize database tables."""
-    conn = get_db()
-    try:
+    with get_db() as conn:
         # Create accounts table
         conn.execute('''
         CREATE TABLE IF NOT EXISTS accounts (
@@ -76,8 +70,7 @@ def init_database():
         # Create test data if it doesn't exist
         create_test_data(conn)
         conn.commit()
-    finally:
-        conn.close()
+        migrate(conn)
 
 
 def create_test_data(conn):
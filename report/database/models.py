@@ -16,19 +16,15 @@ class Account:
     @staticmethod
     def get_by_id(account_id):
         """Get account by ID."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = "SELECT * FROM accounts WHERE id = ?"
             row = conn.execute(query, (account_id,)).fetchone()
             return Account(row) if row else None
-        finally:
-            conn.close()
 
     @staticmethod
     def create(number, address, area, residents, management_company):
         """Create a new account."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = """
             INSERT INTO accounts (number, address, area, residents, management_company)
             VALUES (?, ?, ?, ?, ?)
@@ -36,8 +32,6 @@ class Account:
             cursor = conn.execute(query, (number, address, area, residents, management_company))
             conn.commit()
             return cursor.lastrowid
-        finally:
-            conn.close()
 
 
 class Charge:
@@ -53,19 +47,15 @@ class Charge:
     @staticmethod
     def get_by_account_id(account_id):
         """Get all charges for an account."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = "SELECT * FROM charges WHERE account_id = ? ORDER BY period_start DESC"
             rows = conn.execute(query, (account_id,)).fetchall()
             return [Charge(row) for row in rows]
-        finally:
-            conn.close()
 
     @staticmethod
     def create(account_id, service_type, amount, period_start, period_end):
         """Create a new charge."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = """
             INSERT INTO charges (account_id, service_type, amount, period_start, period_end)
             VALUES (?, ?, ?, ?, ?)
@@ -73,8 +63,6 @@ class Charge:
             cursor = conn.execute(query, (account_id, service_type, amount, period_start, period_end))
             conn.commit()
             return cursor.lastrowid
-        finally:
-            conn.close()
 
 
 class Payment:
@@ -89,19 +77,15 @@ class Payment:
     @staticmethod
     def get_by_account_id(account_id):
         """Get all payments for an account."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = "SELECT * FROM payments WHERE account_id = ? ORDER BY payment_date DESC"
             rows = conn.execute(query, (account_id,)).fetchall()
             return [Payment(row) for row in rows]
-        finally:
-            conn.close()
 
     @staticmethod
     def create(account_id, payment_date, amount, method):
         """Create a new payment."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = """
             INSERT INTO payments (account_id, payment_date, amount, method)
             VALUES (?, ?, ?, ?)
@@ -109,8 +93,6 @@ class Payment:
             cursor = conn.execute(query, (account_id, payment_date, amount, method))
             conn.commit()
             return cursor.lastrowid
-        finally:
-            conn.close()
 
 
 class Report:
@@ -130,30 +112,23 @@ class Report:
     @staticmethod
     def get_by_id(report_id):
         """Get a specific report by ID."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = "SELECT * FROM reports WHERE id = ?"
             row = conn.execute(query, (report_id,)).fetchone()
             return Report(row) if row else None
-        finally:
-            conn.close()
 
     @staticmethod
     def get_by_account_id(account_id):
         """Get all reports for an account."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = "SELECT * FROM reports WHERE account_id = ? ORDER BY created_at DESC"
             rows = conn.execute(query, (account_id,)).fetchall()
             return [Report(row) for row in rows]
-        finally:
-            conn.close()
 
     @staticmethod
     def create(account_id, period_start, period_end, total_amount, services_data, qr_data, file_path):
         """Create a new report."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = """
             INSERT INTO reports (account_id, period_start, period_end, total_amount, 
                                services_data, qr_data, file_path)
@@ -165,14 +140,11 @@ class Report:
             ))
             conn.commit()
             return cursor.lastrowid
-        finally:
-            conn.close()
 
     @staticmethod
     def update_status(report_id, status):
         """Update report status."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = """
             UPDATE reports 
             SET status = ?, updated_at = CURRENT_TIMESTAMP
@@ -181,14 +153,11 @@ class Report:
             conn.execute(query, (status, report_id))
             conn.commit()
             return True
-        finally:
-            conn.close()
 
     @staticmethod
     def get_reports_by_type(report_type, period_months=None):
         """Get reports by type within a period."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             if period_months:
                 query = """
                 SELECT * FROM reports 
@@ -207,14 +176,11 @@ class Report:
                 """
                 rows = conn.execute(query, (report_type,)).fetchall()
             return rows
-        finally:
-            conn.close()
 
     @staticmethod
     def get_all_reports(limit=50):
         """Get all reports with optional limit."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             query = """
             SELECT * FROM reports 
             ORDER BY created_at DESC 
@@ -222,14 +188,11 @@ class Report:
             """
             rows = conn.execute(query, (limit,)).fetchall()
             return rows
-        finally:
-            conn.close()
 
     @staticmethod
     def create_report(report_type, title, data, status="pending"):
         """Create a new report record."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             conn.execute(
                 """
             INSERT INTO reports (report_type, title, data, status)
@@ -239,14 +202,11 @@ class Report:
             )
             conn.commit()
             return conn.lastrowid
-        finally:
-            conn.close()
 
     @staticmethod
     def update_report_status(report_id, status, pdf_path=None):
         """Update report status and optionally PDF path."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             if pdf_path:
                 conn.execute(
                     """
@@ -267,19 +227,14 @@ class Report:
                 )
             conn.commit()
             return conn.rowcount > 0
-        finally:
-            conn.close()
 
     @staticmethod
     def delete_report(report_id):
         """Delete a report by ID."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             conn.execute("DELETE FROM reports WHERE id = ?", (report_id,))
             conn.commit()
             return conn.rowcount > 0
-        finally:
-            conn.close()
 
     @staticmethod
     def to_dict(row):
@@ -0,0 +1,9 @@
+# (version, name, statements); append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, 'index charges, payments and reports by account', [
+        'CREATE INDEX IF NOT EXISTS idx_charges_account_period ON charges (account_id, period_start)',
+        'CREATE INDEX IF NOT EXISTS idx_payments_account_date ON payments (account_id, payment_date)',
+        'CREATE INDEX IF NOT EXISTS idx_reports_account_created ON reports (account_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_reports_created ON reports (created_at)',
+    ]),
+]
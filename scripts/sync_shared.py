@@ -0,0 +1,63 @@
+"""Copy the shared database modules into every service that uses them.
+
+Each service is built from its own directory, so code they have in common
+is kept once under shared/ and copied into the services. Edit the file
+under shared/ and run `make sync_shared`; `make check_shared` fails when
+a copy has drifted from its source.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# shared file -> services that get a copy at the same relative path
+TARGETS = {
+    'database/pool.py': ['accounts', 'billing', 'payment', 'report', 'tasks', 'users'],
+    'database/write_queue.py': ['accounts', 'billing', 'payment', 'tasks'],
+    'database/advisor.py': ['accounts', 'billing', 'payment', 'report', 'tasks', 'users'],
+    'database/migrations.py': ['billing', 'payment', 'report', 'tasks'],
+    'gunicorn.conf.py': ['accounts', 'api', 'billing', 'payment', 'report', 'tasks', 'users'],
+}
+
+HEADER = "# Generated from shared/{path} by scripts/sync_shared.py; do not edit.\n"
+
+
+def render(path):
+    with open(os.path.join(ROOT, 'shared', path), encoding='utf-8') as f:
+        return HEADER.format(path=path) + f.read()
+
+
+def sync(check=False):
+    """Write every copy, or with check=True only list the ones that differ. Returns the stale paths."""
+    stale = []
+    for path, services in TARGETS.items():
+        content = render(path)
+        for service in services:
+            target = os.path.join(ROOT, service, path)
+            current = None
+            if os.path.exists(target):
+                with open(target, encoding='utf-8', newline='') as f:
+                    current = f.read()
+            if current == content:
+                continue
+            stale.append(os.path.relpath(target, ROOT))
+            if not check:
+                with open(target, 'w', encoding='utf-8', newline='') as f:
+                    f.write(content)
+    return stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true', help="only report copies that differ from shared/")
+    args = parser.parse_args()
+
+    stale = sync(check=args.check)
+    for path in stale:
+        print(f"{'stale' if args.check else 'updated'}: {path}")
+    return 1 if args.check and stale else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
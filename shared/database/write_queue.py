@@ -0,0 +1,196 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from config import Config
+from database.connection import close_db, get_db
+
+logger = logging.getLogger(__name__)
+
+
+class _Write:
+    def __init__(self, fn):
+        self.fn = fn
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+        self.committed = False
+
+
+class WriteQueue:
+    """Single writer thread that commits writes from many requests together.
+
+    submit(fn) queues fn(conn) and blocks until the transaction holding it
+    commits, then returns fn's result or raises its exception. The writer
+    takes up to `max_batch` queued writes, waiting at most `max_wait_ms`
+    for more to arrive, and runs them in one transaction. Every write gets
+    its own savepoint, so one failing write is rolled back alone. fn must
+    not commit or roll back itself; if one does and breaks the transaction,
+    the batch is retried one write at a time.
+
+    submit() gives up after `timeout` seconds with TimeoutError. The write
+    is then skipped if the writer has not started it yet, but may still
+    commit if it has.
+    """
+
+    def __init__(self, max_batch, max_wait_ms, timeout=None):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.largest_batch = 0
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn):
+        write = _Write(fn)
+        self._queue.put(write)
+        if not write.done.wait(self.timeout):
+            write.abandoned = True
+            raise TimeoutError(f"Write not committed within {self.timeout} s")
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # The writer keeps its checkout for as long as it runs
+        conn = get_db()
+        while True:
+            batch = self._collect()
+            try:
+                self._commit(conn, batch)
+            except Exception as e:
+                # Nothing may end this thread, or every later submit() would wait for it
+                logger.exception("Write queue could not commit a batch")
+                for write in batch:
+                    if not write.committed:
+                        write.result = None
+                        write.error = write.error or e
+                conn = self._recover(conn)
+            finally:
+                for write in batch:
+                    write.done.set()
+
+    def _recover(self, conn):
+        """Return a connection with no open transaction, reconnecting if this one cannot roll back."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            return conn
+        except Exception:
+            logger.exception("Write queue connection could not roll back; reconnecting")
+            close_db()
+            return get_db()
+
+    def _commit(self, conn, batch):
+        try:
+            self._commit_batch(conn, batch)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if len(batch) == 1:
+                batch[0].error = batch[0].error or e
+            else:
+                # A write broke the transaction itself rather than just its
+                # savepoint; commit each write alone so only that one fails
+                for write in batch:
+                    write.result = write.error = None
+                    try:
+                        self._commit_batch(conn, [write])
+                    except Exception as error:
+                        if conn.in_transaction:
+                            conn.rollback()
+                        write.error = write.error or error
+
+        with self._lock:
+            self.batches += 1
+            self.writes += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def _commit_batch(self, conn, batch):
+        conn.execute('BEGIN IMMEDIATE')
+        for write in batch:
+            if write.abandoned:
+                continue
+            conn.execute('SAVEPOINT queued_write')
+            try:
+                write.result = write.fn(conn)
+                conn.execute('RELEASE queued_write')
+            except Exception as e:
+                write.error = e
+                conn.execute('ROLLBACK TO queued_write')
+                conn.execute('RELEASE queued_write')
+        conn.commit()
+        for write in batch:
+            write.committed = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'writes': self.writes,
+                'largest_batch': self.largest_batch,
+                'pending': self._queue.qsize(),
+            }
+
+
+_write_queue = None
+_write_queue_pid = None
+_write_queue_lock = threading.Lock()
+
+
+def _get_write_queue():
+    global _write_queue, _write_queue_pid
+    with _write_queue_lock:
+        # The writer thread does not survive a fork; each worker starts its own
+        if _write_queue is None or _write_queue_pid != os.getpid():
+            _write_queue = WriteQueue(
+                Config.DB_WRITE_BATCH_SIZE, Config.DB_WRITE_MAX_WAIT_MS, Config.DB_WRITE_TIMEOUT_MS / 1000
+            )
+            _write_queue_pid = os.getpid()
+        return _write_queue
+
+
+def run_write(fn):
+    """Run fn(conn) as one write and return its result.
+
+    With Config.DB_WRITE_QUEUE the write is group-committed by the writer
+    thread; otherwise it runs in a transaction on this thread, which is
+    the caller's own when it already holds one.
+    """
+    if Config.DB_WRITE_QUEUE:
+        return _get_write_queue().submit(fn)
+
+    with get_db() as conn:
+        return fn(conn)
+
+
+def write_stats():
+    """Write queue counters for this process, or None when it is disabled."""
+    if not Config.DB_WRITE_QUEUE:
+        return None
+    return _get_write_queue().stats()
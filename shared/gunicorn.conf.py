@@ -0,0 +1,40 @@
+"""gunicorn settings, the same for every service.
+
+Each WEB_* setting is read from the environment. A service whose
+defaults differ (e.g. report's slow PDF renders) sets them as WEB_*
+attributes on its Config; everything else uses the defaults below.
+"""
+import os
+import secrets
+
+# Workers must sign sessions and tokens with the same key. Without an
+# explicit SECRET_KEY, generate one in the master so every forked worker
+# inherits it; replicas on other nodes still need SECRET_KEY set.
+if not os.environ.get('SECRET_KEY'):
+    os.environ['SECRET_KEY'] = secrets.token_hex(32)
+
+from config import Config  # noqa: E402
+
+
+def _setting(name, default):
+    """WEB_<name> from the environment, else from the service's Config, else default."""
+    value = os.environ.get(f'WEB_{name}')
+    if value is None:
+        return getattr(Config, f'WEB_{name}', default)
+    if isinstance(default, bool):
+        return value.lower() == 'true'
+    return int(value)
+
+
+bind = f"{Config.HOST}:{Config.PORT}"
+workers = _setting('WORKERS', (os.cpu_count() or 1) * 2 + 1)
+threads = _setting('THREADS', 4)
+worker_class = 'gthread'
+keepalive = _setting('KEEPALIVE', 5)
+timeout = _setting('TIMEOUT', 30)
+graceful_timeout = _setting('GRACEFUL_TIMEOUT', 30)
+max_requests = _setting('MAX_REQUESTS', 1000)
+max_requests_jitter = max_requests // 10
+reload = _setting('RELOAD', False)
+accesslog = '-'
+errorlog = '-'
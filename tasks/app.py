@@ -2,9 +2,11 @@ from flask import Flask
 from flask_restx import Api
 from config import Config
 from routes.task_routes import ns as tasks_namespace
-from database.connection import init_db
+from database.connection import db_stats, init_db, reset_db
+from database.write_queue import write_stats
 
 app = Flask(__name__)
+app.teardown_appcontext(reset_db)
 api = Api(app, version='1.0', title='Tasks API', description='API для управления заявками')
 
 # Инициализация БД
@@ -13,6 +15,11 @@ init_db()
 # Регистрируем namespace под префиксом /api
 api.add_namespace(tasks_namespace, path='/api/tasks')
 
+
+@app.route('/health')
+def health():
+    return {"success": True, "data": {"database": db_stats(), "writes": write_stats()}}
+
 if __name__ == '__main__':
     app.run(
         host=Config.HOST, 
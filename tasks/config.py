@@ -11,9 +11,23 @@ APP_LOG_PATH = os.path.join(LOG_DIR, 'app.log')
 ERROR_LOG_PATH = os.path.join(LOG_DIR, 'errors.log')
 
 class Config:
-    DATABASE_PATH = os.getenv('USERS_DATABASE_PATH', 'data/users.db')
+    DATABASE_PATH = os.getenv('TASKS_DATABASE_PATH', DATABASE_PATH)
 
     CORS_SUPPORTS_CREDENTIALS = True
     DEBUG = os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true')
     HOST = os.environ.get('FLASK_HOST', '0.0.0.0')
     PORT = int(os.environ.get('FLASK_PORT', 5000))
+
+    # SQLite connection tuning (database/connection.py)
+    DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+    DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 20000))
+    DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_CACHED_STATEMENTS = int(os.environ.get('DB_CACHED_STATEMENTS', 512))
+
+    # Group commit: queue writes to one writer thread per process (database/write_queue.py)
+    DB_WRITE_QUEUE = os.environ.get('DB_WRITE_QUEUE', 'False').lower() == 'true'
+    DB_WRITE_BATCH_SIZE = int(os.environ.get('DB_WRITE_BATCH_SIZE', 100))
+    DB_WRITE_MAX_WAIT_MS = float(os.environ.get('DB_WRITE_MAX_WAIT_MS', 2))
+    # How long a request waits for its queued write before giving up
+    DB_WRITE_TIMEOUT_MS = int(os.environ.get('DB_WRITE_TIMEOUT_MS', 30000))
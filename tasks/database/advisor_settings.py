@@ -0,0 +1,16 @@
+"""What the index advisor (database/advisor.py) checks for the tasks database."""
+from database.connection import init_db
+
+SOURCES = ['database/models.py', 'services/task_service.py']
+
+# Normalised statements that read whole tables by design
+FULL_SCAN_OK = (
+    'SELECT * FROM tasks WHERE 1=1',
+)
+
+# f-string expression -> the SQL fragments it can take
+PLACEHOLDERS = {}
+
+
+def init():
+    init_db()
@@ -1,16 +1,11 @@
-import sqlite3
-from config import DATABASE_PATH
+from database.migrations import migrate
+# Connection handling is the same in every service: shared/database/pool.py
+from database.pool import close_db, db_stats, get_db, reset_db
 
-def get_db():
-    """Connect to the SQLite database."""
-    db = sqlite3.connect(DATABASE_PATH)
-    db.row_factory = sqlite3.Row
-    return db
 
 def init_db():
     """Create tables if not exist."""
-    conn = get_db()
-    try:
+    with get_db() as conn:
         conn.execute('''
             CREATE TABLE IF NOT EXISTS tasks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -77,5 +72,4 @@ def init_db():
             );
         ''')
         conn.commit()
-    finally:
-        conn.close()
+        migrate(conn)
@@ -0,0 +1,113 @@
+# Generated from shared/database/pool.py by scripts/sync_shared.py; do not edit.
+import os
+import sqlite3
+import threading
+import weakref
+
+from config import Config
+
+_local = threading.local()
+_connections = weakref.WeakSet()
+_metrics_lock = threading.Lock()
+_metrics = {'connects': 0, 'checkouts': 0, 'rollbacks': 0}
+
+
+class ThreadConnection(sqlite3.Connection):
+    """Connection kept open for its thread and handed out by every get_db() call.
+
+    Use it as `with get_db() as conn:`. Leaving the outermost block
+    commits, or rolls back when it is left by an exception; a nested
+    block, e.g. a helper called inside a caller's transaction, leaves
+    the transaction to its caller. close() ends a checkout without the
+    commit and does not close the connection: the outermost close() of
+    the thread rolls back a transaction its caller left open, which is
+    what closing a fresh connection used to do.
+    """
+
+    depth = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None and self.depth == 1 and self.in_transaction:
+                self.commit()
+        finally:
+            self.close()
+        return False
+
+    def close(self):
+        self.depth = max(self.depth - 1, 0)
+        if self.depth == 0 and self.in_transaction:
+            self.rollback()
+            _count('rollbacks')
+
+
+def _count(name):
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+def _connect():
+    conn = sqlite3.connect(
+        Config.DATABASE_PATH,
+        timeout=Config.DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=Config.DB_CACHED_STATEMENTS,
+        factory=ThreadConnection,
+    )
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers run alongside the single writer
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA busy_timeout={Config.DB_BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA synchronous={Config.DB_SYNCHRONOUS}')
+    conn.execute(f'PRAGMA cache_size=-{Config.DB_CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size={Config.DB_MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    _connections.add(conn)
+    _count('connects')
+    return conn
+
+
+def get_db():
+    """Get this thread's database connection with row factory."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        # A connection inherited across fork must not be used by the child
+        conn = _local.conn = _connect()
+        _local.pid = os.getpid()
+    conn.depth += 1
+    _count('checkouts')
+    return conn
+
+
+def reset_db(exc=None):
+    """End every checkout of this thread's connection and roll back what they left open.
+
+    Registered with app.teardown_appcontext, so that a request that
+    raised between get_db() and close() cannot leave its transaction,
+    and the write lock with it, to the next request on this thread.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.depth = 0
+        if conn.in_transaction:
+            conn.rollback()
+            _count('rollbacks')
+
+
+def close_db():
+    """Really close this thread's connection, e.g. before its database file is replaced."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        _local.conn = None
+        sqlite3.Connection.close(conn)
+
+
+def db_stats():
+    """Connection usage counters for this process."""
+    with _metrics_lock:
+        stats = dict(_metrics)
+    stats['open'] = len(_connections)
+    stats['reused'] = stats['checkouts'] - stats['connects']
+    return stats
@@ -0,0 +1,12 @@
+# (version, name, statements); append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, 'index task filters and task children', [
+        'CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks (category)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_created_date ON tasks (date(createdAt))',
+        'CREATE INDEX IF NOT EXISTS idx_comments_task ON comments (task_id)',
+        'CREATE INDEX IF NOT EXISTS idx_history_task ON history (task_id)',
+        'CREATE INDEX IF NOT EXISTS idx_attachments_task ON attachments (task_id)',
+        'CREATE INDEX IF NOT EXISTS idx_ratings_task ON ratings (task_id)',
+    ]),
+]
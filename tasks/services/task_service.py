@@ -1,4 +1,5 @@
 from database.connection import get_db
+from database.write_queue import run_write
 from utils.helpers import generate_task_number
 from datetime import datetime
 
@@ -8,7 +9,8 @@ def create_task(data):
         return {'success': False, 'message': 'Некорректная категория'}, 400
     
     number = generate_task_number()
-    with get_db() as db:
+
+    def insert(db):
         cursor = db.cursor()
         cursor.execute('''
             INSERT INTO tasks (number, accountId, category, title, description, createdAt)
@@ -19,7 +21,9 @@ def create_task(data):
             INSERT INTO history (task_id, timestamp, action, user)
             VALUES (?, ?, ?, ?)
         ''', (task_id, datetime.now().isoformat(), 'created', 'system'))
-        db.commit()
+        return task_id
+
+    task_id = run_write(insert)
     return get_task_by_id(task_id)
 
 def get_tasks(args):
@@ -93,4 +97,4 @@ def get_task_by_id(task_id):
             'attachments': attachments,
             'history': history,
             'comments': comments
-        }
\ No newline at end of file
+        }
@@ -2,17 +2,22 @@ from flask import Flask
 from flask_cors import CORS
 from config import Config
 from routes.users_routes import users_bp
-from database.connection import init_database
+from database.connection import db_stats, init_database, reset_db
 
 def create_app():
     app = Flask(__name__)
 
     CORS(app, supports_credentials=Config.CORS_SUPPORTS_CREDENTIALS)
+    app.teardown_appcontext(reset_db)
 
     init_database()
 
     app.register_blueprint(users_bp, url_prefix='')
 
+    @app.route('/health')
+    def health():
+        return {"success": True, "data": {"database": db_stats()}}
+
     return app
 
 if __name__ == '__main__':
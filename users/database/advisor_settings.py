@@ -0,0 +1,14 @@
+"""What the index advisor (database/advisor.py) checks for the users database."""
+from database.connection import init_database
+
+SOURCES = ['database/models.py']
+
+# Normalised statements that read whole tables by design
+FULL_SCAN_OK = ()
+
+# f-string expression -> the SQL fragments it can take
+PLACEHOLDERS = {}
+
+
+def init():
+    init_database()
@@ -1,16 +1,10 @@
-import sqlite3
-from config import Config
+# Connection handling is the same in every service: shared/database/pool.py
+from database.pool import close_db, db_stats, get_db, reset_db
 
-def get_db():
-    """Get database connection with row factory."""
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def init_database():
     """Initialize users table if not exists."""
-    conn = get_db()
-    try:
+    with get_db() as conn:
         conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id            INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -24,5 +18,3 @@ def init_database():
         );
         ''')
         conn.commit()
-    finally:
-        conn.close()
@@ -4,36 +4,29 @@ class User:
     @staticmethod
     def get_user_by_email(email):
         """Get user by email."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             cursor = conn.execute(
                 'SELECT * FROM users WHERE email = ?',
                 (email,)
             )
             row = cursor.fetchone()
             return User.to_dict(row)
-        finally:
-            conn.close()
 
     @staticmethod
     def get_user_by_credentials(email, password):
         """Get user by credentials."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             cursor = conn.execute(
                 'SELECT * FROM users WHERE email = ? AND password = ?',
                 (email, password)
             )
             row = cursor.fetchone()
             return User.to_dict(row)
-        finally:
-            conn.close()
 
     @staticmethod
     def create_user(email, name, description, password, sex):
         """Create a new user record."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             cursor = conn.execute(
                 '''
                 INSERT INTO users (email, description, username, password, name, sex)
@@ -43,22 +36,17 @@ class User:
             )
             conn.commit()
             return cursor.lastrowid
-        finally:
-            conn.close()
     
     @staticmethod
     def get_user_by_id(user_id):
         """Get user by ID."""
-        conn = get_db()
-        try:
+        with get_db() as conn:
             cursor = conn.execute(
                 'SELECT * FROM users WHERE id = ?',
                 (user_id,)
             )
             row = cursor.fetchone()
             return User.to_dict(row)
-        finally:
-            conn.close()
 
     @staticmethod
     def to_dict(row):